@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.advanced_features import IrrigationScheduler
+
+DEFAULT_FIELDS = [100, 1000, 10000]
+DEFAULT_HORIZONS = [30, 120, 365]
+
+
+def make_fields(scheduler, n_fields, seed=42):
+    """Random (crops, areas, rainfall) arrays for n_fields plots"""
+    rng = np.random.default_rng(seed)
+    crops = rng.choice(list(scheduler.water_requirements), size=n_fields)
+    areas = np.round(rng.uniform(0.1, 20.0, n_fields), 2)
+    rainfall = np.round(rng.uniform(0.0, 400.0, n_fields), 1)
+    return crops, areas, rainfall
+
+
+def per_call_schedules(scheduler, crops, areas, rainfall, horizon_days):
+    """The per-field loop: calculate_schedule for each plot, collected into one DataFrame"""
+    rows = []
+    for field, (crop, area, rain) in enumerate(zip(crops, areas, rainfall)):
+        for entry in scheduler.calculate_schedule(crop, float(area), float(rain), horizon_days):
+            entry['field'] = field
+            entry['crop'] = crop
+            rows.append(entry)
+    return pd.DataFrame(rows)
+
+
+def bench(scheduler, n_fields, horizon_days):
+    crops, areas, rainfall = make_fields(scheduler, n_fields)
+
+    start = time.perf_counter()
+    loop = per_call_schedules(scheduler, crops, areas, rainfall, horizon_days)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = scheduler.calculate_schedules(crops, areas, rainfall, horizon_days)
+    batch_seconds = time.perf_counter() - start
+
+    if len(loop) != len(batch) or not np.allclose(loop['water_amount'], batch['water_amount']):
+        raise RuntimeError(f"Batch schedule differs from the per-call loop ({n_fields} fields, {horizon_days} days)")
+    return {
+        'rows': len(batch),
+        'loop_seconds': loop_seconds,
+        'batch_seconds': batch_seconds,
+        'speedup': loop_seconds / batch_seconds if batch_seconds > 0 else float('inf')
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark batch irrigation scheduling against per-field calculate_schedule calls"
+    )
+    parser.add_argument('--fields', type=int, nargs='+', default=DEFAULT_FIELDS)
+    parser.add_argument('--horizons', type=int, nargs='+', default=DEFAULT_HORIZONS, help="Horizons in days")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    scheduler = IrrigationScheduler()
+    results = []
+    for n_fields in args.fields:
+        for horizon_days in args.horizons:
+            print(f"Benchmarking {n_fields:,} fields x {horizon_days} days...", file=sys.stderr)
+            results.append({'fields': n_fields, 'horizon_days': horizon_days,
+                            **bench(scheduler, n_fields, horizon_days)})
+
+    print(f"{'fields':>8} {'days':>5} {'rows':>10} {'loop s':>8} {'batch s':>8} {'speedup':>8}")
+    for r in results:
+        print(f"{r['fields']:>8,} {r['horizon_days']:>5} {r['rows']:>10,} {r['loop_seconds']:>8.3f} "
+              f"{r['batch_seconds']:>8.4f} {r['speedup']:>7.0f}x")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
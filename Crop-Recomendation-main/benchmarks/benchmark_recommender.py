@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH, FEATURE_COLUMNS
+from utils.metrics import peak_rss_bytes
+
+DEFAULT_SCALES = [1, 10, 100, 1000]
+DEFAULT_BATCH_SIZES = [1, 32, 1024, 65536]
+# SVC training is quadratic in rows, so larger datasets are only scored
+DEFAULT_MAX_TRAIN_ROWS = 22000
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where it cannot be measured"""
+    peak = peak_rss_bytes()
+    return None if peak is None else peak / (1024 * 1024)
+
+
+def make_synthetic_dataset(df, scale, seed=42, jitter=0.05):
+    """Resample df to scale x its size, adding Gaussian noise of jitter * column std"""
+    if scale == 1:
+        return df
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(df), size=len(df) * scale)
+    synthetic = df.iloc[idx].reset_index(drop=True)
+    features = synthetic[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    noise = rng.normal(0.0, 1.0, features.shape) * (df[FEATURE_COLUMNS].std().to_numpy() * jitter)
+    synthetic[FEATURE_COLUMNS] = np.clip(features + noise, 0.0, None)
+    return synthetic
+
+
+def percentiles_ms(samples):
+    samples = np.asarray(samples) * 1000.0
+    return {f'p{p}_ms': float(np.percentile(samples, p)) for p in (50, 90, 99)}
+
+
+def bench_single_predict(recommender, X, repeats):
+    latencies = []
+    for i in range(repeats):
+        row = X[i % len(X)]
+        start = time.perf_counter()
+        recommender.predict(row)
+        latencies.append(time.perf_counter() - start)
+    return percentiles_ms(latencies)
+
+
+def bench_batch_throughput(recommender, X, batch_sizes, min_rows=20000, max_seconds=2.0):
+    """
+    rows/second of predict_batch for each batch size, scoring at least
+    min_rows rows unless max_seconds runs out first (small batches)
+    """
+    results = {}
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            recommender.predict_batch(batch)
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if calls * batch_size >= min_rows or elapsed >= max_seconds:
+                break
+        results[str(batch_size)] = {
+            'rows_per_second': batch_size * calls / elapsed,
+            'seconds_per_call': elapsed / calls
+        }
+    return results
+
+
+def bench_ensemble(recommender, X, batch_size=4096, repeats=5):
+    """
+    Latency of each trained model alone, of scoring them one after another,
+    and of the threaded soft-voting ensemble, on one pre-scaled batch.
+    Uses the same exact models as the served ensemble (no approximations).
+    """
+    from model.ensemble import EnsemblePredictor
+
+    X_scaled = recommender.scaler.transform(X[np.arange(batch_size) % len(X)])
+    models = {name: recommender.models[name] for name in recommender.exact_model_names()}
+
+    def best_of(fn):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    per_model = {name: best_of(lambda m=model: m.predict_proba(X_scaled)) for name, model in models.items()}
+    ensemble = EnsemblePredictor(models)
+    try:
+        parallel = best_of(lambda: ensemble.predict(X_scaled))
+    finally:
+        ensemble.close()
+    return {
+        'batch_size': batch_size,
+        'model_seconds': per_model,
+        'sequential_seconds': sum(per_model.values()),
+        'ensemble_seconds': parallel,
+        'speedup_vs_sequential': sum(per_model.values()) / parallel
+    }
+
+
+def bench_scale(df, scale, base_recommender, args, workdir):
+    """Benchmark one dataset scale; trains only when the dataset is small enough"""
+    data = make_synthetic_dataset(df, scale, seed=args.seed)
+    X = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    result = {'rows': len(data)}
+
+    recommender = base_recommender
+    if len(data) <= args.max_train_rows:
+        data_path = os.path.join(workdir, f"crops_x{scale}.csv")
+        data.to_csv(data_path, index=False)
+        store_dir = os.path.join(workdir, f"store_x{scale}")
+
+        start = time.perf_counter()
+        recommender = CropRecommender(data_path=data_path, store_dir=store_dir, n_jobs=args.n_jobs,
+                                      approx_svm=args.inference_engine == 'approx_svm')
+        result['cold_start_train_seconds'] = time.perf_counter() - start
+        result['fit_seconds'] = {
+            name: timing['fit'] for name, timing in recommender.training_timings.items()
+            if name != 'total'
+        }
+        result['best_model'] = recommender.best_model_name
+        if 'svm_approx' in recommender.model_scores:
+            result['svm_approx_accuracy_gap'] = recommender.model_scores['svm_approx']['accuracy_gap']
+
+        start = time.perf_counter()
+        CropRecommender(data_path=data_path, store_dir=store_dir,
+                        approx_svm=args.inference_engine == 'approx_svm')
+        result['cold_start_artifact_seconds'] = time.perf_counter() - start
+    else:
+        result['training'] = f"skipped (> {args.max_train_rows} rows); scored with the x1 model"
+
+    recommender.set_inference_engine(args.inference_engine)
+    result['inference_engine'] = args.inference_engine
+    result['predict'] = bench_single_predict(recommender, X, args.predict_repeats)
+    result['batch'] = bench_batch_throughput(recommender, X, args.batch_sizes)
+    start = time.perf_counter()
+    recommender.predict_batch(X)
+    result['full_dataset_predict_seconds'] = time.perf_counter() - start
+    result['ensemble'] = bench_ensemble(recommender, X)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current, baseline, threshold):
+    """
+    Return a list of metrics that regressed by more than threshold
+    (a fraction). rows_per_second is higher-is-better; seconds, ms and
+    MB metrics are lower-is-better; other numbers are ignored.
+    """
+    current_flat = _flatten(current['scales'])
+    baseline_flat = _flatten(baseline['scales'])
+    regressions = []
+    for name, value in sorted(current_flat.items()):
+        old = baseline_flat.get(name)
+        if not old:
+            continue
+        if name.endswith('rows_per_second'):
+            change = (old - value) / old
+        elif name.endswith(('seconds', '_ms', '_mb')) or '.fit_seconds.' in name:
+            change = (value - old) / old
+        else:
+            continue
+        if change > threshold:
+            regressions.append({'metric': name, 'baseline': old, 'current': value,
+                                'regression_pct': round(change * 100, 1)})
+    return regressions
+
+
+def environment_info():
+    import sklearn
+    import xgboost
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CropRecommender training and inference")
+    parser.add_argument('--data', default=DATA_PATH, help="Base dataset to scale up")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="Dataset size multipliers of the base dataset")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--predict-repeats', type=int, default=500,
+                        help="Single-row predict calls used for latency percentiles")
+    parser.add_argument('--max-train-rows', type=int, default=DEFAULT_MAX_TRAIN_ROWS,
+                        help="Only train on datasets up to this many rows")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Training workers")
+    parser.add_argument('--inference-engine', choices=['sklearn', 'flat', 'ensemble', 'approx_svm'], default='sklearn',
+                        help="How the best model is evaluated during inference benchmarks")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.data)
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment_info(),
+        'base_rows': len(df),
+        'scales': {}
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        base_path = os.path.join(workdir, "crops_base.csv")
+        df.to_csv(base_path, index=False)
+        base_recommender = CropRecommender(data_path=base_path, store_dir=os.path.join(workdir, "store_base"),
+                                           approx_svm=args.inference_engine == 'approx_svm')
+        for scale in sorted(args.scales):
+            print(f"Benchmarking x{scale} ({len(df) * scale:,} rows)...", file=sys.stderr)
+            results['scales'][f'x{scale}'] = bench_scale(df, scale, base_recommender, args, workdir)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results['regressions'] = compare(results, baseline, args.threshold)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for regression in results.get('regressions', []):
+        print(f"REGRESSION {regression['metric']}: {regression['baseline']:.4g} -> "
+              f"{regression['current']:.4g} (+{regression['regression_pct']}%)")
+    if results.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from model.dataset import DATA_PATH, FEATURE_COLUMNS, open_dataset
+from utils.chart_images import clear_caches
+from utils.pdf_generator import ReportBuilder
+from utils.report_service import PARAMETER_NAMES, make_gauges
+
+DEFAULT_REPORTS = 500
+MODES = ['fresh_builder', 'shared_builder', 'zip']
+
+
+def make_reports(n_reports, charts=True, seed=42):
+    """(prediction_data, crop_probabilities) pairs from random dataset rows"""
+    dataset = open_dataset(DATA_PATH)
+    X = np.asarray(dataset.features, dtype=np.float64)
+    labels = np.asarray(dataset.label_names, dtype=object)[np.asarray(dataset.labels)]
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(X), size=n_reports)
+    importance = {PARAMETER_NAMES[c]: 1.0 / (i + 2) for i, c in enumerate(FEATURE_COLUMNS)}
+
+    reports = []
+    for i in idx:
+        features = dict(zip(FEATURE_COLUMNS, X[i]))
+        prediction_data = {
+            'prediction': str(labels[i]),
+            'parameters': {PARAMETER_NAMES[c]: float(v) for c, v in features.items()}
+        }
+        if charts:
+            prediction_data['gauges'] = make_gauges(features, dataset.stats)
+            prediction_data['feature_importance'] = importance
+        crops = rng.choice(dataset.label_names, size=3, replace=False)
+        reports.append((prediction_data, [(str(crop), p) for crop, p in zip(crops, (80.0, 15.0, 5.0))]))
+    return reports
+
+
+def bench_mode(mode, reports, workdir):
+    """Build every report in one mode; returns reports/second and output size"""
+    clear_caches()
+    start = time.perf_counter()
+    output_bytes = 0
+    if mode == 'fresh_builder':
+        # What create_prediction_pdf used to do: styles rebuilt for every report
+        for prediction_data, crop_probabilities in reports:
+            output_bytes += len(ReportBuilder().build(prediction_data, crop_probabilities))
+    elif mode == 'shared_builder':
+        builder = ReportBuilder()
+        for prediction_data, crop_probabilities in reports:
+            output_bytes += len(builder.build(prediction_data, crop_probabilities))
+    elif mode == 'zip':
+        path = os.path.join(workdir, 'reports.zip')
+        ReportBuilder().write_zip(iter(reports), path)
+        output_bytes = os.path.getsize(path)
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    elapsed = time.perf_counter() - start
+    return {
+        'seconds': elapsed,
+        'reports_per_second': len(reports) / elapsed if elapsed > 0 else 0.0,
+        'output_mb': output_bytes / 1e6
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF report throughput (reports/second)")
+    parser.add_argument('--reports', type=int, default=DEFAULT_REPORTS, help="Reports per mode")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--no-charts', action='store_true', help="Reports without gauges and importance chart")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    reports = make_reports(args.reports, charts=not args.no_charts)
+    results = {'reports': args.reports, 'charts': not args.no_charts, 'modes': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes:
+            print(f"Benchmarking {mode}...", file=sys.stderr)
+            results['modes'][mode] = bench_mode(mode, reports, workdir)
+
+    print(f"{'mode':<16} {'reports/s':>10} {'seconds':>8} {'output MB':>10}")
+    for mode, result in results['modes'].items():
+        print(f"{mode:<16} {result['reports_per_second']:>10.1f} {result['seconds']:>8.2f} "
+              f"{result['output_mb']:>10.2f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
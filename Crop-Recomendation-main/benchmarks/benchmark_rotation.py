@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from utils.advanced_features import CropRotationPlanner, EconomicAnalyzer, SEASON_CYCLE
+
+DEFAULT_PLANS = 10000
+DEFAULT_HORIZONS = [1, 3, 6, 12]
+
+
+def bench(planner, crops, horizon):
+    """Plans/second for single plan_rotation calls and one batched plan_rotations call"""
+    single = crops[:max(len(crops) // 10, 1)]
+    start = time.perf_counter()
+    for i, crop in enumerate(single):
+        planner.plan_rotation(crop, SEASON_CYCLE[i % len(SEASON_CYCLE)], horizon)
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planner.plan_rotations(crops, SEASON_CYCLE[0], horizon)
+    batch_seconds = time.perf_counter() - start
+    return {
+        'single_plans_per_second': len(single) / single_seconds,
+        'batch_plans_per_second': len(crops) / batch_seconds
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark multi-season crop rotation planning")
+    parser.add_argument('--plans', type=int, default=DEFAULT_PLANS, help="Current crops to plan from")
+    parser.add_argument('--horizons', type=int, nargs='+', default=DEFAULT_HORIZONS, help="Seasons per plan")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    planner = CropRotationPlanner(EconomicAnalyzer())
+    crops = list(np.random.default_rng(42).choice(planner.crops, size=args.plans))
+
+    start = time.perf_counter()
+    for i, crop in enumerate(crops):
+        planner.suggest_rotation(crop, SEASON_CYCLE[i % len(SEASON_CYCLE)])
+    suggestions_per_second = len(crops) / (time.perf_counter() - start)
+
+    results = {'suggestions_per_second': suggestions_per_second, 'horizons': {}}
+    for horizon in args.horizons:
+        print(f"Benchmarking {horizon}-season plans...", file=sys.stderr)
+        results['horizons'][horizon] = bench(planner, crops, horizon)
+
+    print(f"suggest_rotation: {suggestions_per_second:,.0f} calls/s")
+    print(f"{'seasons':>8} {'single plans/s':>15} {'batch plans/s':>15}")
+    for horizon, result in results['horizons'].items():
+        print(f"{horizon:>8} {result['single_plans_per_second']:>15,.0f} {result['batch_plans_per_second']:>15,.0f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-from model.crop_recommendation_model import CropRecommender
-from utils.visualization import create_gauge_chart, create_feature_importance_plot, create_model_comparison_plot
-from utils.pdf_generator import create_prediction_pdf
-from utils.advanced_features import IrrigationScheduler, EconomicAnalyzer, CropRotationPlanner
+from utils.advanced_features import IrrigationScheduler, EconomicAnalyzer, CropRotationPlanner, PortfolioOptimizer
+from utils.crop_registry import load_registry
+from utils.startup_profile import timed_import, import_report
+from utils import metrics
+from concurrent.futures import ThreadPoolExecutor
 import os
 from datetime import datetime
 
+# sklearn/xgboost (model), plotly (charts) and reportlab (PDF) are only
+# needed by the Crop Recommendation tab, so they are imported on demand.
+# CROP_STARTUP_MODE: "background" (default) trains/loads the recommender in
+# a worker thread while the page renders, "lazy" waits for the first
+# recommendation request, "eager" loads it before rendering anything.
+STARTUP_MODE = os.environ.get("CROP_STARTUP_MODE", "background")
+# CROP_LOOKUP_BINS: answer slider predictions from a precomputed grid of
+# this many points per feature (python -m model.lookup_table --measure --all-classes
+# shows the accuracy/memory trade-off); unset uses the model directly.
+LOOKUP_BINS = os.environ.get("CROP_LOOKUP_BINS")
+
 # Page configuration
 st.set_page_config(
     page_title="Crop Recommendation System",
@@ -19,19 +31,117 @@ st.set_page_config(
 with open('styles/custom.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
+def build_recommender():
+    CropRecommender = timed_import('model.crop_recommendation_model').CropRecommender
+    recommender = CropRecommender()
+    # Field agents often resubmit identical soil-test values
+    recommender.enable_prediction_cache()
+    if LOOKUP_BINS:
+        lookup_table = timed_import('model.lookup_table')
+        recommender.attach_lookup_table(
+            lookup_table.load_or_build(recommender, int(LOOKUP_BINS), top_k=None), interpolate=True
+        )
+    return recommender
+
+# CROP_METRICS_PORT / CROP_METRICS_FILE export Prometheus metrics (see utils/metrics.py)
+@st.cache_resource
+def start_metrics():
+    return metrics.configure_from_env()
+
 # Initialize the model and advanced features
 @st.cache_resource
-def load_model():
-    return CropRecommender(), IrrigationScheduler(), EconomicAnalyzer(), CropRotationPlanner()
+def load_recommender_async():
+    """Start building the recommender once per server process"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommender-loader")
+    return executor.submit(build_recommender)
+
+@st.cache_resource
+def load_dataset_stats():
+    return timed_import('model.dataset').load_dataset_stats()
+
+@st.cache_resource
+def load_report_service():
+    """Shared PDF rendering pool, so reports never block the script thread's other work"""
+    return timed_import('utils.report_service').ReportService()
+
+@st.fragment
+def report_download(prediction_data, crop_probs):
+    """Build the PDF only when asked; as a fragment, the click does not rerun the whole page"""
+    if st.button("📄 Prepare Recommendation Report (PDF)"):
+        with st.spinner("Rendering report..."):
+            pdf_output = load_report_service().submit(prediction_data, crop_probs).result()
+        st.download_button(
+            label="📄 Download Recommendation Report (PDF)",
+            data=pdf_output,
+            file_name="crop_recommendation_report.pdf",
+            mime="application/pdf"
+        )
+
+@st.cache_resource
+def load_crop_registry():
+    return load_registry()
+
+@st.cache_resource
+def load_advanced_features():
+    registry = load_crop_registry()
+    economic_analyzer = EconomicAnalyzer(registry)
+    return IrrigationScheduler(registry), economic_analyzer, CropRotationPlanner(economic_analyzer)
+
+@st.cache_resource
+def load_risk_engine():
+    from utils.risk_engine import RiskEngine
+
+    return RiskEngine(load_advanced_features()[1])
+
+@st.cache_resource
+def load_profit_ranker(artifact_key):
+    """Profit ranker for the recommender with this artifact key"""
+    from model.profit_ranking import ProfitRanker
+
+    return ProfitRanker(get_recommender(), load_advanced_features()[1], load_risk_engine())
+
+@st.cache_data(max_entries=32)
+def show_static_chart(chart, artifact_key, _fig):
+    """
+    Render a chart that only changes with the model artifact. Later calls
+    for the same chart and artifact_key replay the stored chart element
+    instead of serializing the figure to JSON again.
+    """
+    st.plotly_chart(_fig)
+
+@st.cache_resource
+def load_portfolio_optimizer():
+    return PortfolioOptimizer(load_crop_registry())
+
+def get_recommender():
+    """Block until the recommender is ready"""
+    try:
+        return load_recommender_async().result()
+    except Exception:
+        # Let the next request retry instead of caching the failure
+        load_recommender_async.clear()
+        raise
+
+start_metrics()
 
 try:
-    model, irrigation_scheduler, economic_analyzer, rotation_planner = load_model()
-    # Load dataset for range calculation
-    df = pd.read_csv("attached_assets/Crop_recommendation (1).csv")
+    irrigation_scheduler, economic_analyzer, rotation_planner = load_advanced_features()
+    if STARTUP_MODE == "eager":
+        get_recommender()
+    elif STARTUP_MODE == "background":
+        load_recommender_async()
+    # Slider ranges come from statistics precomputed with the columnar dataset
+    stats = load_dataset_stats()
 except Exception as e:
+    metrics.inc('crop_errors_total', stage='startup')
     st.error("Failed to initialize the system. Please try again later.")
     st.stop()
 
+if os.environ.get("CROP_STARTUP_REPORT"):
+    with st.sidebar.expander("Startup import report"):
+        for module_name, seconds in import_report():
+            st.text(f"{seconds * 1000:8.1f} ms  {module_name}")
+
 # Header section
 st.title("🌾 Crop Recommendation System")
 st.markdown("""
@@ -55,33 +165,39 @@ with tab1:
     with col1:
         st.subheader("Soil Parameters")
         nitrogen = st.slider("Nitrogen (N) mg/kg", 
-                            float(df['N'].min()), float(df['N'].max()), 
-                            float(df['N'].mean()))
+                            stats['N']['min'], stats['N']['max'], 
+                            stats['N']['mean'])
         phosphorus = st.slider("Phosphorus (P) mg/kg", 
-                              float(df['P'].min()), float(df['P'].max()), 
-                              float(df['P'].mean()))
+                              stats['P']['min'], stats['P']['max'], 
+                              stats['P']['mean'])
         potassium = st.slider("Potassium (K) mg/kg", 
-                             float(df['K'].min()), float(df['K'].max()), 
-                             float(df['K'].mean()))
+                             stats['K']['min'], stats['K']['max'], 
+                             stats['K']['mean'])
         ph = st.slider("pH value", 
-                       float(df['ph'].min()), float(df['ph'].max()), 
-                       float(df['ph'].mean()))
+                       stats['ph']['min'], stats['ph']['max'], 
+                       stats['ph']['mean'])
 
     with col2:
         st.subheader("Environmental Conditions")
         temperature = st.slider("Temperature (°C)", 
-                              float(df['temperature'].min()), float(df['temperature'].max()), 
-                              float(df['temperature'].mean()))
+                              stats['temperature']['min'], stats['temperature']['max'], 
+                              stats['temperature']['mean'])
         humidity = st.slider("Humidity (%)", 
-                            float(df['humidity'].min()), float(df['humidity'].max()), 
-                            float(df['humidity'].mean()))
+                            stats['humidity']['min'], stats['humidity']['max'], 
+                            stats['humidity']['mean'])
         rainfall = st.slider("Rainfall (mm)", 
-                            float(df['rainfall'].min()), float(df['rainfall'].max()), 
-                            float(df['rainfall'].mean()))
+                            stats['rainfall']['min'], stats['rainfall']['max'], 
+                            stats['rainfall']['mean'])
 
     if st.button("Get Crop Recommendation"):
         with st.spinner("Analyzing parameters..."):
             try:
+                model = get_recommender()
+                visualization = timed_import('utils.visualization')
+                create_gauge_chart = visualization.create_gauge_chart
+                create_feature_importance_plot = visualization.create_feature_importance_plot
+                create_model_comparison_plot = visualization.create_model_comparison_plot
+
                 # Prepare input features
                 features = np.array([nitrogen, phosphorus, potassium, 
                                    temperature, humidity, ph, rainfall])
@@ -98,17 +214,17 @@ with tab1:
                 with g1:
                     st.plotly_chart(create_gauge_chart(
                         nitrogen, "Nitrogen Level", 
-                        df['N'].min(), df['N'].max()
+                        stats['N']['min'], stats['N']['max']
                     ))
                 with g2:
                     st.plotly_chart(create_gauge_chart(
                         ph, "pH Level", 
-                        df['ph'].min(), df['ph'].max()
+                        stats['ph']['min'], stats['ph']['max']
                     ))
                 with g3:
                     st.plotly_chart(create_gauge_chart(
                         rainfall, "Rainfall", 
-                        df['rainfall'].min(), df['rainfall'].max()
+                        stats['rainfall']['min'], stats['rainfall']['max']
                     ))
 
                 # Show model performance metrics
@@ -120,8 +236,10 @@ with tab1:
 
                 with c1:
                     st.markdown("#### Model Accuracy Comparison")
-                    model_comparison_fig = create_model_comparison_plot(model_scores)
-                    st.plotly_chart(model_comparison_fig)
+                    model_comparison_fig = create_model_comparison_plot(
+                        model_scores, cache_key=model.artifact_key
+                    )
+                    show_static_chart('model_comparison', model.artifact_key, model_comparison_fig)
 
                 with c2:
                     st.markdown("#### Detailed Model Metrics")
@@ -146,15 +264,32 @@ with tab1:
                     - **{crop.title()}**: {prob*100:.1f}% confidence
                     """)
 
+                # Same probabilities, weighted by risk-adjusted profit per hectare
+                st.subheader("Profit-Weighted Recommendations")
+                profit_ranker = load_profit_ranker(model.artifact_key)
+                profit_ranking = profit_ranker.rank_probabilities(probabilities[None, :])
+                ranked = [
+                    (crop, score, profit)
+                    for crop, score, profit in zip(profit_ranking['labels'][0], profit_ranking['scores'][0],
+                                                   profit_ranking['profit'][0])
+                    if crop is not None
+                ]
+                if ranked:
+                    st.dataframe(pd.DataFrame({
+                        "Crop": [crop.title() for crop, _, _ in ranked],
+                        "Risk-adjusted Profit per Hectare (₹)": [round(profit, 2) for _, _, profit in ranked],
+                        "Profit-weighted Score (₹)": [round(score, 2) for _, score, _ in ranked]
+                    }), hide_index=True)
+
                 # Feature importance plot
                 st.subheader("Parameter Importance Analysis")
                 importance_scores = model.get_feature_importance()
                 feature_names = ['Nitrogen', 'Phosphorus', 'Potassium', 
                                    'Temperature', 'Humidity', 'pH', 'Rainfall']
                 feature_importance_fig = create_feature_importance_plot(
-                    importance_scores, feature_names
+                    importance_scores, feature_names, cache_key=model.artifact_key
                 )
-                st.plotly_chart(feature_importance_fig)
+                show_static_chart('feature_importance', model.artifact_key, feature_importance_fig)
 
                 # Prepare data for PDF
                 prediction_data = {
@@ -168,25 +303,23 @@ with tab1:
                         'pH': ph,
                         'Rainfall': rainfall
                     },
-                    'model_scores': model_scores
+                    'model_scores': model_scores,
+                    'gauges': [
+                        {'title': "Nitrogen Level", 'value': nitrogen,
+                         'min': stats['N']['min'], 'max': stats['N']['max']},
+                        {'title': "pH Level", 'value': ph,
+                         'min': stats['ph']['min'], 'max': stats['ph']['max']},
+                        {'title': "Rainfall", 'value': rainfall,
+                         'min': stats['rainfall']['min'], 'max': stats['rainfall']['max']}
+                    ],
+                    'feature_importance': dict(zip(feature_names, map(float, importance_scores)))
                 }
 
-                # Generate PDF
-                pdf_output = create_prediction_pdf(
-                    prediction_data,
-                    feature_importance_fig,
-                    crop_probs
-                )
-
-                # Add download button
-                st.download_button(
-                    label="📄 Download Recommendation Report (PDF)",
-                    data=pdf_output,
-                    file_name="crop_recommendation_report.pdf",
-                    mime="application/pdf"
-                )
+                # The PDF is rendered on the report pool only if requested
+                report_download(prediction_data, crop_probs)
 
             except Exception as e:
+                metrics.inc('crop_errors_total', stage='recommendation')
                 st.error(f"An error occurred while making the prediction: {str(e)}")
 
 with tab2:
@@ -200,10 +333,36 @@ with tab2:
     crop_name = st.selectbox("Select crop", available_crops_irrigation)
     area = st.number_input("Field area (hectares)", min_value=0.1, value=1.0)
     monthly_rainfall = st.number_input("Expected monthly rainfall (mm)", min_value=0.0, value=100.0)
+    horizon_days = st.number_input("Schedule horizon (days)", min_value=1, max_value=365, value=30)
+    schedule_mode = st.radio("Scheduling method", ["Fixed frequency", "Daily water balance"], horizontal=True)
+    if schedule_mode == "Daily water balance":
+        w1, w2 = st.columns(2)
+        with w1:
+            mean_temperature = st.number_input("Mean temperature (°C)", min_value=-10.0, max_value=50.0, value=25.0)
+        with w2:
+            mean_humidity = st.number_input("Mean relative humidity (%)", min_value=0.0, max_value=100.0, value=60.0)
 
     if st.button("Calculate Irrigation Schedule"):
-        if crop_name:
-            schedule = irrigation_scheduler.calculate_schedule(crop_name, area, monthly_rainfall)
+        if schedule_mode == "Daily water balance":
+            # Monthly rainfall spread evenly over the days of the horizon
+            result = irrigation_scheduler.simulate_water_balance(
+                [crop_name], area, np.full(int(horizon_days), monthly_rainfall / 30),
+                mean_temperature, mean_humidity
+            )
+            events_df = result['events'].drop(columns=['field'])
+            st.success(f"Water balance simulated: {len(events_df)} irrigation events, "
+                       f"{result['total_volume_m3']:,.1f} m³ in total")
+            st.dataframe(events_df)
+            st.download_button(
+                label="Download Schedule (CSV)",
+                data=events_df.to_csv(index=False),
+                file_name="irrigation_schedule.csv",
+                mime="text/csv"
+            )
+        elif crop_name:
+            schedule = irrigation_scheduler.calculate_schedule(
+                crop_name, area, monthly_rainfall, horizon_days=int(horizon_days)
+            )
             if schedule:
                 st.success("Irrigation Schedule Generated")
                 schedule_df = pd.DataFrame(schedule)
@@ -249,23 +408,67 @@ with tab3:
             else:
                 st.error("Crop not found in database")
 
+    with st.expander("Risk Analysis (Monte Carlo)"):
+        st.write("Simulate yield and price variability to see the range of profit outcomes.")
+        r1, r2 = st.columns(2)
+        with r1:
+            yield_cv = st.slider("Yield variability (%)", 0, 100, 20) / 100
+            price_cv = st.slider("Price variability (%)", 0, 100, 15) / 100
+        with r2:
+            yield_price_correlation = st.slider("Yield-price correlation", -1.0, 1.0, -0.3, step=0.05)
+            risk_scenarios = st.select_slider("Scenarios", [10_000, 100_000, 1_000_000], value=100_000)
+
+        if st.button("Simulate Risk"):
+            risk = load_risk_engine().simulate(
+                [analysis_crop], analysis_area, yield_cv=yield_cv, price_cv=price_cv,
+                correlation=yield_price_correlation, scenarios=risk_scenarios
+            ).iloc[0]
+            k1, k2, k3 = st.columns(3)
+            k1.metric("Probability of Loss", f"{risk['prob_loss']:.1%}")
+            k2.metric("Value at Risk (95%)", f"₹{risk['value_at_risk']:,.2f}")
+            k3.metric("Median Profit (₹)", f"₹{risk['p50']:,.2f}")
+            st.dataframe(pd.DataFrame({
+                "Percentile": ["5th", "25th", "50th", "75th", "95th"],
+                "Profit (₹)": [risk[f'p{p}'] for p in (5, 25, 50, 75, 95)]
+            }))
+
+    st.subheader("Farm Portfolio Optimization")
+    st.write("Split a farm's land across crops to maximize expected profit within budget and water limits.")
+    p1, p2 = st.columns(2)
+    with p1:
+        portfolio_area = st.number_input("Farm area (hectares)", min_value=0.1, value=10.0)
+        portfolio_budget = st.number_input("Budget (₹)", min_value=0.0, value=500000.0, step=10000.0)
+        portfolio_season = st.selectbox("Growing season", ["Any", "Summer", "Winter", "Monsoon"])
+    with p2:
+        portfolio_water = st.number_input("Water available (m³)", min_value=0.0, value=100000.0, step=1000.0)
+        portfolio_share = st.slider("Maximum share of land per crop (%)", 10, 100, 100)
+
+    if st.button("Optimize Portfolio"):
+        optimizer = load_portfolio_optimizer()
+        portfolio = optimizer.optimize(
+            portfolio_area, budget=portfolio_budget, water_m3=portfolio_water,
+            season=None if portfolio_season == "Any" else portfolio_season,
+            max_share=portfolio_share / 100, method='lp'
+        )
+        allocation_df = optimizer.allocation_table(portfolio)
+        if allocation_df.empty:
+            st.warning("No crop is expected to be profitable under these constraints")
+        else:
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Expected Profit (₹)", f"₹{portfolio['profit'][0]:,.2f}")
+            m2.metric("Total Cost (₹)", f"₹{portfolio['cost'][0]:,.2f}")
+            m3.metric("Water Used (m³)", f"{portfolio['water_m3'][0]:,.0f}")
+            st.dataframe(allocation_df)
+            if portfolio['unplanted_hectares'][0] > 1e-9:
+                st.info(f"{portfolio['unplanted_hectares'][0]:,.2f} hectares left unplanted")
+
 with tab4:
     st.subheader("Crop Rotation Planning")
 
-    # Create a comprehensive list of all crops from all data sources
-    all_seasonal_crops = []
-    # Get crops from rotation planner
-    for season_crops in rotation_planner.seasonal_crops.values():
-        all_seasonal_crops.extend(season_crops)
-    # Get crops from irrigation scheduler
-    all_seasonal_crops.extend(irrigation_scheduler.water_requirements.keys())
-    # Get crops from economic analyzer
-    all_seasonal_crops.extend(economic_analyzer.crop_economics.keys())
-    all_seasonal_crops = sorted(list(set(all_seasonal_crops)))  # Remove duplicates and sort
-
     # Input fields for rotation planning
-    current_crop = st.selectbox("Select current crop", all_seasonal_crops)
+    current_crop = st.selectbox("Select current crop", load_crop_registry().sorted_names)
     season = st.selectbox("Select season", ["Summer", "Winter", "Monsoon"])
+    plan_seasons = st.number_input("Seasons to plan ahead", min_value=1, max_value=12, value=3)
 
     if st.button("Get Rotation Suggestions"):
         if current_crop:
@@ -276,6 +479,16 @@ with tab4:
                 for crop in rotation['suggested_crops']:
                     st.markdown(f"- {crop.title()}")
                 st.info(rotation['rotation_benefits'])
+
+                plan = rotation_planner.plan_rotation(current_crop, season, int(plan_seasons))
+                if plan:
+                    st.write(f"Best {len(plan['crops'])}-season rotation (profit plus nitrogen balance):")
+                    st.dataframe(pd.DataFrame({
+                        "Season": [s.title() for s in plan['seasons']],
+                        "Crop": [crop.title() for crop in plan['crops']]
+                    }), hide_index=True)
+                    st.caption(f"Expected profit per hectare: ₹{plan['profit']:,.2f} | "
+                               f"Net soil nitrogen: {plan['nitrogen_balance']:+.0f} kg/ha")
             else:
                 st.error("Could not generate rotation suggestions")
 
@@ -322,20 +535,16 @@ with tab5:
     elif db_view_option == "Economic Analysis":
         st.write("### Economic Analysis Database")
         
-        # Convert economic analyzer data to DataFrame
-        economic_data = []
-        for crop, details in economic_analyzer.crop_economics.items():
-            economic_data.append({
-                "Crop": crop.title(),
-                "Cost per Hectare (₹)": details['cost_per_hectare'],
-                "Average Yield (kg/hectare)": details['avg_yield'],
-                "Price per kg (₹)": details['price_per_kg'],
-                "Estimated Revenue per Hectare (₹)": details['avg_yield'] * details['price_per_kg'],
-                "Estimated Profit per Hectare (₹)": (details['avg_yield'] * details['price_per_kg']) - details['cost_per_hectare'],
-                "ROI (%)": round(((details['avg_yield'] * details['price_per_kg']) - details['cost_per_hectare']) / details['cost_per_hectare'] * 100, 2)
-            })
-        
-        economic_df = pd.DataFrame(economic_data)
+        economics = economic_analyzer.economics_table()
+        economic_df = pd.DataFrame({
+            "Crop": economics.index.str.title(),
+            "Cost per Hectare (₹)": economics['cost_per_hectare'].to_numpy(),
+            "Average Yield (kg/hectare)": economics['avg_yield'].to_numpy(),
+            "Price per kg (₹)": economics['price_per_kg'].to_numpy(),
+            "Estimated Revenue per Hectare (₹)": economics['revenue_per_hectare'].to_numpy(),
+            "Estimated Profit per Hectare (₹)": economics['profit_per_hectare'].to_numpy(),
+            "ROI (%)": economics['roi_percentage'].to_numpy()
+        })
         economic_df = economic_df.sort_values("Crop")
         
         st.dataframe(economic_df)
@@ -0,0 +1,208 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH, FEATURE_COLUMNS
+from model.model_store import DEFAULT_STORE_DIR
+
+DEFAULT_BATCH_ROWS = 50000
+TOP_K = 3
+
+# Per-process recommender used by pool workers
+_worker_recommender = None
+
+
+def detect_format(path, explicit=None):
+    """Return 'csv' or 'parquet' from an explicit choice or the file extension"""
+    if explicit:
+        return explicit
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def iter_input_chunks(path, chunk_rows, file_format=None):
+    """Yield DataFrames of at most chunk_rows rows without loading the whole file"""
+    if detect_format(path, file_format) == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def score_chunk(recommender, chunk, top_k=TOP_K):
+    """Append the predicted crop and top-k crops/probabilities to a chunk"""
+    missing = [col for col in FEATURE_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing feature columns: {', '.join(missing)}")
+
+    result = recommender.predict_batch(chunk[FEATURE_COLUMNS], top_k=top_k)
+    scored = chunk.copy()
+    scored[FEATURE_COLUMNS] = scored[FEATURE_COLUMNS].astype(np.float64)
+    scored['predicted_crop'] = result['labels']
+    for rank in range(result['top_k_labels'].shape[1]):
+        scored[f'top{rank + 1}_crop'] = result['top_k_labels'][:, rank]
+        scored[f'top{rank + 1}_probability'] = result['top_k_probabilities'][:, rank]
+    return scored
+
+
+class ChunkWriter:
+    """Write scored chunks to CSV or Parquet incrementally"""
+
+    def __init__(self, path, file_format=None):
+        self.path = path
+        self.file_format = detect_format(path, file_format)
+        self._parquet_writer = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.file_format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet_writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(
+                    df, schema=self._parquet_writer.schema, preserve_index=False
+                )
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(
+                self.path,
+                mode='a' if self._wrote_header else 'w',
+                header=not self._wrote_header,
+                index=False
+            )
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _load_recommender(data_path, store_dir, inference_engine):
+    return CropRecommender(
+        data_path=data_path,
+        store_dir=store_dir,
+        inference_engine=inference_engine,
+        approx_svm=inference_engine == 'approx_svm'
+    )
+
+
+def _init_worker(data_path, store_dir, inference_engine):
+    global _worker_recommender
+    _worker_recommender = _load_recommender(data_path, store_dir, inference_engine)
+
+
+def _score_in_worker(chunk):
+    return score_chunk(_worker_recommender, chunk)
+
+
+def score_file(input_path, output_path, chunk_rows=DEFAULT_BATCH_ROWS, workers=1,
+               input_format=None, output_format=None, data_path=DATA_PATH,
+               store_dir=DEFAULT_STORE_DIR, inference_engine='sklearn', log=sys.stderr):
+    """
+    Stream input_path through the recommender into output_path.
+    With workers > 1 chunks are scored on a process pool; at most two
+    chunks per worker are in flight so memory stays bounded, and output
+    order matches input order. inference_engine is passed to
+    CropRecommender.set_inference_engine ('approx_svm' also trains the
+    approximate SVM if the stored artifact lacks it).
+    Returns a dict with the row count, elapsed seconds and rows/second.
+    """
+    # Build or load the artifact once up front so workers only ever load it
+    recommender = _load_recommender(data_path, store_dir, inference_engine)
+    chunks = iter_input_chunks(input_path, chunk_rows, input_format)
+    total_rows = 0
+    start = time.perf_counter()
+
+    def report(rows):
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        print(f"Scored {rows:,} rows ({rate:,.0f} rows/s)", file=log)
+
+    with ChunkWriter(output_path, output_format) as writer:
+        if workers <= 1:
+            for chunk in chunks:
+                writer.write(score_chunk(recommender, chunk))
+                total_rows += len(chunk)
+                report(total_rows)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(data_path, store_dir, inference_engine)
+            ) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    if len(pending) >= 2 * workers:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        total_rows += len(scored)
+                        report(total_rows)
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    total_rows += len(scored)
+                    report(total_rows)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': total_rows,
+        'seconds': elapsed,
+        'rows_per_second': total_rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a CSV/Parquet file of soil and weather readings in bounded-memory chunks"
+    )
+    parser.add_argument('input', help="Input CSV or Parquet file with N,P,K,temperature,humidity,ph,rainfall")
+    parser.add_argument('output', help="Output CSV or Parquet file")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_BATCH_ROWS, help="Rows per chunk")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Scoring processes (0 = one per CPU core)")
+    parser.add_argument('--input-format', choices=['csv', 'parquet'], help="Override input format")
+    parser.add_argument('--output-format', choices=['csv', 'parquet'], help="Override output format")
+    parser.add_argument('--data', default=DATA_PATH, help="Training CSV for the recommender")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Model artifact directory")
+    parser.add_argument('--inference-engine', default='sklearn',
+                        choices=['sklearn', 'flat', 'ensemble', 'approx_svm'],
+                        help="How probabilities are computed (see CropRecommender.set_inference_engine)")
+    args = parser.parse_args(argv)
+
+    stats = score_file(
+        args.input,
+        args.output,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers or os.cpu_count() or 1,
+        input_format=args.input_format,
+        output_format=args.output_format,
+        data_path=args.data,
+        store_dir=args.store_dir,
+        inference_engine=args.inference_engine
+    )
+    print(f"Done: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
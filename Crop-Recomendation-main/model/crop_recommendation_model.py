@@ -4,13 +4,35 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from xgboost import XGBClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import accuracy_score, classification_report
-import joblib
+from sklearn.model_selection import train_test_split
 import os
+from model.model_store import ModelStore, DEFAULT_STORE_DIR, compute_artifact_key
+from model.dataset import DATA_PATH, FEATURE_COLUMNS, open_dataset
+from model.training import TrainingPipeline
+from model.tree_engine import TreeInferenceEngine
+from model.ensemble import EnsemblePredictor
+from model.approx_svm import ApproxKernelSVM
+from model.prediction_cache import PredictionCache, DEFAULT_MAX_SIZE, DEFAULT_RESOLUTION
+from utils import metrics
+
+DEFAULT_CHUNK_SIZE = 65536
+# Faster stand-ins for an exact model: trained and scored alongside it,
+# but never selected as the best model or included in the ensemble
+APPROXIMATIONS = {'svm_approx': 'svm'}
+
+def top_k_indices(probabilities, top_k):
+    """Column indices of the top_k probabilities per row, highest first"""
+    n_classes = probabilities.shape[1]
+    # Unordered top-k via argpartition, then sort just those k columns
+    part = np.argpartition(probabilities, n_classes - top_k, axis=1)[:, -top_k:]
+    part_proba = np.take_along_axis(probabilities, part, axis=1)
+    order = np.argsort(-part_proba, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
 
 class CropRecommender:
-    def __init__(self):
+    def __init__(self, data_path=DATA_PATH, store_dir=DEFAULT_STORE_DIR,
+                 use_store=True, force_retrain=False, n_jobs=-1,
+                 inference_engine='sklearn', approx_svm=False):
         # Initialize multiple models
         self.models = {
             'random_forest': RandomForestClassifier(
@@ -27,92 +49,345 @@ class CropRecommender:
                 random_state=42
             )
         }
+        if approx_svm:
+            # Nystroem-approximated RBF kernel + linear classifier, see model/approx_svm.py
+            self.models['svm_approx'] = ApproxKernelSVM(random_state=42)
 
         self.best_model = None
         self.best_model_name = None
         self.scaler = StandardScaler()
+        self.data_path = data_path
+        self.store_dir = store_dir
+        self.use_store = use_store
+        self.base_artifact_key = None
+        self.artifact_key = None
+        self.incremental_state = None
+        self.n_jobs = n_jobs
+        self.training_cache_dir = os.path.join(store_dir, 'training_cache') if use_store else None
+        self.training_timings = {}
+        self.prediction_cache = None
+        self.lookup_table = None
+        self.lookup_interpolate = False
+        self.inference_engine = 'sklearn'
+        self._engine = None
 
         try:
-            # Load and prepare data
-            data_path = "attached_assets/Crop_recommendation (1).csv"
-            if not os.path.exists(data_path):
-                raise FileNotFoundError(f"Dataset not found at {data_path}")
-
-            df = pd.read_csv(data_path)
-            if df.empty:
-                raise ValueError("Dataset is empty")
-
-            # Prepare features and target
-            X = df[['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']].values
-            y = df['label'].values
-
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
+            # Memory-mapped columnar copy of the CSV, converted on first use
+            dataset = open_dataset(data_path, os.path.join(store_dir, "datasets"))
+
+            # Reuse a stored artifact when dataset and hyperparameters match,
+            # following the head pointer to the newest incremental update
+            self.base_artifact_key = compute_artifact_key(dataset.source_sha256, self.models)
+            self.artifact_key = self.base_artifact_key
+            store = ModelStore(store_dir) if use_store else None
+            artifact = None
+            if store is not None and not force_retrain:
+                self.artifact_key = store.resolve_head(self.base_artifact_key)
+                artifact = store.load(self.artifact_key)
+                if artifact is None and self.artifact_key != self.base_artifact_key:
+                    self.artifact_key = self.base_artifact_key
+                    artifact = store.load(self.artifact_key)
 
-            # Scale features
-            self.scaler.fit(X_train)
-            X_train_scaled = self.scaler.transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-
-            # Train and evaluate models
-            best_accuracy = 0
-            model_scores = {}
-
-            for name, model in self.models.items():
-                try:
-                    # Train model
-                    model.fit(X_train_scaled, y_train)
-
-                    # Make predictions
-                    y_pred = model.predict(X_test_scaled)
-                    accuracy = accuracy_score(y_test, y_pred)
-
-                    # Cross validation
-                    cv_scores = cross_val_score(
-                        model, X_train_scaled, y_train, cv=5
-                    )
-
-                    model_scores[name] = {
-                        'accuracy': accuracy,
-                        'cv_mean': cv_scores.mean(),
-                        'cv_std': cv_scores.std()
-                    }
-
-                    # Update best model
-                    if accuracy > best_accuracy:
-                        best_accuracy = accuracy
-                        self.best_model = model
-                        self.best_model_name = name
-                except Exception as model_error:
-                    print(f"Error training {name} model: {str(model_error)}")
-                    continue
-
-            if not self.best_model:
-                raise RuntimeError("No models were successfully trained")
-
-            self.model_scores = model_scores
-            # Store unique crop labels
-            self.crop_labels = sorted(df['label'].unique())
+            if artifact is not None:
+                self._restore(artifact)
+            else:
+                self._train(dataset)
+                if store is not None:
+                    try:
+                        store.save(self.artifact_key, self._to_artifact())
+                        store.set_head(self.base_artifact_key, self.artifact_key)
+                    except OSError as store_error:
+                        print(f"Could not save model artifact: {str(store_error)}")
+
+            if inference_engine != 'sklearn':
+                self.set_inference_engine(inference_engine)
 
         except Exception as e:
             error_msg = f"Failed to initialize models: {str(e)}"
             print(error_msg)  # For debugging
+            metrics.inc('crop_errors_total', stage='model_init')
             raise RuntimeError(error_msg)
 
+    def _train(self, dataset):
+        """Train all models on a ColumnarDataset and keep the most accurate one"""
+        # Features are a zero-copy view of the memory-mapped columns; labels
+        # are already codes into the sorted label names. Models are trained
+        # on those indices (XGBoost rejects string targets), so predict_proba
+        # columns line up with crop_labels for every model
+        X = dataset.features
+        y = np.asarray(dataset.labels, dtype=np.intp)
+        self.crop_labels = list(dataset.label_names)
+
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42
+        )
+
+        # Scale features
+        self.scaler.fit(X_train)
+        X_train_scaled = self.scaler.transform(X_train)
+        X_test_scaled = self.scaler.transform(X_test)
+
+        # Train, cross-validate and evaluate all models concurrently
+        pipeline = TrainingPipeline(
+            self.models, n_jobs=self.n_jobs, cache_dir=self.training_cache_dir
+        )
+        fitted_models, model_scores = pipeline.run(
+            X_train_scaled, y_train, X_test_scaled, y_test
+        )
+        self.training_timings = pipeline.timings
+        self.models.update(fitted_models)
+
+        # Update best model
+        best_accuracy = 0
+        for name, scores in model_scores.items():
+            if name in APPROXIMATIONS:
+                continue
+            if scores['accuracy'] > best_accuracy:
+                best_accuracy = scores['accuracy']
+                self.best_model = self.models[name]
+                self.best_model_name = name
+
+        if not self.best_model:
+            raise RuntimeError("No models were successfully trained")
+
+        self.model_scores = model_scores
+        self._update_accuracy_gaps()
+
+    def _update_accuracy_gaps(self):
+        """Record how much accuracy each approximation loses against its exact model"""
+        for name, exact_name in APPROXIMATIONS.items():
+            if name in self.model_scores and exact_name in self.model_scores:
+                self.model_scores[name]['accuracy_gap'] = (
+                    self.model_scores[exact_name]['accuracy'] - self.model_scores[name]['accuracy']
+                )
+
+    def exact_model_names(self):
+        """Trained models that compete for best model, excluding approximations"""
+        return [name for name in self.model_scores if name not in APPROXIMATIONS]
+
+    def _to_artifact(self):
+        """Collect the fitted state that is persisted in the model store"""
+        return {
+            'models': self.models,
+            'best_model_name': self.best_model_name,
+            'scaler': self.scaler,
+            'crop_labels': self.crop_labels,
+            'model_scores': self.model_scores,
+            'incremental_state': self.incremental_state
+        }
+
+    def _restore(self, artifact):
+        """Load fitted state from a model store artifact"""
+        self.models = artifact['models']
+        self.best_model_name = artifact['best_model_name']
+        self.best_model = self.models[self.best_model_name]
+        self.scaler = artifact['scaler']
+        self.crop_labels = artifact['crop_labels']
+        self.model_scores = artifact['model_scores']
+        self.incremental_state = artifact.get('incremental_state')
+
     def predict(self, features):
         """
         Predict crop using the best performing model
         features: [N, P, K, temperature, humidity, ph, rainfall]
+        With a lookup table attached, inputs inside its grid are answered
+        with the table's (interpolated) probabilities for every crop.
+        """
+        with metrics.timer('crop_predict_seconds', method='predict'):
+            metrics.inc('crop_predict_rows_total')
+            table = self.lookup_table
+            if table is not None and table.artifact_key == self.artifact_key \
+                    and table.inference_engine == self.inference_engine:
+                proba, on_grid = table.lookup(features, self.lookup_interpolate)
+                if on_grid[0]:
+                    return self.crop_labels[int(proba[0].argmax())], proba[0].astype(np.float64)
+            result = self._predict_batch(np.asarray(features).reshape(1, -1), 1, DEFAULT_CHUNK_SIZE)
+            return result['labels'][0], result['probabilities'][0]
+
+    def predict_batch(self, X, top_k=3, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Predict crops for many rows at once using the best performing model
+        X: (n, 7) array or DataFrame with the FEATURE_COLUMNS columns
+        Rows are scaled and scored chunk_size at a time with a single
+        predict_proba call per chunk; labels are the argmax class.
+        Returns a dict with 'labels' (n,), 'probabilities' (n, n_classes),
+        'top_k_labels' (n, k) and 'top_k_probabilities' (n, k).
+        """
+        with metrics.timer('crop_predict_seconds', method='predict_batch'):
+            result = self._predict_batch(X, top_k, chunk_size)
+            metrics.inc('crop_predict_rows_total', len(result['labels']))
+            return result
+
+    def _predict_batch(self, X, top_k, chunk_size):
+        if not self.best_model:
+            raise RuntimeError("Models not properly initialized")
+
+        X = self._as_feature_array(X)
+        labels = np.asarray(self.crop_labels, dtype=object)
+        n_rows, n_classes = X.shape[0], len(labels)
+        top_k = min(top_k, n_classes)
+        probabilities = np.empty((n_rows, n_classes), dtype=np.float64)
+        top_k_idx = np.empty((n_rows, top_k), dtype=np.intp)
+
+        for start in range(0, n_rows, chunk_size):
+            stop = min(start + chunk_size, n_rows)
+            chunk_proba = self._chunk_proba(X[start:stop])
+            probabilities[start:stop] = chunk_proba
+            top_k_idx[start:stop] = top_k_indices(chunk_proba, top_k)
+
+        return {
+            'labels': labels[probabilities.argmax(axis=1)] if n_rows else labels[:0],
+            'probabilities': probabilities,
+            'top_k_labels': labels[top_k_idx],
+            'top_k_probabilities': np.take_along_axis(probabilities, top_k_idx, axis=1)
+        }
+
+    @staticmethod
+    def _as_feature_array(X):
+        """Validate an (n, 7) array or DataFrame and return it as float64"""
+        if isinstance(X, pd.DataFrame):
+            X = X[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(
+                f"Expected an (n, {len(FEATURE_COLUMNS)}) feature array, got shape {X.shape}"
+            )
+        return X
+
+    def enable_prediction_cache(self, max_size=DEFAULT_MAX_SIZE, ttl_seconds=None,
+                                resolution=DEFAULT_RESOLUTION):
+        """
+        Serve repeated inputs to predict/predict_batch from an LRU/TTL cache
+        keyed on features rounded to `resolution`
+        """
+        self.prediction_cache = PredictionCache(max_size, ttl_seconds, resolution)
+        self.prediction_cache.bind((self.artifact_key, self.inference_engine))
+        return self.prediction_cache
+
+    def disable_prediction_cache(self):
+        self.prediction_cache = None
+
+    def attach_lookup_table(self, table, interpolate=False):
+        """
+        Answer predict() from a precomputed DecisionTable (model/lookup_table.py).
+        The table must store every class (built with top_k=None), since
+        predict() returns the full probability vector. It is ignored while
+        the model artifact or inference engine differs from the one it was
+        built with, e.g. after an incremental update or
+        set_inference_engine('ensemble').
+        """
+        if table is not None and not table.all_classes:
+            raise ValueError("predict() needs every class's probability; build the table with top_k=None")
+        self.lookup_table = table
+        self.lookup_interpolate = interpolate
+
+    def _chunk_proba(self, X_chunk):
+        """Probabilities for one chunk of raw features, using the prediction cache if enabled"""
+        cache = self.prediction_cache
+        if cache is None:
+            return self.predict_proba_scaled(self.scaler.transform(X_chunk))
+
+        # Drops every entry if the artifact or inference engine changed since the last call
+        cache.bind((self.artifact_key, self.inference_engine))
+        keys = cache.keys_for(X_chunk)
+        proba = np.empty((len(keys), len(self.crop_labels)), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            row = cache.get(key)
+            if row is None:
+                missing.append(i)
+            else:
+                proba[i] = row
+        if missing:
+            computed = self.predict_proba_scaled(self.scaler.transform(X_chunk[missing]))
+            proba[missing] = computed
+            for i, row in zip(missing, computed):
+                cache.put(keys[i], row.copy())
+        if metrics.is_enabled():
+            metrics.inc('crop_prediction_cache_lookups_total', len(keys) - len(missing), result='hit')
+            metrics.inc('crop_prediction_cache_lookups_total', len(missing), result='miss')
+            metrics.set_gauge('crop_prediction_cache_hit_ratio', cache.stats()['hit_rate'])
+        return proba
+
+    def set_inference_engine(self, engine):
+        """
+        Choose how probabilities are computed:
+        'sklearn'    - the best model's own predict_proba
+        'flat'       - the best model as flattened NumPy tree arrays, bit-for-bit identical
+                       to its predict_proba; random_forest only, any other best model keeps
+                       its own predict_proba (FlatBooster only matches XGBoost to float32
+                       rounding, about 1e-6, so it is not used here)
+        'ensemble'   - soft vote of every trained model, scored concurrently
+        'approx_svm' - the Nystroem-approximated SVM, two dense matrix products per
+                       batch (needs approx_svm=True; see model_scores['svm_approx']
+                       for its accuracy gap)
+        """
+        if engine == 'sklearn':
+            new_engine = None
+        elif engine == 'flat':
+            new_engine = TreeInferenceEngine.for_model(self.best_model) \
+                if isinstance(self.best_model, RandomForestClassifier) else None
+        elif engine == 'ensemble':
+            new_engine = self._build_ensemble()
+        elif engine == 'approx_svm':
+            if 'svm_approx' not in self.model_scores:
+                raise ValueError("Approximate SVM not trained; create the recommender with approx_svm=True")
+            new_engine = self.models['svm_approx']
+        else:
+            raise ValueError(f"Unknown inference engine: {engine}")
+        if hasattr(self._engine, 'close'):
+            self._engine.close()
+        self._engine = new_engine
+        self.inference_engine = engine
+
+    def _build_ensemble(self, weights=None):
+        trained = {name: self.models[name] for name in self.exact_model_names()}
+        return EnsemblePredictor(trained, weights)
+
+    def predict_ensemble(self, X, top_k=3, weights=None):
+        """
+        Soft-voted prediction over all trained models for an (n, 7) array or DataFrame
+        Returns the predict_batch keys plus 'agreement' (n,), the share of
+        model weight that agrees with the ensemble's crop, and 'model_labels',
+        each model's own crop per row.
         """
         if not self.best_model:
             raise RuntimeError("Models not properly initialized")
+        ensemble = self._engine if self.inference_engine == 'ensemble' and weights is None \
+            else self._build_ensemble(weights)
+        X = self._as_feature_array(X)
+        labels = np.asarray(self.crop_labels, dtype=object)
+        if not len(X):
+            result = self.predict_batch(X, top_k)
+            result['agreement'] = np.empty(0, dtype=np.float64)
+            result['model_labels'] = {name: labels[:0] for name in self.exact_model_names()}
+            return result
+        try:
+            result = ensemble.predict(self.scaler.transform(X))
+        finally:
+            if ensemble is not self._engine:
+                ensemble.close()
+        probabilities = result['probabilities']
+        top_k_idx = top_k_indices(probabilities, min(top_k, len(labels)))
+        return {
+            'labels': labels[probabilities.argmax(axis=1)],
+            'probabilities': probabilities,
+            'top_k_labels': labels[top_k_idx],
+            'top_k_probabilities': np.take_along_axis(probabilities, top_k_idx, axis=1),
+            'agreement': result['agreement'],
+            'model_labels': {name: labels[idx] for name, idx in result['model_classes'].items()}
+        }
 
-        features_scaled = self.scaler.transform(features.reshape(1, -1))
-        prediction = self.best_model.predict(features_scaled)
-        probabilities = self.best_model.predict_proba(features_scaled)
-        return prediction[0], probabilities[0]
+    def predict_proba_scaled(self, X_scaled):
+        """
+        Class probabilities from the selected engine for already scaled
+        features (scaler.transform), columns aligned to crop_labels
+        """
+        if self._engine is not None:
+            return self._engine.predict_proba(X_scaled)
+        return self.best_model.predict_proba(X_scaled)
 
     def get_model_scores(self):
         """Return evaluation metrics for all models"""
@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from model.model_store import DEFAULT_STORE_DIR, hash_file
+from utils import metrics
+
+DATA_PATH = "attached_assets/Crop_recommendation (1).csv"
+FEATURE_COLUMNS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+LABEL_COLUMN = 'label'
+DEFAULT_DATASET_DIR = os.path.join(DEFAULT_STORE_DIR, "datasets")
+DATASET_FORMAT_VERSION = 1
+
+
+class ColumnarDataset:
+    """
+    A converted dataset opened with zero-copy memory maps.
+    columns.npy holds the features as (n_features, n_rows), so each
+    column is contiguous on disk; `features` is its (n_rows, n_features)
+    transpose view. labels.npy holds uint8/uint16 codes into the sorted
+    `label_names`, and meta.json carries per-column statistics.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = np.load(os.path.join(path, "columns.npy"), mmap_mode='r')
+        self.labels = np.load(os.path.join(path, "labels.npy"), mmap_mode='r')
+
+    @property
+    def features(self):
+        return self.columns.T
+
+    @property
+    def feature_columns(self):
+        return self.meta['feature_columns']
+
+    @property
+    def label_names(self):
+        return self.meta['label_names']
+
+    @property
+    def stats(self):
+        return self.meta['stats']
+
+    @property
+    def source_sha256(self):
+        return self.meta['source_sha256']
+
+    def column(self, name):
+        return self.columns[self.feature_columns.index(name)]
+
+    def __len__(self):
+        return self.meta['n_rows']
+
+
+def _source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _index_path(cache_dir):
+    return os.path.join(cache_dir, "index.json")
+
+
+def _read_index(cache_dir):
+    try:
+        with open(_index_path(cache_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(cache_dir, index):
+    tmp_path = f"{_index_path(cache_dir)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, _index_path(cache_dir))
+
+
+def convert_csv(csv_path, out_dir, dtype=np.float64, chunk_rows=500000, source_sha256=None):
+    """
+    Convert a labelled CSV into the columnar format in a single streaming
+    pass (labels are collected first so codes are stable), then return
+    the opened ColumnarDataset. out_dir must be a new directory; it is
+    written under a temporary name and renamed into place when complete,
+    and an existing directory is never replaced.
+    """
+    import pandas as pd
+
+    dtype = np.dtype(dtype)
+    label_values = set()
+    n_rows = 0
+    for chunk in pd.read_csv(csv_path, usecols=[LABEL_COLUMN], chunksize=chunk_rows):
+        label_values.update(chunk[LABEL_COLUMN].unique())
+        n_rows += len(chunk)
+    if n_rows == 0:
+        raise ValueError("Dataset is empty")
+    label_names = sorted(label_values)
+    label_dtype = np.uint8 if len(label_names) <= 256 else np.uint16
+
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    columns = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, "columns.npy"), mode='w+', dtype=dtype,
+        shape=(len(FEATURE_COLUMNS), n_rows)
+    )
+    labels = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, "labels.npy"), mode='w+', dtype=label_dtype, shape=(n_rows,)
+    )
+
+    start = 0
+    for chunk in pd.read_csv(csv_path, usecols=FEATURE_COLUMNS + [LABEL_COLUMN], chunksize=chunk_rows):
+        stop = start + len(chunk)
+        columns[:, start:stop] = chunk[FEATURE_COLUMNS].to_numpy(dtype=dtype).T
+        labels[start:stop] = np.searchsorted(label_names, chunk[LABEL_COLUMN].to_numpy())
+        start = stop
+
+    stats = {
+        name: {
+            'min': float(columns[i].min()),
+            'max': float(columns[i].max()),
+            'mean': float(columns[i].mean(dtype=np.float64)),
+            'std': float(columns[i].std(dtype=np.float64))
+        }
+        for i, name in enumerate(FEATURE_COLUMNS)
+    }
+    columns.flush()
+    labels.flush()
+    del columns, labels
+
+    meta = {
+        'format_version': DATASET_FORMAT_VERSION,
+        'source_sha256': source_sha256 or hash_file(csv_path),
+        'n_rows': n_rows,
+        'dtype': dtype.name,
+        'feature_columns': FEATURE_COLUMNS,
+        'label_names': [str(name) for name in label_names],
+        'label_counts': np.bincount(
+            np.load(os.path.join(tmp_dir, "labels.npy"), mmap_mode='r'),
+            minlength=len(label_names)
+        ).tolist(),
+        'stats': stats
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    try:
+        os.rename(tmp_dir, out_dir)
+    except OSError:
+        # Another process finished converting into the same directory first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return ColumnarDataset(out_dir)
+
+
+@metrics.timed('crop_dataset_load_seconds')
+def open_dataset(csv_path=DATA_PATH, cache_dir=DEFAULT_DATASET_DIR, dtype=np.float64):
+    """
+    Open the columnar copy of csv_path, converting it first if needed.
+    The CSV is only re-hashed when its size or mtime changed since the
+    last conversion, so warm starts never read the CSV at all.
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"Dataset not found at {csv_path}")
+
+    dtype_name = np.dtype(dtype).name
+    index_key = f"{os.path.abspath(csv_path)}:{dtype_name}"
+    index = _read_index(cache_dir)
+    entry = index.get(index_key)
+    signature = _source_signature(csv_path)
+    if entry and entry['signature'] == signature:
+        path = os.path.join(cache_dir, entry['dataset'])
+        if os.path.exists(os.path.join(path, "meta.json")):
+            return ColumnarDataset(path)
+
+    sha256 = hash_file(csv_path)
+    base_name = f"dataset-{sha256[:16]}-{dtype_name}"
+    os.makedirs(cache_dir, exist_ok=True)
+    # Same content under another path, or touched without changing: reuse that conversion
+    name = next((
+        other['dataset'] for other in [entry] + list(index.values())
+        if other and other['dataset'].startswith(base_name) and _is_current(os.path.join(cache_dir, other['dataset']))
+    ), None)
+    if name is None:
+        # Every conversion gets its own directory, so readers of an older
+        # one never see its files disappear or change under them
+        name = f"{base_name}-{time.time_ns():x}{os.getpid():x}"
+        convert_csv(csv_path, os.path.join(cache_dir, name), dtype=dtype, source_sha256=sha256)
+
+    # Move the pointer, then delete the conversion it replaced unless something still uses it
+    index = _read_index(cache_dir)
+    previous = index.get(index_key)
+    index[index_key] = {'signature': signature, 'dataset': name}
+    _write_index(cache_dir, index)
+    if previous and previous['dataset'] != name and \
+            all(other['dataset'] != previous['dataset'] for other in index.values()):
+        shutil.rmtree(os.path.join(cache_dir, previous['dataset']), ignore_errors=True)
+    return ColumnarDataset(os.path.join(cache_dir, name))
+
+
+def _is_current(path):
+    """Whether path holds a complete conversion in the current format"""
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            return json.load(f).get('format_version') == DATASET_FORMAT_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+def load_dataset_stats(csv_path=DATA_PATH, cache_dir=DEFAULT_DATASET_DIR):
+    """Per-column min/max/mean/std without scanning the data"""
+    return open_dataset(csv_path, cache_dir).stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a crop CSV into the memory-mapped columnar format")
+    parser.add_argument('--csv', default=DATA_PATH, help="Labelled CSV to convert")
+    parser.add_argument('--cache-dir', default=DEFAULT_DATASET_DIR, help="Where converted datasets live")
+    parser.add_argument('--dtype', default='float64', choices=['float32', 'float64'],
+                        help="Feature dtype (float32 halves size; float64 keeps training identical)")
+    args = parser.parse_args(argv)
+
+    dataset = open_dataset(args.csv, args.cache_dir, dtype=args.dtype)
+    print(f"{len(dataset):,} rows, {len(dataset.label_names)} labels -> {dataset.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class EnsemblePredictor:
+    """
+    Soft-voting ensemble over already fitted models.
+    Callers scale features once; each model's predict_proba then runs on
+    its own thread. The tree traversals in sklearn and XGBoost release the
+    GIL, so latency tracks the slowest model rather than the sum.
+    """
+
+    def __init__(self, models, weights=None):
+        if not models:
+            raise ValueError("Ensemble needs at least one model")
+        self.models = dict(models)
+        weights = weights or {}
+        total = sum(weights.get(name, 1.0) for name in self.models)
+        self.weights = {name: weights.get(name, 1.0) / total for name in self.models}
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.models), thread_name_prefix="ensemble"
+        )
+
+    def predict_all(self, X_scaled):
+        """Return {model_name: probabilities}, scoring all models concurrently"""
+        futures = {
+            name: self._executor.submit(model.predict_proba, X_scaled)
+            for name, model in self.models.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def predict_proba(self, X_scaled):
+        return self.predict(X_scaled)['probabilities']
+
+    def predict(self, X_scaled):
+        """
+        Soft-voted probabilities plus per-model detail:
+        'probabilities'  weighted mean of the model probabilities
+        'model_classes'  {name: argmax class index per row}
+        'agreement'      share of ensemble weight whose model picks the ensemble's class
+        """
+        per_model = self.predict_all(X_scaled)
+        probabilities = sum(self.weights[name] * proba for name, proba in per_model.items())
+        ensemble_class = probabilities.argmax(axis=1)
+        model_classes = {name: proba.argmax(axis=1) for name, proba in per_model.items()}
+        agreement = sum(
+            self.weights[name] * (classes == ensemble_class)
+            for name, classes in model_classes.items()
+        )
+        return {
+            'probabilities': probabilities,
+            'model_classes': model_classes,
+            'agreement': np.asarray(agreement, dtype=np.float64)
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
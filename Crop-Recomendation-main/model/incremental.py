@@ -0,0 +1,234 @@
+import argparse
+import copy
+import hashlib
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH, FEATURE_COLUMNS
+from model.dataset import LABEL_COLUMN, open_dataset
+from model.model_store import DEFAULT_STORE_DIR, ModelStore
+
+DEFAULT_TREES_PER_UPDATE = 10
+DEFAULT_BOOST_ROUNDS_PER_UPDATE = 10
+DEFAULT_HOLDOUT_SIZE = 500
+DEFAULT_REPLAY_PER_CLASS = 20
+DEFAULT_SVM_WINDOW = 5000
+# Rolling accuracy only counts towards model comparison once it has this many samples
+MIN_HOLDOUT_SAMPLES = 200
+
+
+class IncrementalTrainer:
+    """
+    Update a trained CropRecommender with newly labelled samples.
+    Update cost does not grow with the history; it is proportional to the
+    new batch except for the SVM refit, which is bounded by svm_window:
+    - new rows are appended to an append-only samples log
+    - every model is first scored on the batch before it is trained on it
+      (test-then-train), and the last holdout_size outcomes per model form
+      the rolling holdout; once it has MIN_HOLDOUT_SAMPLES outcomes, model
+      comparison uses its accuracy blended with the full-training accuracy,
+      weighted n / (n + holdout_size), so one noisy batch cannot flip
+      best_model on its own
+    - recommender.scaler stays the one every model was first fitted
+      with, so the trees never change scale; a running scaler on top of
+      it absorbs each batch's mean/variance instead
+    - the forest grows trees_per_update trees and XGBoost continues
+      boosting from its booster, both on the batch plus a small per-class
+      replay buffer (sklearn and XGBoost need every class present in a fit)
+    - the SVM (and its approximation, if trained), which cannot warm
+      start, is refit every update on the svm_window most recent samples
+      (up to svm_window rows) and stored as a Pipeline with a copy of the
+      running scaler in front of it, since RBF kernels depend on scale
+    """
+
+    def __init__(self, recommender, trees_per_update=DEFAULT_TREES_PER_UPDATE,
+                 boost_rounds_per_update=DEFAULT_BOOST_ROUNDS_PER_UPDATE,
+                 holdout_size=DEFAULT_HOLDOUT_SIZE, replay_per_class=DEFAULT_REPLAY_PER_CLASS,
+                 svm_window=DEFAULT_SVM_WINDOW):
+        self.recommender = recommender
+        self.trees_per_update = trees_per_update
+        self.boost_rounds_per_update = boost_rounds_per_update
+        self.holdout_size = holdout_size
+        self.replay_per_class = replay_per_class
+        self.svm_window = svm_window
+        self.samples_log = os.path.join(recommender.store_dir, "incremental", "samples.csv")
+        if recommender.incremental_state is None:
+            recommender.incremental_state = self._initial_state()
+        self.state = recommender.incremental_state
+
+    def _initial_state(self):
+        """Seed the replay buffer and SVM window from the original training data"""
+        dataset = open_dataset(
+            self.recommender.data_path, os.path.join(self.recommender.store_dir, "datasets")
+        )
+        X = np.asarray(dataset.features, dtype=np.float64)
+        y = np.asarray(dataset.labels, dtype=np.intp)
+        running_scaler = StandardScaler().fit(self.recommender.scaler.transform(X))
+        replay = {}
+        for code in range(len(self.recommender.crop_labels)):
+            idx = np.flatnonzero(y == code)[-self.replay_per_class:]
+            replay[code] = deque(zip(X[idx], y[idx]), maxlen=self.replay_per_class)
+        window_idx = np.arange(max(0, len(y) - self.svm_window), len(y))
+        return {
+            'updates': 0,
+            'samples_seen': 0,
+            'scaler': running_scaler,
+            'replay': replay,
+            'svm_window': deque(zip(X[window_idx], y[window_idx]), maxlen=self.svm_window),
+            'rolling': {name: deque(maxlen=self.holdout_size) for name in self.recommender.models}
+        }
+
+    def ingest(self, samples):
+        """Validate new labelled samples and append them to the samples log"""
+        missing = [col for col in FEATURE_COLUMNS + [LABEL_COLUMN] if col not in samples.columns]
+        if missing:
+            raise ValueError(f"Samples are missing columns: {', '.join(missing)}")
+        labels = samples[LABEL_COLUMN].astype(str).to_numpy()
+        unknown = sorted(set(labels) - set(self.recommender.crop_labels))
+        if unknown:
+            raise ValueError(
+                f"Unknown crops {', '.join(unknown)}; adding classes requires a full retrain"
+            )
+
+        os.makedirs(os.path.dirname(self.samples_log), exist_ok=True)
+        write_header = not os.path.exists(self.samples_log)
+        samples[FEATURE_COLUMNS + [LABEL_COLUMN]].to_csv(
+            self.samples_log, mode='a', header=write_header, index=False
+        )
+        X = samples[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        y = np.searchsorted(self.recommender.crop_labels, labels)
+        return X, y
+
+    def update(self, samples):
+        """Ingest a DataFrame of labelled samples and update every model"""
+        recommender = self.recommender
+        timings = {}
+        start = time.perf_counter()
+        X_new, y_new = self.ingest(samples)
+        if len(y_new) == 0:
+            return {}
+
+        # Test-then-train: score each model on data it has not seen yet
+        X_new_scaled = recommender.scaler.transform(X_new)
+        for name, model in recommender.models.items():
+            if name in recommender.model_scores:
+                correct = model.predict(X_new_scaled) == y_new
+                self.state['rolling'].setdefault(name, deque(maxlen=self.holdout_size)).extend(correct)
+        timings['evaluate'] = time.perf_counter() - start
+
+        step = time.perf_counter()
+        self.state['scaler'].partial_fit(X_new_scaled)
+        timings['scaler'] = time.perf_counter() - step
+
+        # Fit set for warm starts: the new batch plus the per-class replay buffer
+        replay = [sample for buffer in self.state['replay'].values() for sample in buffer]
+        X_fit = np.vstack([X_new] + [x[None, :] for x, _ in replay])
+        y_fit = np.concatenate([y_new, np.array([label for _, label in replay], dtype=np.intp)])
+        X_fit_scaled = recommender.scaler.transform(X_fit)
+
+        for name, fit in (('random_forest', self._grow_forest), ('xgboost', self._continue_boosting)):
+            if name in recommender.model_scores:
+                step = time.perf_counter()
+                fit(recommender.models[name], X_fit_scaled, y_fit)
+                timings[name] = time.perf_counter() - step
+
+        for x, label in zip(X_new, y_new):
+            self.state['replay'][int(label)].append((x, label))
+        self.state['svm_window'].extend(zip(X_new, y_new))
+
+        X_window = np.array([x for x, _ in self.state['svm_window']])
+        y_window = np.array([label for _, label in self.state['svm_window']], dtype=np.intp)
+        running_scaler = copy.deepcopy(self.state['scaler'])
+        X_window_scaled = running_scaler.transform(recommender.scaler.transform(X_window))
+        for name in ('svm', 'svm_approx'):
+            if name in recommender.model_scores:
+                step = time.perf_counter()
+                model = recommender.models[name]
+                if isinstance(model, Pipeline):
+                    model = model.steps[-1][1]
+                svm = clone(model).fit(X_window_scaled, y_window)
+                recommender.models[name] = Pipeline([('running_scaler', running_scaler), (name, svm)])
+                timings[name] = time.perf_counter() - step
+
+        self._select_best_model()
+        self.state['updates'] += 1
+        self.state['samples_seen'] += len(y_new)
+        self._advance_artifact(X_new, y_new)
+        timings['total'] = time.perf_counter() - start
+        return timings
+
+    def _grow_forest(self, forest, X, y):
+        forest.set_params(
+            warm_start=True,
+            n_estimators=len(forest.estimators_) + self.trees_per_update
+        )
+        forest.fit(X, y)
+
+    def _continue_boosting(self, model, X, y):
+        booster = model.get_booster()
+        continued = clone(model).set_params(n_estimators=self.boost_rounds_per_update)
+        continued.fit(X, y, xgb_model=booster)
+        self.recommender.models['xgboost'] = continued
+
+    def _select_best_model(self):
+        recommender = self.recommender
+        for name, outcomes in self.state['rolling'].items():
+            if name in recommender.model_scores and len(outcomes) >= MIN_HOLDOUT_SAMPLES:
+                scores = recommender.model_scores[name]
+                trained = scores.setdefault('trained_accuracy', scores['accuracy'])
+                weight = len(outcomes) / (len(outcomes) + self.holdout_size)
+                scores['rolling_accuracy'] = float(np.mean(outcomes))
+                scores['accuracy'] = (1 - weight) * trained + weight * scores['rolling_accuracy']
+                scores['rolling_samples'] = len(outcomes)
+
+        recommender._update_accuracy_gaps()
+        best_name = max(recommender.exact_model_names(),
+                        key=lambda n: recommender.model_scores[n]['accuracy'])
+        recommender.best_model_name = best_name
+        recommender.best_model = recommender.models[best_name]
+        if recommender.inference_engine != 'sklearn':
+            recommender.set_inference_engine(recommender.inference_engine)
+
+    def _advance_artifact(self, X_new, y_new):
+        """Give the updated model a new artifact key (invalidating caches) and persist it"""
+        recommender = self.recommender
+        digest = hashlib.sha256(recommender.artifact_key.encode('utf-8'))
+        digest.update(np.ascontiguousarray(X_new).tobytes())
+        digest.update(np.ascontiguousarray(y_new).tobytes())
+        recommender.artifact_key = digest.hexdigest()[:16]
+        if recommender.use_store:
+            store = ModelStore(recommender.store_dir)
+            store.save(recommender.artifact_key, recommender._to_artifact())
+            store.set_head(recommender.base_artifact_key, recommender.artifact_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally update the stored recommender with new samples")
+    parser.add_argument('samples', help="CSV of new labelled samples (feature columns plus 'label')")
+    parser.add_argument('--data', default=DATA_PATH, help="Original training CSV")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Model artifact directory")
+    parser.add_argument('--trees-per-update', type=int, default=DEFAULT_TREES_PER_UPDATE)
+    parser.add_argument('--boost-rounds-per-update', type=int, default=DEFAULT_BOOST_ROUNDS_PER_UPDATE)
+    args = parser.parse_args(argv)
+
+    recommender = CropRecommender(data_path=args.data, store_dir=args.store_dir)
+    trainer = IncrementalTrainer(
+        recommender,
+        trees_per_update=args.trees_per_update,
+        boost_rounds_per_update=args.boost_rounds_per_update
+    )
+    timings = trainer.update(pd.read_csv(args.samples))
+    breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+    print(f"Update {trainer.state['updates']} -> artifact {recommender.artifact_key} "
+          f"(best: {recommender.best_model_name}); {breakdown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import itertools
+import os
+import time
+
+import numpy as np
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH, FEATURE_COLUMNS, top_k_indices
+from model.dataset import open_dataset
+from model.model_store import DEFAULT_STORE_DIR
+
+DEFAULT_BINS = 8
+DEFAULT_TOP_K = 3
+BUILD_CHUNK_SIZE = 65536
+
+
+class DecisionTable:
+    """
+    The recommender's top-k decisions precomputed on a regular grid.
+    Each feature's [low, high] range (the slider range) is split into
+    bins - 1 equal steps; every grid node stores its top-k class indices
+    as uint8 and their probabilities as float16, so an 8-bin grid over the
+    7 features is 8**7 nodes * 9 bytes = 19 MB. Built with top_k=None it
+    stores every class's probability instead (labels is None), 44 bytes
+    per node for 22 crops, which is what CropRecommender.predict needs.
+    lookup() snaps inputs to the nearest node, or with interpolate=True
+    blends the 2**7 surrounding nodes multilinearly. Rows outside the
+    grid are reported through the on_grid mask for the caller to score
+    with the real model. artifact_key and inference_engine record the
+    model the table was built from.
+    """
+
+    def __init__(self, lows, highs, bins, labels, probabilities, crop_labels, artifact_key=None,
+                 inference_engine='sklearn'):
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.bins = np.asarray(bins, dtype=np.intp)
+        self.labels = labels
+        self.probabilities = probabilities
+        self.crop_labels = list(crop_labels)
+        self.artifact_key = artifact_key
+        self.inference_engine = inference_engine
+        self.all_classes = labels is None
+        self.steps = np.where(self.bins > 1, (self.highs - self.lows) / np.maximum(self.bins - 1, 1), 1.0)
+        # (2**n_features, n_features) offsets of a grid cell's corners, for interpolation
+        self.corners = np.array(list(itertools.product((0, 1), repeat=len(self.lows))), dtype=np.intp)
+
+    @classmethod
+    def build(cls, recommender, bins=DEFAULT_BINS, top_k=DEFAULT_TOP_K, ranges=None,
+              chunk_size=BUILD_CHUNK_SIZE):
+        """
+        Evaluate recommender on every grid node.
+        bins is one count for all features or one per FEATURE_COLUMNS entry;
+        ranges maps feature -> (low, high) and defaults to the dataset min/max;
+        top_k=None stores every class.
+        """
+        if ranges is None:
+            stats = open_dataset(
+                recommender.data_path, os.path.join(recommender.store_dir, "datasets")
+            ).stats
+            ranges = {name: (stats[name]['min'], stats[name]['max']) for name in FEATURE_COLUMNS}
+        lows = np.array([ranges[name][0] for name in FEATURE_COLUMNS], dtype=np.float64)
+        highs = np.array([ranges[name][1] for name in FEATURE_COLUMNS], dtype=np.float64)
+        bins = np.broadcast_to(np.asarray(bins, dtype=np.intp), lows.shape).copy()
+        if (bins < 1).any():
+            raise ValueError("Every feature needs at least one bin")
+
+        n_classes = len(recommender.crop_labels)
+        if n_classes > 256:
+            raise ValueError("uint8 label indices support at most 256 classes")
+        n_nodes = int(np.prod(bins))
+        if top_k is None:
+            labels = None
+            probabilities = np.empty((n_nodes, n_classes), dtype=np.float16)
+        else:
+            top_k = min(top_k, n_classes)
+            labels = np.empty((n_nodes, top_k), dtype=np.uint8)
+            probabilities = np.empty((n_nodes, top_k), dtype=np.float16)
+
+        table = cls(lows, highs, bins, labels, probabilities,
+                    recommender.crop_labels, recommender.artifact_key, recommender.inference_engine)
+        for start in range(0, n_nodes, chunk_size):
+            stop = min(start + chunk_size, n_nodes)
+            nodes = np.stack(np.unravel_index(np.arange(start, stop), bins), axis=1)
+            proba = recommender.predict_proba_scaled(
+                recommender.scaler.transform(table.lows + nodes * table.steps)
+            )
+            if labels is None:
+                probabilities[start:stop] = proba
+                continue
+            idx = top_k_indices(proba, top_k)
+            labels[start:stop] = idx
+            probabilities[start:stop] = np.take_along_axis(proba, idx, axis=1)
+        return table
+
+    @property
+    def nbytes(self):
+        return (0 if self.labels is None else self.labels.nbytes) + self.probabilities.nbytes
+
+    def lookup(self, X, interpolate=False):
+        """
+        Table probabilities for an (n, 7) array.
+        Returns (probabilities, on_grid): probabilities is (n, n_classes)
+        float32 with only the stored top-k entries non-zero (more when
+        interpolating; every entry for an all-classes table), and all zero
+        for rows where on_grid is False.
+        """
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.lows))
+        on_grid = ((X >= self.lows) & (X <= self.highs)).all(axis=1)
+        probabilities = np.zeros((len(X), len(self.crop_labels)), dtype=np.float32)
+        rows = np.flatnonzero(on_grid)
+        if not len(rows):
+            return probabilities, on_grid
+
+        position = (X[rows] - self.lows) / self.steps
+        if not interpolate:
+            nodes = np.clip(np.rint(position).astype(np.intp), 0, self.bins - 1)
+            flat = np.ravel_multi_index(nodes.T, self.bins)
+            if self.labels is None:
+                probabilities[rows] = self.probabilities[flat]
+            else:
+                probabilities[rows[:, None], self.labels[flat]] = self.probabilities[flat]
+            return probabilities, on_grid
+
+        # All 2**7 corners of each row's grid cell at once: (rows, corners, ...)
+        lower = np.clip(np.floor(position).astype(np.intp), 0, np.maximum(self.bins - 2, 0))
+        fraction = np.clip(position - lower, 0.0, 1.0)[:, None, :]
+        nodes = np.minimum(lower[:, None, :] + self.corners, self.bins - 1)
+        weight = np.prod(np.where(self.corners == 1, fraction, 1.0 - fraction), axis=2)
+        flat = np.ravel_multi_index(np.moveaxis(nodes, 2, 0), self.bins)
+        if self.labels is None:
+            probabilities[rows] = np.einsum('rc,rcn->rn', weight, self.probabilities[flat].astype(np.float32))
+            return probabilities, on_grid
+        contribution = weight[:, :, None] * self.probabilities[flat]
+        target = (np.arange(len(rows))[:, None, None] * probabilities.shape[1] + self.labels[flat]).ravel()
+        probabilities[rows] = np.bincount(
+            target, weights=contribution.ravel(), minlength=len(rows) * probabilities.shape[1]
+        ).reshape(len(rows), -1)
+        return probabilities, on_grid
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path, lows=self.lows, highs=self.highs, bins=self.bins,
+            labels=np.empty((0, 0), dtype=np.uint8) if self.labels is None else self.labels,
+            probabilities=self.probabilities,
+            crop_labels=np.array(self.crop_labels), artifact_key=np.array(self.artifact_key or ''),
+            inference_engine=np.array(self.inference_engine)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            labels = data['labels'] if data['labels'].size else None
+            return cls(
+                data['lows'], data['highs'], data['bins'], labels, data['probabilities'],
+                data['crop_labels'].tolist(), str(data['artifact_key']) or None,
+                str(data['inference_engine']) if 'inference_engine' in data else 'sklearn'
+            )
+
+
+def table_path(recommender, bins=DEFAULT_BINS, top_k=DEFAULT_TOP_K):
+    engine = '' if recommender.inference_engine == 'sklearn' else f"-{recommender.inference_engine}"
+    k = 'all' if top_k is None else top_k
+    return os.path.join(
+        recommender.store_dir, "lookup", f"lookup-{recommender.artifact_key}{engine}-b{bins}-k{k}.npz"
+    )
+
+
+def load_or_build(recommender, bins=DEFAULT_BINS, top_k=DEFAULT_TOP_K):
+    """Load the table for the recommender's current artifact and engine, building and saving it if missing"""
+    path = table_path(recommender, bins, top_k)
+    if os.path.exists(path):
+        try:
+            return DecisionTable.load(path)
+        except (OSError, ValueError, KeyError):
+            pass
+    table = DecisionTable.build(recommender, bins, top_k)
+    if recommender.use_store:
+        try:
+            table.save(path)
+        except OSError as e:
+            print(f"Could not save lookup table: {str(e)}")
+    return table
+
+
+def measure_tradeoff(recommender, bin_counts, top_k=DEFAULT_TOP_K, n_uniform=20000, seed=42):
+    """
+    Accuracy vs memory for each grid resolution.
+    Agreement is the share of rows where the table's crop equals the
+    model's: on the training rows (the realistic input distribution) and
+    on points drawn uniformly over the slider ranges. Accuracy is against
+    the dataset's true labels.
+    """
+    dataset = open_dataset(recommender.data_path, os.path.join(recommender.store_dir, "datasets"))
+    X_data = np.asarray(dataset.features, dtype=np.float64)
+    y_data = np.asarray(dataset.labels, dtype=np.intp)
+    stats = dataset.stats
+    lows = np.array([stats[name]['min'] for name in FEATURE_COLUMNS])
+    highs = np.array([stats[name]['max'] for name in FEATURE_COLUMNS])
+    X_uniform = np.random.default_rng(seed).uniform(lows, highs, size=(n_uniform, len(lows)))
+    model_data = recommender.predict_proba_scaled(recommender.scaler.transform(X_data)).argmax(axis=1)
+    model_uniform = recommender.predict_proba_scaled(recommender.scaler.transform(X_uniform)).argmax(axis=1)
+
+    results = [{
+        'bins': 'model', 'nodes': None, 'megabytes': None, 'build_seconds': None,
+        'lookup_us': None, 'agreement_data': 1.0, 'agreement_uniform': 1.0,
+        'agreement_data_interpolated': None, 'accuracy_data': float(np.mean(model_data == y_data))
+    }]
+    for bins in bin_counts:
+        start = time.perf_counter()
+        table = DecisionTable.build(recommender, bins, top_k)
+        build_seconds = time.perf_counter() - start
+
+        table.lookup(X_data[:1])
+        start = time.perf_counter()
+        for row in X_data[:200]:
+            table.lookup(row)
+        lookup_us = (time.perf_counter() - start) / 200 * 1e6
+
+        table_data = table.lookup(X_data)[0].argmax(axis=1)
+        table_uniform = table.lookup(X_uniform)[0].argmax(axis=1)
+        interpolated = table.lookup(X_data, interpolate=True)[0].argmax(axis=1)
+        results.append({
+            'bins': bins,
+            'nodes': int(np.prod(table.bins)),
+            'megabytes': table.nbytes / 1e6,
+            'build_seconds': build_seconds,
+            'lookup_us': lookup_us,
+            'agreement_data': float(np.mean(table_data == model_data)),
+            'agreement_uniform': float(np.mean(table_uniform == model_uniform)),
+            'agreement_data_interpolated': float(np.mean(interpolated == model_data)),
+            'accuracy_data': float(np.mean(table_data == y_data))
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the recommender's decisions on a feature grid")
+    parser.add_argument('--bins', type=int, nargs='+', default=[DEFAULT_BINS],
+                        help="Grid points per feature; several values with --measure")
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+    parser.add_argument('--all-classes', action='store_true',
+                        help="Store every class's probability (what CropRecommender.predict needs)")
+    parser.add_argument('--measure', action='store_true',
+                        help="Report agreement with the model and memory for each --bins value")
+    parser.add_argument('--data', default=DATA_PATH, help="Training CSV")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Model artifact directory")
+    args = parser.parse_args(argv)
+    if args.all_classes:
+        args.top_k = None
+
+    recommender = CropRecommender(data_path=args.data, store_dir=args.store_dir)
+    if not args.measure:
+        for bins in args.bins:
+            table = load_or_build(recommender, bins, args.top_k)
+            print(f"{int(np.prod(table.bins)):,} nodes, {table.nbytes / 1e6:.1f} MB "
+                  f"-> {table_path(recommender, bins, args.top_k)}")
+        return
+
+    def fmt(value, spec):
+        return '-' if value is None else format(value, spec)
+
+    print(f"{'bins':>6} {'nodes':>10} {'MB':>8} {'build s':>8} {'lookup us':>10} "
+          f"{'agree data':>11} {'agree unif':>11} {'agree interp':>13} {'accuracy':>9}")
+    for row in measure_tradeoff(recommender, args.bins, args.top_k):
+        print(f"{row['bins']:>6} {fmt(row['nodes'], ',d'):>10} {fmt(row['megabytes'], '.2f'):>8} "
+              f"{fmt(row['build_seconds'], '.1f'):>8} {fmt(row['lookup_us'], '.1f'):>10} "
+              f"{row['agreement_data']:>11.2%} {row['agreement_uniform']:>11.2%} "
+              f"{fmt(row['agreement_data_interpolated'], '.2%'):>13} {row['accuracy_data']:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
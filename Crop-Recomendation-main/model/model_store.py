@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import joblib
+
+DEFAULT_STORE_DIR = "artifacts"
+ARTIFACT_VERSION = 3
+# Incrementally updated artifacts kept per base artifact; older ones are deleted
+DEFAULT_KEEP_UPDATES = 3
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_artifact_key(dataset_sha256, models):
+    """
+    Build the cache key for a trained recommender.
+    dataset_sha256 is the digest of the training CSV (see hash_file).
+    The key changes whenever the dataset bytes, any model hyperparameter,
+    the artifact format or the installed sklearn/xgboost versions change.
+    """
+    import sklearn
+    import xgboost
+
+    params = {
+        name: {k: repr(v) for k, v in sorted(model.get_params().items())}
+        for name, model in sorted(models.items())
+    }
+    payload = json.dumps({
+        'artifact_version': ARTIFACT_VERSION,
+        'dataset_sha256': dataset_sha256,
+        'params': params,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ModelStore:
+    """
+    Directory of joblib artifacts, one file per artifact key.
+    Each base artifact has a head file listing its incremental updates,
+    oldest first; only the newest keep_updates of them are kept on disk.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, keep_updates=DEFAULT_KEEP_UPDATES):
+        self.store_dir = store_dir
+        self.keep_updates = keep_updates
+
+    def path_for(self, key):
+        return os.path.join(self.store_dir, f"crop_recommender-{key}.joblib")
+
+    def exists(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def load(self, key):
+        """Return the stored artifact for key, or None if missing or unreadable"""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            artifact = joblib.load(path)
+        except Exception as e:
+            print(f"Ignoring unreadable model artifact {path}: {str(e)}")
+            return None
+        if artifact.get('version') != ARTIFACT_VERSION or artifact.get('key') != key:
+            return None
+        return artifact
+
+    def head_path(self, base_key):
+        return os.path.join(self.store_dir, f"crop_recommender-{base_key}.head")
+
+    def _read_updates(self, base_key):
+        try:
+            with open(self.head_path(base_key)) as f:
+                return [line.strip() for line in f if line.strip()]
+        except OSError:
+            return []
+
+    def resolve_head(self, base_key):
+        """Return the newest incrementally updated key derived from base_key"""
+        updates = self._read_updates(base_key)
+        return updates[-1] if updates and self.exists(updates[-1]) else base_key
+
+    def set_head(self, base_key, key):
+        """
+        Point base_key at a newer artifact, deleting updates beyond
+        keep_updates; pointing it back at itself deletes all its updates.
+        """
+        path = self.head_path(base_key)
+        updates = self._read_updates(base_key)
+        if key == base_key:
+            kept = []
+        else:
+            kept = ([k for k in updates if k != key] + [key])[-max(self.keep_updates, 1):]
+        if kept:
+            os.makedirs(self.store_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write("\n".join(kept) + "\n")
+            os.replace(tmp_path, path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+        # Delete only after the head no longer lists them
+        for old_key in set(updates) - set(kept) - {base_key}:
+            try:
+                os.remove(self.path_for(old_key))
+            except OSError:
+                pass
+
+    def save(self, key, artifact):
+        """Atomically write an artifact so concurrent replicas never read a partial file"""
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(dict(artifact, version=ARTIFACT_VERSION, key=key), tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+
+def main(argv=None):
+    """Build the model artifact ahead of deployment"""
+    from model.crop_recommendation_model import CropRecommender, DATA_PATH
+
+    parser = argparse.ArgumentParser(description="Build the CropRecommender model artifact")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Train (if needed) and store the model artifact")
+    build.add_argument('--data', default=DATA_PATH, help="Path to the training CSV")
+    build.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Artifact directory")
+    build.add_argument('--force', action='store_true', help="Retrain even if the artifact exists")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    recommender = CropRecommender(
+        data_path=args.data,
+        store_dir=args.store_dir,
+        force_retrain=args.force
+    )
+    elapsed = time.perf_counter() - start
+    path = ModelStore(args.store_dir).path_for(recommender.artifact_key)
+    print(f"Artifact {recommender.artifact_key} ({recommender.best_model_name}) "
+          f"ready at {path} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_RESOLUTION = 0.01
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU/TTL cache of class-probability rows.
+    Keys are feature vectors rounded to `resolution`, so inputs that only
+    differ below that resolution share one entry. The cache is bound to a
+    model key (the recommender's artifact key and inference engine) and
+    empties itself when the key changes.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl_seconds=None, resolution=DEFAULT_RESOLUTION):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.resolution = resolution
+        self.model_key = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def keys_for(self, X):
+        """Return one hashable key per row of an (n, d) feature array"""
+        quantized = np.round(np.asarray(X, dtype=np.float64) / self.resolution).astype(np.int64)
+        return [row.tobytes() for row in quantized]
+
+    def bind(self, model_key):
+        """Associate the cache with a model, clearing it if the model changed"""
+        with self._lock:
+            if model_key != self.model_key:
+                self._entries.clear()
+                self.model_key = model_key
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,93 @@
+import numpy as np
+
+DEFAULT_RISK_AVERSION = 0.5
+# Crops the classifier gives less probability than this are not ranked
+DEFAULT_MIN_PROBABILITY = 0.05
+
+
+class ProfitRanker:
+    """
+    Rank crops by classifier probability times per-hectare profit.
+    The profit vector is computed once, aligned to the recommender's
+    get_crop_labels() through the crop registry: profit per hectare or, with a
+    RiskEngine, a risk-adjusted figure (1 - risk_aversion) * mean profit
+    + risk_aversion * 5th-percentile profit. Ranking a batch is then one
+    broadcast multiply over the (n, classes) probability matrix; equal
+    scores are ranked by probability.
+    Classifier crops without economics in the registry are never ranked.
+    """
+
+    def __init__(self, recommender, economic_analyzer, risk_engine=None,
+                 risk_aversion=DEFAULT_RISK_AVERSION, min_probability=DEFAULT_MIN_PROBABILITY, **risk_params):
+        if not 0 <= risk_aversion <= 1:
+            raise ValueError("risk_aversion must be between 0 and 1")
+        self.recommender = recommender
+        self.labels = np.asarray(recommender.get_crop_labels(), dtype=object)
+        self.min_probability = min_probability
+
+        # Crop registry IDs of the classifier's classes (the identity for the shipped registry)
+        registry = economic_analyzer.registry
+        ids = registry.ids(self.labels)
+        self.known = (ids >= 0) & registry.has_economics[np.maximum(ids, 0)]
+        known_ids = ids[self.known]
+
+        profit = np.zeros(len(self.labels))
+        if risk_engine is not None:
+            risk = risk_engine.simulate(list(registry.names[known_ids]), **risk_params)
+            profit[self.known] = (1 - risk_aversion) * risk['mean_profit'].to_numpy() + \
+                risk_aversion * risk['p5'].to_numpy()
+        else:
+            profit[self.known] = registry.profit_per_hectare[known_ids]
+        self.profit_per_hectare = profit
+
+    def rank_probabilities(self, probabilities, top_k=3, area_hectares=1.0):
+        """
+        Rank an (n, classes) probability matrix. Returns {'labels',
+        'scores', 'probabilities', 'profit'} (each (n, top_k), scores being
+        probability * profit for area_hectares) and
+        'expected_profit', the (n,) profit averaged over the eligible crops
+        weighted by their renormalized probabilities (NaN if none is eligible).
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if probabilities.ndim != 2 or probabilities.shape[1] != len(self.labels):
+            raise ValueError(f"Expected an (n, {len(self.labels)}) probability matrix, got shape {probabilities.shape}")
+        profit = self.profit_per_hectare * area_hectares
+        scores = probabilities * profit
+        eligible = (probabilities >= self.min_probability) & self.known
+        ranked = np.where(eligible, scores, -np.inf)
+        eligible_probability = np.where(eligible, probabilities, 0.0)
+        total_probability = eligible_probability.sum(axis=1)
+
+        top_k = min(top_k, len(self.labels))
+        # Highest score first, then highest probability
+        top_idx = np.lexsort((-probabilities, -ranked), axis=1)[:, :top_k]
+        top_scores = np.take_along_axis(ranked, top_idx, axis=1)
+        # Rows with fewer than top_k eligible crops: blank out the rest
+        filled = np.isfinite(top_scores)
+        return {
+            'labels': np.where(filled, self.labels[top_idx], None),
+            'scores': np.where(filled, top_scores, np.nan),
+            'probabilities': np.where(filled, np.take_along_axis(probabilities, top_idx, axis=1), np.nan),
+            'profit': np.where(filled, profit[top_idx], np.nan),
+            'expected_profit': np.divide(
+                (eligible_probability * profit).sum(axis=1), total_probability,
+                out=np.full(len(probabilities), np.nan), where=total_probability > 0
+            )
+        }
+
+    def rank_batch(self, X, top_k=3, area_hectares=1.0):
+        """Rank crops for an (n, 7) feature array or DataFrame (see rank_probabilities)"""
+        probabilities = self.recommender.predict_batch(X, top_k=1)['probabilities']
+        return self.rank_probabilities(probabilities, top_k, area_hectares)
+
+    def rank(self, features, top_k=3, area_hectares=1.0):
+        """[(crop, score, probability, profit)] for one input, best first"""
+        _, probabilities = self.recommender.predict(features)
+        result = self.rank_probabilities(probabilities[None, :], top_k, area_hectares)
+        return [
+            (crop, float(score), float(probability), float(profit))
+            for crop, score, probability, profit in zip(
+                result['labels'][0], result['scores'][0], result['probabilities'][0], result['profit'][0]
+            )
+            if crop is not None
+        ]
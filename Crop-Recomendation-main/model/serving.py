@@ -0,0 +1,272 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH, FEATURE_COLUMNS
+from model.model_store import DEFAULT_STORE_DIR
+from utils import metrics
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+TOP_K = 3
+# Paths with their own request-metric label; anything else is counted as 'unknown'
+ROUTES = ('/health', '/stats', '/predict', '/predict/batch')
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row requests into one predict_batch call.
+    A background thread takes the first queued row, then keeps collecting
+    until max_batch_size rows are queued or max_wait_ms has passed. If the
+    batch call fails, its rows are retried one by one so a bad row only
+    fails its own request.
+    """
+
+    def __init__(self, recommender, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, top_k=TOP_K, latency_window=10000):
+        self.recommender = recommender
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.top_k = top_k
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queue one 7-feature row and return a Future of its prediction dict"""
+        row = np.asarray(features, dtype=np.float64).reshape(-1)
+        if row.shape[0] != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected {len(FEATURE_COLUMNS)} features, got {row.shape[0]}")
+        if not np.isfinite(row).all():
+            raise ValueError("Features must be finite numbers")
+        future = Future()
+        self._queue.put((row, future, time.perf_counter()))
+        return future
+
+    def predict(self, features, timeout=None):
+        return self.submit(features).result(timeout=timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            X = np.vstack([row for row, _, _ in batch])
+            try:
+                result = self.recommender.predict_batch(X, top_k=self.top_k)
+                rows = [_format_row(result, i) for i in range(len(batch))]
+            except Exception:
+                rows = [self._predict_one(row) for row, _, _ in batch]
+
+            now = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self._latencies.extend(now - queued_at for _, _, queued_at in batch)
+            for (_, future, _), row in zip(batch, rows):
+                if isinstance(row, Exception):
+                    future.set_exception(row)
+                else:
+                    future.set_result(row)
+
+    def _predict_one(self, row):
+        """Prediction dict for one row, or the exception scoring it raised"""
+        try:
+            return _format_row(self.recommender.predict_batch(row[None, :], top_k=self.top_k), 0)
+        except Exception as e:
+            return e
+
+    def stats(self):
+        """Return throughput and latency percentiles (ms) of recent requests"""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+            batches, rows = self.batches, self.rows
+        elapsed = time.perf_counter() - self._started_at
+        stats = {
+            'batches': batches,
+            'rows': rows,
+            'mean_batch_size': rows / batches if batches else 0.0,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+        }
+        for p in (50, 90, 99):
+            stats[f'p{p}_ms'] = float(np.percentile(latencies, p)) if len(latencies) else None
+        return stats
+
+
+def _format_row(result, i):
+    return {
+        'crop': result['labels'][i],
+        'top_k': [
+            {'crop': crop, 'probability': float(prob)}
+            for crop, prob in zip(result['top_k_labels'][i], result['top_k_probabilities'][i])
+        ]
+    }
+
+
+def _parse_row(row):
+    """Accept either a 7-element list or a dict keyed by feature column; NaN/inf are rejected"""
+    if isinstance(row, dict):
+        missing = [col for col in FEATURE_COLUMNS if col not in row]
+        if missing:
+            raise ValueError(f"Missing features: {', '.join(missing)}")
+        values = [float(row[col]) for col in FEATURE_COLUMNS]
+    else:
+        values = [float(v) for v in row]
+        if len(values) != len(FEATURE_COLUMNS):
+            raise ValueError(f"Expected {len(FEATURE_COLUMNS)} features, got {len(values)}")
+    if not np.isfinite(values).all():
+        raise ValueError("Features must be finite numbers")
+    return values
+
+
+class InferenceApp:
+    """
+    Transport-independent request handling for the inference service.
+    GET  /health         -> {"status": "ok", "model": ...}
+    GET  /stats          -> micro-batcher throughput and latency percentiles
+    POST /predict        -> {"features": [...] or {...}}, micro-batched
+    POST /predict/batch  -> {"rows": [[...], ...]}, one vectorized call
+    """
+
+    def __init__(self, recommender, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.recommender = recommender
+        self.batcher = MicroBatcher(recommender, max_batch_size, max_wait_ms)
+
+    def handle(self, method, path, body=b''):
+        """Return (status_code, response_dict) for one request"""
+        status, response = self._route(method, path, body)
+        metrics.inc('crop_http_requests_total', path=path if path in ROUTES else 'unknown', status=status)
+        return status, response
+
+    def _route(self, method, path, body):
+        try:
+            payload = json.loads(body) if body else {}
+            if method == 'GET' and path == '/health':
+                return 200, {'status': 'ok', 'model': self.recommender.best_model_name}
+            if method == 'GET' and path == '/stats':
+                return 200, self.batcher.stats()
+            if method == 'POST' and path == '/predict':
+                return 200, self.batcher.predict(_parse_row(payload['features']))
+            if method == 'POST' and path == '/predict/batch':
+                X = np.array([_parse_row(row) for row in payload['rows']], dtype=np.float64)
+                result = self.recommender.predict_batch(X.reshape(-1, len(FEATURE_COLUMNS)), top_k=TOP_K)
+                return 200, {'predictions': [_format_row(result, i) for i in range(len(X))]}
+            return 404, {'error': f"No route for {method} {path}"}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {'error': f"Invalid request: {str(e)}"}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    def close(self):
+        self.batcher.close()
+
+
+class LocalClient:
+    """In-process client that exercises the JSON round trip without a socket"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def get(self, path):
+        status, response = self.app.handle('GET', path)
+        return status, json.loads(json.dumps(response))
+
+    def post(self, path, payload):
+        status, response = self.app.handle('POST', path, json.dumps(payload).encode('utf-8'))
+        return status, json.loads(json.dumps(response))
+
+
+def make_server(app, host='127.0.0.1', port=8000):
+    """Create a threading HTTP server that forwards requests to app"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, method):
+            length = int(self.headers.get('Content-Length') or 0)
+            status, response = app.handle(method, self.path, self.rfile.read(length))
+            body = json.dumps(response).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond('GET')
+
+        def do_POST(self):
+            self._respond('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve crop recommendations over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Longest a request waits for others to join its batch")
+    parser.add_argument('--data', default=DATA_PATH, help="Training CSV for the recommender")
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help="Model artifact directory")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this port")
+    args = parser.parse_args(argv)
+
+    if args.metrics_port:
+        metrics.enable()
+        metrics.start_http_server(args.metrics_port, args.host)
+    recommender = CropRecommender(data_path=args.data, store_dir=args.store_dir)
+    app = InferenceApp(recommender, args.max_batch_size, args.max_wait_ms)
+    server = make_server(app, args.host, args.port)
+    print(f"Serving {recommender.best_model_name} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+CACHE_SUFFIX = '.joblib'
+
+
+def _array_digest(*arrays):
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode('utf-8'))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _params_digest(model):
+    params = {k: repr(v) for k, v in sorted(model.get_params().items())}
+    payload = json.dumps({'class': type(model).__name__, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _run_task(model, X_fit, y_fit, X_eval, y_eval, keep_model):
+    """Fit a fresh clone and score it; runs inside a pool worker"""
+    start = time.perf_counter()
+    try:
+        estimator = clone(model)
+        estimator.fit(X_fit, y_fit)
+        fit_seconds = time.perf_counter() - start
+        score = accuracy_score(y_eval, estimator.predict(X_eval))
+    except Exception as e:
+        return {'error': str(e), 'seconds': time.perf_counter() - start}
+    return {
+        'score': float(score),
+        'fit_seconds': fit_seconds,
+        'seconds': time.perf_counter() - start,
+        'model': estimator if keep_model else None
+    }
+
+
+class TrainingPipeline:
+    """
+    Fit and cross-validate several models concurrently.
+    Every (model, fold) pair and each model's final fit is an independent
+    task on a joblib process pool. Fold splits are computed once and
+    shared by all models, and each task's result is cached on disk under a
+    key made of the data, the fold and that model's hyperparameters, so
+    changing one model only refits that model. After a run the cache holds
+    only that run's entries: results for other data or hyperparameters
+    are deleted, so it never grows beyond one set of fitted models.
+    The wall-clock breakdown is kept in timings and logged at INFO level.
+    """
+
+    def __init__(self, models, n_jobs=None, cv=5, cache_dir=None):
+        self.models = models
+        self.n_jobs = n_jobs
+        self.cv = cv
+        self.cache_dir = cache_dir
+        self.timings = {}
+
+    def _cache_path(self, data_key, name, model, task):
+        key = hashlib.sha256(
+            f"{data_key}:{name}:{_params_digest(model)}:{task}".encode('utf-8')
+        ).hexdigest()[:24]
+        return os.path.join(self.cache_dir, f"{name}-{task}-{key}{CACHE_SUFFIX}")
+
+    def _load_cached(self, path):
+        if self.cache_dir is None or not os.path.exists(path):
+            return None
+        try:
+            return joblib.load(path)
+        except Exception:
+            return None
+
+    def _store_cached(self, path, result):
+        if self.cache_dir is None or 'error' in result:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(result, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not cache training result: {str(e)}")
+
+    def _prune_cache(self, keep):
+        """Delete cached results whose data or hyperparameters are not in keep"""
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        keep = {os.path.basename(path) for path in keep}
+        for entry in os.listdir(self.cache_dir):
+            if entry.endswith(CACHE_SUFFIX) and entry not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, entry))
+                except OSError:
+                    pass
+
+    def run(self, X_train, y_train, X_test, y_test):
+        """
+        Train every model on X_train, score it on X_test and cross-validate it.
+        Returns (fitted_models, model_scores); models that fail are reported
+        and left out of both.
+        """
+        start = time.perf_counter()
+        data_key = _array_digest(X_train, y_train, X_test, y_test)
+        # Same splits cross_val_score(cv=5) uses for classifiers
+        folds = list(StratifiedKFold(n_splits=self.cv).split(X_train, y_train))
+
+        tasks = []
+        for name, model in self.models.items():
+            tasks.append((name, 'full', model, X_train, y_train, X_test, y_test, True))
+            for i, (fit_idx, eval_idx) in enumerate(folds):
+                tasks.append((
+                    name, f'fold{i}', model,
+                    X_train[fit_idx], y_train[fit_idx],
+                    X_train[eval_idx], y_train[eval_idx],
+                    False
+                ))
+
+        results = {}
+        pending = []
+        for task in tasks:
+            name, label, model = task[:3]
+            path = self._cache_path(data_key, name, model, label) if self.cache_dir else None
+            cached = self._load_cached(path)
+            if cached is not None:
+                results[(name, label)] = dict(cached, cached=True)
+            else:
+                pending.append((task, path))
+
+        outputs = Parallel(n_jobs=self.n_jobs)(
+            delayed(_run_task)(*task[2:]) for task, _ in pending
+        )
+        for (task, path), result in zip(pending, outputs):
+            self._store_cached(path, result)
+            results[task[:2]] = dict(result, cached=False)
+        if self.cache_dir:
+            self._prune_cache(self._cache_path(data_key, task[0], task[2], task[1]) for task in tasks)
+
+        fitted_models = {}
+        model_scores = {}
+        self.timings = {}
+        for name in self.models:
+            name_results = [results[(name, 'full')]] + [
+                results[(name, f'fold{i}')] for i in range(len(folds))
+            ]
+            errors = [r['error'] for r in name_results if 'error' in r]
+            self.timings[name] = {
+                'fit': name_results[0]['seconds'],
+                'folds': [r['seconds'] for r in name_results[1:]],
+                'cached': [r['cached'] for r in name_results]
+            }
+            for task_result in name_results[:1]:
+                if not task_result['cached']:
+                    metrics.observe('crop_model_fit_seconds', task_result['seconds'], model=name)
+            for task_result in name_results[1:]:
+                if not task_result['cached']:
+                    metrics.observe('crop_model_cv_fold_seconds', task_result['seconds'], model=name)
+            if errors:
+                print(f"Error training {name} model: {errors[0]}")
+                metrics.inc('crop_errors_total', stage='training')
+                continue
+            cv_scores = np.array([r['score'] for r in name_results[1:]])
+            fitted_models[name] = name_results[0]['model']
+            model_scores[name] = {
+                'accuracy': name_results[0]['score'],
+                'cv_mean': float(cv_scores.mean()),
+                'cv_std': float(cv_scores.std())
+            }
+
+        self.timings['total'] = time.perf_counter() - start
+        metrics.observe('crop_training_seconds', self.timings['total'])
+        logger.info("%s", self.format_timings())
+        return fitted_models, model_scores
+
+    def format_timings(self):
+        """The wall-clock breakdown of the last run per model and fold, as text"""
+        lines = [f"Training finished in {self.timings['total']:.2f}s (n_jobs={self.n_jobs})"]
+        for name, timing in self.timings.items():
+            if name == 'total':
+                continue
+            cached = timing['cached']
+            folds = ", ".join(
+                f"{seconds:.2f}s{'*' if hit else ''}"
+                for seconds, hit in zip(timing['folds'], cached[1:])
+            )
+            lines.append(f"  {name:<14} fit {timing['fit']:.2f}s{'*' if cached[0] else ''} | folds: {folds}")
+        lines.append("  (* = loaded from cache, time from the original run)")
+        return "\n".join(lines)
@@ -0,0 +1,249 @@
+import json
+
+import numpy as np
+
+# Upper bound on (row, tree) pairs traversed at once, to bound memory
+DEFAULT_MAX_TRAVERSAL_ELEMENTS = 2000000
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into NumPy node arrays.
+    All trees are concatenated into one node table with leaves pointing
+    to themselves, and a batch is traversed level by level for every
+    (row, tree) pair at once. Leaf probabilities are then summed tree by
+    tree in estimator order and divided by the tree count, exactly as
+    sklearn's sequential predict_proba does, so results are bit-for-bit
+    identical to best_model.predict_proba when the forest's n_jobs is 1.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_random_forest(cls, forest):
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        n_classes = forest.n_classes_
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.intp)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left.astype(np.intp))
+            rights.append(right.astype(np.intp))
+            # sklearn >= 1.4 stores per-node class fractions in tree_.value
+            probas.append(tree.value[:, 0, :n_classes])
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.ascontiguousarray(np.concatenate(probas), dtype=np.float64),
+            np.array(roots, dtype=np.intp),
+            max_depth
+        )
+
+    def apply(self, X):
+        """Return the leaf node index reached in every tree, shape (n, n_trees)"""
+        # sklearn evaluates trees on float32 inputs against float64 thresholds
+        return _traverse(
+            np.asarray(X, dtype=np.float32), self.roots, self.feature, self.threshold,
+            self.left, self.right, self.max_depth, strict=False
+        )
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        proba = np.zeros((leaves.shape[0], self.leaf_proba.shape[1]), dtype=np.float64)
+        for t in range(leaves.shape[1]):
+            proba += self.leaf_proba[leaves[:, t]]
+        proba /= leaves.shape[1]
+        return proba
+
+
+class FlatBooster:
+    """
+    A fitted multi:softprob XGBClassifier booster flattened into NumPy node
+    arrays, read from the booster's JSON model. Leaf values are
+    accumulated per class in float32 tree order and passed through a
+    float32 softmax like XGBoost's CPU predictor; results match
+    predict_proba to within float32 rounding (about 1e-6), not
+    bit-for-bit, so CropRecommender's 'flat' engine does not use it.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, leaf_value,
+                 roots, tree_class, max_depth, base_score, n_classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.tree_class = tree_class
+        self.max_depth = max_depth
+        self.base_score = base_score
+        self.n_classes = n_classes
+
+    @classmethod
+    def from_xgb_classifier(cls, model):
+        raw = json.loads(model.get_booster().save_raw('json'))
+        learner = raw['learner']
+        if learner['objective']['name'] != 'multi:softprob':
+            raise ValueError(f"Unsupported XGBoost objective {learner['objective']['name']}")
+        params = learner['learner_model_param']
+        n_classes = int(params['num_class'])
+        base_score = np.float32(float(params['base_score'].strip('[]').split(',')[0]))
+        trees = learner['gradient_booster']['model']['trees']
+        tree_class = np.array(learner['gradient_booster']['model']['tree_info'], dtype=np.intp)
+
+        features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in trees:
+            left = np.array(tree['left_children'], dtype=np.intp)
+            right = np.array(tree['right_children'], dtype=np.intp)
+            condition = np.array(tree['split_conditions'], dtype=np.float32)
+            node_ids = np.arange(len(left))
+            is_leaf = left == -1
+
+            features.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.intp))
+            # Leaves point to themselves, as in FlatForest
+            thresholds.append(np.where(is_leaf, np.float32(np.inf), condition))
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            defaults.append(np.where(is_leaf, True, np.array(tree['default_left'], dtype=bool)))
+            values.append(np.where(is_leaf, condition, np.float32(0)))
+            roots.append(offset)
+            max_depth = max(max_depth, _tree_depth(left, right))
+            offset += len(left)
+
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds).astype(np.float32),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(defaults),
+            np.concatenate(values).astype(np.float32),
+            np.array(roots, dtype=np.intp),
+            tree_class,
+            max_depth,
+            base_score,
+            n_classes
+        )
+
+    def apply(self, X):
+        return _traverse(
+            np.asarray(X, dtype=np.float32), self.roots, self.feature, self.threshold,
+            self.left, self.right, self.max_depth, strict=True, default_left=self.default_left
+        )
+
+    def predict_margin(self, X):
+        leaf_values = self.leaf_value[self.apply(X)]
+        n_rows, n_trees = leaf_values.shape
+        margin = np.full((n_rows, self.n_classes), self.base_score, dtype=np.float32)
+        if n_trees % self.n_classes == 0 and np.array_equal(
+                self.tree_class, np.tile(np.arange(self.n_classes), n_trees // self.n_classes)):
+            # One tree per class per round: sum rounds in a single reduction
+            margin += leaf_values.reshape(n_rows, -1, self.n_classes).sum(axis=1, dtype=np.float32)
+        else:
+            for t in range(n_trees):
+                margin[:, self.tree_class[t]] += leaf_values[:, t]
+        return margin
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        np.exp(margin, out=margin)
+        margin /= margin.sum(axis=1, keepdims=True, dtype=np.float64).astype(np.float32)
+        return margin
+
+
+def _traverse(X, roots, feature, threshold, left, right, max_depth, strict, default_left=None):
+    """
+    Walk every (row, tree) pair from its root to a leaf.
+    Pairs that reach a leaf drop out of the active set, so the work is
+    the sum of path lengths rather than n_pairs * max_depth.
+    """
+    n_rows, n_features = X.shape
+    n_trees = len(roots)
+    X_flat = X.reshape(-1)
+    nodes = np.tile(roots, n_rows)
+    row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+    is_leaf = left == np.arange(len(left))
+    active = np.flatnonzero(~is_leaf[nodes])
+    for _ in range(max_depth):
+        if not len(active):
+            break
+        current = nodes[active]
+        x = X_flat[row_offset[active] + feature[current]]
+        if strict:
+            go_left = x < threshold[current]
+        else:
+            go_left = x <= threshold[current]
+        if default_left is not None:
+            missing = np.isnan(x)
+            go_left[missing] = default_left[current[missing]]
+        following = np.where(go_left, left[current], right[current])
+        nodes[active] = following
+        active = active[~is_leaf[following]]
+    return nodes.reshape(n_rows, n_trees)
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.intp)
+    for node in range(len(left)):
+        # XGBoost lists parents before their children
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+class TreeInferenceEngine:
+    """Chunked batch scoring with a flattened forest or booster"""
+
+    def __init__(self, flat_model, max_elements=DEFAULT_MAX_TRAVERSAL_ELEMENTS):
+        self.flat_model = flat_model
+        self.chunk_rows = max(1, max_elements // len(flat_model.roots))
+
+    @classmethod
+    def for_model(cls, model, max_elements=DEFAULT_MAX_TRAVERSAL_ELEMENTS):
+        """Flatten a fitted RandomForestClassifier or XGBClassifier"""
+        from sklearn.ensemble import RandomForestClassifier
+        from xgboost import XGBClassifier
+
+        if isinstance(model, RandomForestClassifier):
+            return cls(FlatForest.from_random_forest(model), max_elements)
+        if isinstance(model, XGBClassifier):
+            return cls(FlatBooster.from_xgb_classifier(model), max_elements)
+        raise ValueError(f"No flat inference engine for {type(model).__name__}")
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        if not np.all(np.isfinite(X)):
+            raise ValueError("Input contains NaN or infinity")
+        if X.shape[0] <= self.chunk_rows:
+            return self.flat_model.predict_proba(X)
+        return np.vstack([
+            self.flat_model.predict_proba(X[start:start + self.chunk_rows])
+            for start in range(0, X.shape[0], self.chunk_rows)
+        ])
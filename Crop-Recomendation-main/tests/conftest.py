@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH
+from model.dataset import open_dataset
+
+
+@pytest.fixture(scope='session')
+def store_dir(tmp_path_factory):
+    """Model store with the recommender trained once for the whole session"""
+    path = tmp_path_factory.mktemp('artifacts')
+    CropRecommender(store_dir=str(path))
+    return path
+
+
+@pytest.fixture(scope='session')
+def recommender(store_dir):
+    return CropRecommender(store_dir=str(store_dir))
+
+
+@pytest.fixture(scope='session')
+def dataset(store_dir):
+    """(features, label codes) of the training CSV"""
+    data = open_dataset(DATA_PATH, str(store_dir / 'datasets'))
+    return np.asarray(data.features, dtype=np.float64), np.asarray(data.labels, dtype=np.intp)
@@ -0,0 +1,192 @@
+import numpy as np
+import pytest
+
+from utils.advanced_features import CropRotationPlanner, EconomicAnalyzer, IrrigationScheduler
+from utils.crop_registry import load_registry
+
+# The hard-coded tables the registry replaced (avg_yield in tonnes per
+# hectare, except coconut in nuts)
+OLD_WATER_REQUIREMENTS = {  # crop: (water_need, frequency)
+    'rice': (1200, 2),
+    'maize': (500, 7),
+    'cotton': (700, 5),
+    'wheat': (450, 7),
+    'sugarcane': (1500, 3),
+    'coffee': (1800, 4),
+    'banana': (1200, 3),
+    'apple': (800, 5),
+    'orange': (900, 4),
+    'mango': (850, 5),
+    'chickpea': (350, 8),
+    'pigeonpeas': (400, 8),
+    'mothbeans': (300, 9),
+    'mungbean': (450, 7),
+    'blackgram': (500, 6),
+    'lentil': (350, 8),
+    'pomegranate': (650, 5),
+    'grapes': (700, 4),
+    'watermelon': (800, 3),
+    'muskmelon': (750, 4),
+    'papaya': (900, 3),
+    'coconut': (1200, 5),
+    'jute': (600, 6),
+    'kidneybeans': (400, 7),
+    'soybean': (450, 7),
+    'peas': (350, 6),
+    'potato': (500, 5),
+    'mustard': (400, 8),
+    'tomato': (600, 3),
+    'onion': (550, 4),
+    'garlic': (450, 5),
+    'turmeric': (1100, 4),
+    'ginger': (1000, 4),
+    'cucumber': (500, 3),
+    'brinjal': (550, 4),
+    'pepper': (600, 4),
+    'chilli': (650, 5),
+    'cauliflower': (500, 4),
+    'cabbage': (450, 5)
+}
+OLD_CROP_ECONOMICS = {  # crop: (cost_per_hectare, avg_yield, price_per_kg)
+    'rice': (45000, 4.0, 20),
+    'maize': (35000, 5.5, 15),
+    'cotton': (55000, 2.5, 50),
+    'wheat': (40000, 3.5, 25),
+    'sugarcane': (65000, 70.0, 3),
+    'coffee': (75000, 2.0, 100),
+    'banana': (80000, 25.0, 12),
+    'apple': (90000, 15.0, 40),
+    'orange': (70000, 18.0, 25),
+    'mango': (85000, 12.0, 35),
+    'chickpea': (28000, 1.8, 60),
+    'pigeonpeas': (26000, 1.6, 65),
+    'mothbeans': (25000, 1.5, 70),
+    'mungbean': (30000, 1.7, 80),
+    'blackgram': (28000, 1.8, 75),
+    'lentil': (32000, 2.0, 70),
+    'pomegranate': (120000, 15.0, 50),
+    'grapes': (150000, 20.0, 45),
+    'watermelon': (60000, 35.0, 8),
+    'muskmelon': (55000, 30.0, 10),
+    'papaya': (75000, 40.0, 15),
+    'coconut': (100000, 12000.0, 15),
+    'jute': (40000, 2.5, 30),
+    'kidneybeans': (30000, 1.8, 60),
+    'soybean': (32000, 2.2, 40),
+    'peas': (35000, 2.5, 45),
+    'potato': (50000, 25.0, 12),
+    'mustard': (30000, 1.5, 50),
+    'tomato': (55000, 30.0, 15),
+    'onion': (60000, 25.0, 20),
+    'garlic': (65000, 12.0, 60),
+    'turmeric': (70000, 8.0, 80),
+    'ginger': (80000, 10.0, 70),
+    'cucumber': (45000, 35.0, 10),
+    'brinjal': (50000, 30.0, 15),
+    'pepper': (55000, 15.0, 40),
+    'chilli': (60000, 12.0, 60),
+    'cauliflower': (45000, 25.0, 15),
+    'cabbage': (40000, 30.0, 12)
+}
+OLD_SEASONAL_CROPS = {
+    'summer': [
+        'rice', 'cotton', 'maize', 'sugarcane', 'watermelon', 'muskmelon', 'papaya', 'banana',
+        'mungbean', 'cucumber', 'brinjal', 'tomato', 'chilli', 'pepper', 'onion', 'turmeric', 'ginger'
+    ],
+    'winter': [
+        'wheat', 'potato', 'mustard', 'peas', 'chickpea', 'lentil', 'apple', 'grapes', 'pomegranate',
+        'cauliflower', 'cabbage', 'garlic', 'onion', 'tomato', 'peas'
+    ],
+    'monsoon': [
+        'rice', 'maize', 'pulses', 'soybean', 'jute', 'blackgram', 'mothbeans', 'pigeonpeas',
+        'kidneybeans', 'coconut', 'coffee', 'banana', 'papaya', 'turmeric', 'ginger', 'cucumber'
+    ]
+}
+OLD_ROTATION_BENEFITS = {
+    'legumes': [
+        'peas', 'pulses', 'soybean', 'chickpea', 'lentil', 'mungbean', 'blackgram', 'mothbeans',
+        'pigeonpeas', 'kidneybeans'
+    ],
+    'cereals': [
+        'rice', 'wheat', 'maize'
+    ],
+    'cash_crops': [
+        'cotton', 'sugarcane', 'jute', 'banana', 'watermelon', 'muskmelon', 'papaya', 'pomegranate',
+        'grapes', 'apple', 'orange', 'mango', 'coconut', 'coffee', 'potato', 'tomato', 'onion',
+        'garlic', 'turmeric', 'ginger', 'chilli', 'pepper', 'brinjal', 'cauliflower', 'cabbage',
+        'cucumber'
+    ]
+}
+
+
+@pytest.fixture(scope='module')
+def registry():
+    return load_registry()
+
+
+def test_water_requirements_match(registry):
+    expected = {crop: {'water_need': need, 'frequency': frequency}
+                for crop, (need, frequency) in OLD_WATER_REQUIREMENTS.items()}
+    assert registry.water_requirements() == expected
+    assert IrrigationScheduler().water_requirements == expected
+
+
+def test_crop_economics_match_in_kg(registry):
+    expected = {
+        crop: {'cost_per_hectare': float(cost),
+               # The registry stores kg per hectare so avg_yield * price_per_kg is revenue
+               'avg_yield': avg_yield if crop == 'coconut' else avg_yield * 1000,
+               'price_per_kg': float(price)}
+        for crop, (cost, avg_yield, price) in OLD_CROP_ECONOMICS.items()
+    }
+    economics = registry.crop_economics()
+    assert economics.keys() == expected.keys()
+    for crop, values in expected.items():
+        assert economics[crop] == pytest.approx(values), crop
+
+
+def test_analyze_crop_uses_the_registry(registry):
+    analyzer = EconomicAnalyzer()
+    rice = analyzer.analyze_crop('Rice', 2.0)
+    assert rice['total_cost'] == 90000
+    assert rice['expected_yield'] == 8000
+    assert rice['expected_revenue'] == 160000
+    assert analyzer.analyze_crop('pulses', 1.0) is None
+
+
+def test_seasonal_crops_match(registry):
+    # The old winter list named peas twice
+    expected = {season: list(dict.fromkeys(crops)) for season, crops in OLD_SEASONAL_CROPS.items()}
+    assert registry.seasonal_crops() == expected
+    assert CropRotationPlanner(registry=registry).seasonal_crops == expected
+
+
+def test_rotation_benefits_match(registry):
+    benefits = registry.rotation_benefits()
+    assert {category: sorted(crops) for category, crops in benefits.items()} == \
+        {category: sorted(crops) for category, crops in OLD_ROTATION_BENEFITS.items()}
+
+
+def old_suggested_crops(current_crop, season):
+    """suggest_rotation's crop list as the old planner computed it from its dicts"""
+    category = next((name for name, crops in OLD_ROTATION_BENEFITS.items() if current_crop in crops), None)
+    follow = {'legumes': ['cereals', 'cash_crops'], 'cereals': ['legumes']}.get(category, ['legumes', 'cereals'])
+    allowed = [crop for name in follow for crop in OLD_ROTATION_BENEFITS[name]]
+    return list(dict.fromkeys(crop for crop in OLD_SEASONAL_CROPS[season] if crop in allowed))
+
+
+def test_rotation_suggestions_match(registry):
+    planner = CropRotationPlanner(registry=registry)
+    crops = list(registry.names) + ['unknown']
+    for season in OLD_SEASONAL_CROPS:
+        for crop in crops:
+            assert planner.suggest_rotation(crop, season)['suggested_crops'] == \
+                old_suggested_crops(crop, season), (crop, season)
+    assert planner.suggest_rotation('rice', 'spring') is None
+
+
+def test_classifier_crops_come_first(registry, recommender):
+    labels = list(recommender.get_crop_labels())
+    assert list(registry.names[:len(labels)]) == labels
+    np.testing.assert_array_equal(registry.ids(labels), np.arange(len(labels)))
+    assert registry.ids(['Rice', 'not-a-crop']).tolist() == [registry.id('rice'), -1]
@@ -0,0 +1,70 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.crop_recommendation_model import CropRecommender, DATA_PATH, FEATURE_COLUMNS
+from model.incremental import IncrementalTrainer
+from model.model_store import DEFAULT_KEEP_UPDATES
+
+N_UPDATES = DEFAULT_KEEP_UPDATES + 2
+
+
+def accuracies(recommender, X, y):
+    X_scaled = recommender.scaler.transform(X)
+    return {name: float(np.mean(model.predict(X_scaled) == y)) for name, model in recommender.models.items()}
+
+
+@pytest.fixture(scope='module')
+def updated(store_dir, dataset, tmp_path_factory):
+    """A copy of the trained store, updated N_UPDATES times with shifted field samples"""
+    store = tmp_path_factory.mktemp('incremental') / 'artifacts'
+    shutil.copytree(store_dir, store)
+    recommender = CropRecommender(store_dir=str(store))
+    X, y = dataset
+    before = accuracies(recommender, X, y)
+    thresholds = recommender.models['random_forest'].estimators_[0].tree_.threshold.copy()
+
+    original = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(0)
+    trainer = IncrementalTrainer(recommender)
+    for i in range(N_UPDATES):
+        batch = original.sample(100, random_state=i).reset_index(drop=True)
+        # New fields read slightly differently from the original survey
+        batch[FEATURE_COLUMNS] = batch[FEATURE_COLUMNS] * rng.normal(1.0, 0.02, (len(batch), len(FEATURE_COLUMNS))) + 2
+        trainer.update(batch)
+    return recommender, store, before, thresholds
+
+
+def test_accuracy_on_old_data_is_kept(updated, dataset):
+    recommender, _, before, _ = updated
+    after = accuracies(recommender, *dataset)
+    for name in before:
+        assert after[name] >= before[name] - 0.02, name
+    assert after[recommender.best_model_name] >= 0.97
+
+
+def test_existing_trees_are_not_modified(updated):
+    recommender, _, _, thresholds = updated
+    forest = recommender.models['random_forest']
+    assert np.array_equal(forest.estimators_[0].tree_.threshold, thresholds)
+    assert len(forest.estimators_) > 100
+
+
+def test_store_keeps_the_newest_updates(updated):
+    recommender, store, _, _ = updated
+    artifacts = sorted(path.name for path in store.glob('crop_recommender-*.joblib'))
+    # The base artifact plus DEFAULT_KEEP_UPDATES updates
+    assert len(artifacts) == DEFAULT_KEEP_UPDATES + 1
+    assert f"crop_recommender-{recommender.base_artifact_key}.joblib" in artifacts
+    assert f"crop_recommender-{recommender.artifact_key}.joblib" in artifacts
+
+
+def test_reload_resumes_from_the_newest_update(updated, dataset):
+    recommender, store, _, _ = updated
+    reloaded = CropRecommender(store_dir=str(store))
+    assert reloaded.artifact_key == recommender.artifact_key
+    X, _ = dataset
+    np.testing.assert_array_equal(reloaded.predict_batch(X)['probabilities'],
+                                  recommender.predict_batch(X)['probabilities'])
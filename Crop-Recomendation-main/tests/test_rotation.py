@@ -0,0 +1,89 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from utils.advanced_features import CropRotationPlanner, EconomicAnalyzer, ROTATION_RULES, NITROGEN_BALANCE_KG_HA
+
+
+@pytest.fixture(scope='module')
+def planner():
+    return CropRotationPlanner(EconomicAnalyzer())
+
+
+def brute_force_plan(planner, current_crop, seasons, nitrogen_price):
+    """Best (score, crops) over every crop sequence allowed by the rules, or None"""
+    profit = dict(zip(planner.crops, planner.profit_per_hectare))
+    plannable = {crop for crop, ok in zip(planner.crops, planner.plannable) if ok}
+    candidates = [[crop for crop in planner.seasonal_crops[season] if crop in plannable] for season in seasons]
+
+    def score(crop):
+        return profit[crop] + nitrogen_price * NITROGEN_BALANCE_KG_HA.get(planner.crop_category.get(crop), 0.0)
+
+    best = None
+    for sequence in itertools.product(*candidates):
+        previous = planner.crop_category.get(current_crop)
+        allowed = True
+        for crop in sequence:
+            category = planner.crop_category.get(crop)
+            if category not in ROTATION_RULES[previous]:
+                allowed = False
+                break
+            previous = category
+        if allowed:
+            total = sum(score(crop) for crop in sequence)
+            if best is None or total > best[0]:
+                best = (total, list(sequence))
+    return best
+
+
+def sequence_score(planner, current_crop, crops, seasons, nitrogen_price):
+    """Score of one crop sequence, asserting every step follows the rules"""
+    previous = planner.crop_category.get(current_crop)
+    total = 0.0
+    for crop, season in zip(crops, seasons):
+        category = planner.crop_category.get(crop)
+        assert crop in planner.seasonal_crops[season]
+        assert category in ROTATION_RULES[previous]
+        total += planner.profit_per_hectare[planner.crop_index[crop]] + \
+            nitrogen_price * NITROGEN_BALANCE_KG_HA.get(category, 0.0)
+        previous = category
+    return total
+
+
+@pytest.mark.parametrize('start_season,n_seasons', [('summer', 1), ('summer', 3), ('monsoon', 3), ('winter', 2)])
+@pytest.mark.parametrize('nitrogen_price', [0.0, 60.0, 5000.0])
+def test_plan_is_optimal(planner, start_season, n_seasons, nitrogen_price):
+    seasons = planner.season_sequence(start_season, n_seasons)
+    current_crops = planner.crops + ['not-a-crop']
+    plans = planner.plan_rotations(current_crops, start_season, n_seasons, nitrogen_price)
+    for current_crop, plan in zip(current_crops, plans):
+        expected = brute_force_plan(planner, current_crop, seasons, nitrogen_price)
+        if expected is None:
+            assert plan is None, current_crop
+            continue
+        assert plan['score'] == pytest.approx(expected[0]), current_crop
+        # The DP's own sequence must be allowed and score what it reports
+        assert sequence_score(planner, current_crop, plan['crops'], seasons, nitrogen_price) == \
+            pytest.approx(plan['score'])
+
+
+def test_plan_reports_its_parts(planner):
+    plan = planner.plan_rotation('rice', 'monsoon', n_seasons=3)
+    assert plan['seasons'] == ['monsoon', 'winter', 'summer']
+    ids = [planner.crop_index[crop] for crop in plan['crops']]
+    assert plan['profit'] == pytest.approx(planner.profit_per_hectare[ids].sum())
+    assert plan['nitrogen_balance'] == pytest.approx(planner.nitrogen_balance[ids].sum())
+
+
+def test_batch_matches_single_plans(planner):
+    crops = ['rice', 'chickpea', 'mango', 'mustard']
+    batch = planner.plan_rotations(crops, 'winter', 3)
+    assert batch == [planner.plan_rotation(crop, 'winter', 3) for crop in crops]
+
+
+def test_unknown_season_is_rejected(planner):
+    with pytest.raises(ValueError):
+        planner.plan_rotation('rice', 'spring')
+    with pytest.raises(ValueError):
+        planner.plan_rotation('rice', 'summer', n_seasons=0)
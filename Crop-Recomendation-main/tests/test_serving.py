@@ -0,0 +1,84 @@
+import math
+import threading
+
+import numpy as np
+import pytest
+
+from model.serving import InferenceApp, LocalClient
+
+SAMPLE = [90, 42, 43, 20.8, 82.0, 6.5, 202.9]
+
+
+@pytest.fixture
+def client(recommender):
+    app = InferenceApp(recommender)
+    yield LocalClient(app)
+    app.close()
+
+
+class FailingRowRecommender:
+    """The real recommender, except that any batch containing a row with negative nitrogen fails"""
+
+    def __init__(self, recommender):
+        self.recommender = recommender
+
+    def predict_batch(self, X, top_k=3):
+        if (np.asarray(X)[:, 0] < 0).any():
+            raise RuntimeError("bad row")
+        return self.recommender.predict_batch(X, top_k=top_k)
+
+    def __getattr__(self, name):
+        return getattr(self.recommender, name)
+
+
+def test_predict_matches_recommender(client, recommender):
+    status, response = client.post('/predict', {'features': SAMPLE})
+    assert status == 200
+    assert response['crop'] == recommender.predict(np.array(SAMPLE))[0]
+    assert len(response['top_k']) == 3
+
+
+@pytest.mark.parametrize('value', [math.nan, math.inf, -math.inf])
+def test_non_finite_features_are_rejected(client, value):
+    row = SAMPLE[:3] + [value] + SAMPLE[4:]
+    status, response = client.post('/predict', {'features': row})
+    assert status == 400
+    assert 'finite' in response['error']
+
+    status, _ = client.post('/predict/batch', {'rows': [SAMPLE, row]})
+    assert status == 400
+
+
+def test_malformed_requests_are_rejected(client):
+    assert client.post('/predict', {'features': SAMPLE[:6]})[0] == 400
+    assert client.post('/predict', {'features': {'N': 90}})[0] == 400
+    assert client.post('/predict', {})[0] == 400
+    assert client.get('/nowhere')[0] == 404
+
+
+def test_failing_row_only_fails_its_own_request(recommender):
+    # A long wait so the concurrent requests land in one micro-batch
+    app = InferenceApp(FailingRowRecommender(recommender), max_batch_size=8, max_wait_ms=200)
+    client = LocalClient(app)
+    rows = [SAMPLE] * 3 + [[-1.0] + SAMPLE[1:]] + [SAMPLE] * 3
+    responses = [None] * len(rows)
+
+    def send(i):
+        responses[i] = client.post('/predict', {'features': rows[i]})
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(rows))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = client.get('/stats')[1]
+    finally:
+        app.close()
+
+    statuses = [status for status, _ in responses]
+    assert statuses == [200] * 3 + [500] + [200] * 3
+    assert {response['crop'] for _, response in responses[:3] + responses[4:]} == \
+        {recommender.predict(np.array(SAMPLE))[0]}
+    assert stats['rows'] == len(rows)
+    assert stats['batches'] < len(rows)
@@ -0,0 +1,58 @@
+import copy
+
+import numpy as np
+import pytest
+
+from model.tree_engine import TreeInferenceEngine
+
+
+@pytest.fixture(scope='module')
+def forest(recommender):
+    # sklearn only sums tree probabilities in a fixed order with n_jobs=1
+    forest = copy.deepcopy(recommender.models['random_forest'])
+    forest.set_params(n_jobs=1)
+    return forest
+
+
+@pytest.fixture(scope='module')
+def inputs(recommender, dataset):
+    X, _ = dataset
+    rng = np.random.default_rng(0)
+    uniform = rng.uniform(X.min(axis=0), X.max(axis=0), size=(2000, X.shape[1]))
+    return recommender.scaler.transform(np.vstack([X, uniform]))
+
+
+def test_flat_forest_is_bit_exact(forest, inputs):
+    flat = TreeInferenceEngine.for_model(forest).predict_proba(inputs)
+    assert flat.dtype == np.float64
+    assert np.array_equal(flat, forest.predict_proba(inputs))
+
+
+def test_flat_forest_is_bit_exact_across_chunks(forest, inputs):
+    # Small enough that the rows are scored in many chunks
+    engine = TreeInferenceEngine.for_model(forest, max_elements=len(forest.estimators_) * 97)
+    assert engine.chunk_rows == 97
+    assert np.array_equal(engine.predict_proba(inputs), forest.predict_proba(inputs))
+
+
+def test_flat_forest_splits_exactly_on_thresholds(forest):
+    # Inputs sitting exactly on split thresholds go left, as in sklearn
+    tree = forest.estimators_[0].tree_
+    internal = np.flatnonzero(tree.children_left != -1)[:50]
+    X = np.zeros((len(internal), forest.n_features_in_))
+    X[np.arange(len(internal)), tree.feature[internal]] = tree.threshold[internal]
+    assert np.array_equal(TreeInferenceEngine.for_model(forest).predict_proba(X), forest.predict_proba(X))
+
+
+def test_flat_engine_rejects_non_finite_input(forest, inputs):
+    X = inputs[:3].copy()
+    X[1, 2] = np.nan
+    with pytest.raises(ValueError):
+        TreeInferenceEngine.for_model(forest).predict_proba(X)
+
+
+def test_flat_booster_matches_xgboost(recommender, inputs):
+    model = recommender.models['xgboost']
+    flat = TreeInferenceEngine.for_model(model).predict_proba(inputs)
+    # Only float32 rounding apart, see FlatBooster
+    np.testing.assert_allclose(flat, model.predict_proba(inputs), rtol=0, atol=1e-5)
@@ -2,53 +2,43 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from utils.crop_registry import load_registry
+
+# Water-balance simulation defaults
+DEFAULT_SOIL_CAPACITY_MM = 100.0       # plant-available water held by the root zone
+DEFAULT_DEPLETION_THRESHOLD = 0.5      # irrigate once this share of it is used up
+# Seasonal need giving a crop coefficient (Kc) of 1.0; Kc scales reference ET per crop
+REFERENCE_SEASON_NEED_MM = 1000.0
+CROP_COEFFICIENT_RANGE = (0.3, 1.5)
+
+# Crop categories that may follow each category (None: crops in no category)
+ROTATION_RULES = {
+    'legumes': ('cereals', 'cash_crops'),
+    'cereals': ('legumes',),
+    'cash_crops': ('legumes', 'cereals'),
+    None: ('legumes', 'cereals')
+}
+# Order in which the planner's seasons follow each other
+SEASON_CYCLE = ['summer', 'monsoon', 'winter']
+# Soil nitrogen added (+) or removed (-) by one season of each category, kg N/ha
+NITROGEN_BALANCE_KG_HA = {'legumes': 40.0, 'cereals': -30.0, 'cash_crops': -20.0}
+# Value of soil nitrogen when scoring rotation plans, roughly the fertilizer cost (₹/kg N)
+NITROGEN_PRICE_PER_KG = 60.0
+
+def reference_et(temperature, humidity):
+    """Daily reference evapotranspiration (mm) from the Romanenko formula"""
+    temperature = np.asarray(temperature, dtype=np.float64)
+    humidity = np.clip(np.asarray(humidity, dtype=np.float64), 0.0, 100.0)
+    # Romanenko gives mm per month
+    return 0.0018 * (25.0 + temperature) ** 2 * (100.0 - humidity) / 30.0
+
 class IrrigationScheduler:
-    def __init__(self):
-        self.water_requirements = {
-            'rice': {'water_need': 1200, 'frequency': 2},  # mm per season, days between irrigation
-            'maize': {'water_need': 500, 'frequency': 7},
-            'cotton': {'water_need': 700, 'frequency': 5},
-            'wheat': {'water_need': 450, 'frequency': 7},
-            'sugarcane': {'water_need': 1500, 'frequency': 3},
-            'coffee': {'water_need': 1800, 'frequency': 4},
-            'banana': {'water_need': 1200, 'frequency': 3},
-            'apple': {'water_need': 800, 'frequency': 5},
-            'orange': {'water_need': 900, 'frequency': 4},
-            'mango': {'water_need': 850, 'frequency': 5},
-            # Added more crops
-            'chickpea': {'water_need': 350, 'frequency': 8},
-            'pigeonpeas': {'water_need': 400, 'frequency': 8},
-            'mothbeans': {'water_need': 300, 'frequency': 9},
-            'mungbean': {'water_need': 450, 'frequency': 7},
-            'blackgram': {'water_need': 500, 'frequency': 6},
-            'lentil': {'water_need': 350, 'frequency': 8},
-            'pomegranate': {'water_need': 650, 'frequency': 5},
-            'grapes': {'water_need': 700, 'frequency': 4},
-            'watermelon': {'water_need': 800, 'frequency': 3},
-            'muskmelon': {'water_need': 750, 'frequency': 4},
-            'papaya': {'water_need': 900, 'frequency': 3},
-            'coconut': {'water_need': 1200, 'frequency': 5},
-            'jute': {'water_need': 600, 'frequency': 6},
-            'kidneybeans': {'water_need': 400, 'frequency': 7},
-            # Additional crops
-            'soybean': {'water_need': 450, 'frequency': 7},
-            'peas': {'water_need': 350, 'frequency': 6},
-            'potato': {'water_need': 500, 'frequency': 5},
-            'mustard': {'water_need': 400, 'frequency': 8},
-            'tomato': {'water_need': 600, 'frequency': 3},
-            'onion': {'water_need': 550, 'frequency': 4},
-            'garlic': {'water_need': 450, 'frequency': 5},
-            'turmeric': {'water_need': 1100, 'frequency': 4},
-            'ginger': {'water_need': 1000, 'frequency': 4},
-            'cucumber': {'water_need': 500, 'frequency': 3},
-            'brinjal': {'water_need': 550, 'frequency': 4},
-            'pepper': {'water_need': 600, 'frequency': 4},
-            'chilli': {'water_need': 650, 'frequency': 5},
-            'cauliflower': {'water_need': 500, 'frequency': 4},
-            'cabbage': {'water_need': 450, 'frequency': 5}
-        }
+    def __init__(self, registry=None):
+        self.registry = registry or load_registry()
+        # mm per season, days between irrigation
+        self.water_requirements = self.registry.water_requirements()
     
-    def calculate_schedule(self, crop_name, area_hectares, rainfall_mm):
+    def calculate_schedule(self, crop_name, area_hectares, rainfall_mm, horizon_days=30):
         """Calculate irrigation schedule based on crop water requirements"""
         if crop_name.lower() not in self.water_requirements:
             return None
@@ -61,10 +51,10 @@ class IrrigationScheduler:
         water_deficit = max(0, water_need - rainfall_mm)
         irrigation_per_session = water_deficit / (30 / frequency)  # Monthly schedule
         
-        # Generate schedule for next 30 days
+        # Generate schedule for the next horizon_days days
         schedule = []
         start_date = datetime.now()
-        for i in range(30):
+        for i in range(horizon_days):
             if i % frequency == 0:
                 schedule.append({
                     'date': (start_date + timedelta(days=i)).strftime('%Y-%m-%d'),
@@ -74,51 +64,141 @@ class IrrigationScheduler:
         
         return schedule
 
-class EconomicAnalyzer:
-    def __init__(self):
-        self.crop_economics = {
-            'rice': {'cost_per_hectare': 45000, 'avg_yield': 4.0, 'price_per_kg': 20},
-            'maize': {'cost_per_hectare': 35000, 'avg_yield': 5.5, 'price_per_kg': 15},
-            'cotton': {'cost_per_hectare': 55000, 'avg_yield': 2.5, 'price_per_kg': 50},
-            'wheat': {'cost_per_hectare': 40000, 'avg_yield': 3.5, 'price_per_kg': 25},
-            'sugarcane': {'cost_per_hectare': 65000, 'avg_yield': 70.0, 'price_per_kg': 3},
-            'coffee': {'cost_per_hectare': 75000, 'avg_yield': 2.0, 'price_per_kg': 100},
-            'banana': {'cost_per_hectare': 80000, 'avg_yield': 25.0, 'price_per_kg': 12},
-            'apple': {'cost_per_hectare': 90000, 'avg_yield': 15.0, 'price_per_kg': 40},
-            'orange': {'cost_per_hectare': 70000, 'avg_yield': 18.0, 'price_per_kg': 25},
-            'mango': {'cost_per_hectare': 85000, 'avg_yield': 12.0, 'price_per_kg': 35},
-            # Added more crops
-            'chickpea': {'cost_per_hectare': 28000, 'avg_yield': 1.8, 'price_per_kg': 60},
-            'pigeonpeas': {'cost_per_hectare': 26000, 'avg_yield': 1.6, 'price_per_kg': 65},
-            'mothbeans': {'cost_per_hectare': 25000, 'avg_yield': 1.5, 'price_per_kg': 70},
-            'mungbean': {'cost_per_hectare': 30000, 'avg_yield': 1.7, 'price_per_kg': 80},
-            'blackgram': {'cost_per_hectare': 28000, 'avg_yield': 1.8, 'price_per_kg': 75},
-            'lentil': {'cost_per_hectare': 32000, 'avg_yield': 2.0, 'price_per_kg': 70},
-            'pomegranate': {'cost_per_hectare': 120000, 'avg_yield': 15.0, 'price_per_kg': 50},
-            'grapes': {'cost_per_hectare': 150000, 'avg_yield': 20.0, 'price_per_kg': 45},
-            'watermelon': {'cost_per_hectare': 60000, 'avg_yield': 35.0, 'price_per_kg': 8},
-            'muskmelon': {'cost_per_hectare': 55000, 'avg_yield': 30.0, 'price_per_kg': 10},
-            'papaya': {'cost_per_hectare': 75000, 'avg_yield': 40.0, 'price_per_kg': 15},
-            'coconut': {'cost_per_hectare': 100000, 'avg_yield': 12000, 'price_per_kg': 15},  # nuts per hectare
-            'jute': {'cost_per_hectare': 40000, 'avg_yield': 2.5, 'price_per_kg': 30},
-            'kidneybeans': {'cost_per_hectare': 30000, 'avg_yield': 1.8, 'price_per_kg': 60},
-            # Additional crops
-            'soybean': {'cost_per_hectare': 32000, 'avg_yield': 2.2, 'price_per_kg': 40},
-            'peas': {'cost_per_hectare': 35000, 'avg_yield': 2.5, 'price_per_kg': 45},
-            'potato': {'cost_per_hectare': 50000, 'avg_yield': 25.0, 'price_per_kg': 12},
-            'mustard': {'cost_per_hectare': 30000, 'avg_yield': 1.5, 'price_per_kg': 50},
-            'tomato': {'cost_per_hectare': 55000, 'avg_yield': 30.0, 'price_per_kg': 15},
-            'onion': {'cost_per_hectare': 60000, 'avg_yield': 25.0, 'price_per_kg': 20},
-            'garlic': {'cost_per_hectare': 65000, 'avg_yield': 12.0, 'price_per_kg': 60},
-            'turmeric': {'cost_per_hectare': 70000, 'avg_yield': 8.0, 'price_per_kg': 80},
-            'ginger': {'cost_per_hectare': 80000, 'avg_yield': 10.0, 'price_per_kg': 70},
-            'cucumber': {'cost_per_hectare': 45000, 'avg_yield': 35.0, 'price_per_kg': 10},
-            'brinjal': {'cost_per_hectare': 50000, 'avg_yield': 30.0, 'price_per_kg': 15},
-            'pepper': {'cost_per_hectare': 55000, 'avg_yield': 15.0, 'price_per_kg': 40},
-            'chilli': {'cost_per_hectare': 60000, 'avg_yield': 12.0, 'price_per_kg': 60},
-            'cauliflower': {'cost_per_hectare': 45000, 'avg_yield': 25.0, 'price_per_kg': 15},
-            'cabbage': {'cost_per_hectare': 40000, 'avg_yield': 30.0, 'price_per_kg': 12}
+    def _crop_ids(self, crop_names):
+        """Registry IDs of crop_names, -1 for crops without irrigation data"""
+        ids = self.registry.ids(crop_names)
+        ids[ids >= 0] = np.where(self.registry.has_water[ids[ids >= 0]], ids[ids >= 0], -1)
+        return ids
+
+    def calculate_schedules(self, crop_names, areas_hectares, rainfall_mm, horizon_days=30, start_date=None):
+        """
+        Irrigation schedules for many fields at once, as one DataFrame with a
+        row per irrigation: field (position in the inputs), crop, date
+        (datetime64), water_amount and area. Same rules as
+        calculate_schedule; rainfall_mm and areas_hectares may be scalars.
+        Fields with crops not in the database get no rows.
+        """
+        registry = self.registry
+        codes = self._crop_ids(crop_names)
+        n_fields = len(codes)
+        areas = np.broadcast_to(np.asarray(areas_hectares, dtype=np.float64), (n_fields,))
+        rainfall = np.broadcast_to(np.asarray(rainfall_mm, dtype=np.float64), (n_fields,))
+
+        fields = np.flatnonzero(codes >= 0)
+        crop_codes = codes[fields]
+        freq = registry.irrigation_frequency_days[crop_codes].astype(np.int64)
+        deficit = np.maximum(0.0, registry.water_need_mm[crop_codes] - rainfall[fields])
+        per_session = np.round(deficit / (30 / freq), 2)
+
+        # Sessions on days 0, freq, 2*freq, ... before horizon_days
+        sessions = (horizon_days - 1) // freq + 1
+        row_field = np.repeat(np.arange(len(fields)), sessions)
+        first_row = np.cumsum(sessions) - sessions
+        session = np.arange(len(row_field)) - first_row[row_field]
+
+        if start_date is None:
+            start_date = datetime.now()
+        start = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+        return pd.DataFrame({
+            'field': fields[row_field],
+            'crop': pd.Categorical.from_codes(crop_codes[row_field], categories=registry.name_index),
+            'date': start + session * freq[row_field],
+            'water_amount': per_session[row_field],
+            'area': areas[fields][row_field]
+        })
+
+    def simulate_water_balance(self, crop_names, areas_hectares, rainfall, temperature, humidity,
+                               start_date=None, soil_capacity_mm=DEFAULT_SOIL_CAPACITY_MM,
+                               depletion_threshold=DEFAULT_DEPLETION_THRESHOLD, initial_depletion_mm=0.0):
+        """
+        Simulate a daily soil-moisture bucket for many fields at once.
+        rainfall (mm/day), temperature (C) and humidity (%) are daily series,
+        either shape (days,) shared by every field or (days, fields). Each
+        day the root zone loses crop ET (Kc * Romanenko reference ET) and
+        gains rainfall up to soil_capacity_mm; once depletion reaches
+        depletion_threshold * soil_capacity_mm, the field is irrigated back
+        to capacity at the end of the day.
+        Returns {'events': one row per irrigation (field, crop, date,
+        depth_mm, volume_m3), 'fields': per-field totals, 'total_volume_m3'}.
+        Fields with crops not in the database are skipped.
+        """
+        registry = self.registry
+        codes = self._crop_ids(crop_names)
+        n_fields = len(codes)
+        fields = np.flatnonzero(codes >= 0)
+        crop_codes = codes[fields]
+        areas = np.broadcast_to(np.asarray(areas_hectares, dtype=np.float64), (n_fields,))[fields]
+
+        rainfall = np.asarray(rainfall, dtype=np.float64)
+        if rainfall.ndim == 0:
+            raise ValueError("rainfall must be a daily series")
+        n_days = rainfall.shape[0]
+
+        def daily(series):
+            """(days, simulated fields) view of a scalar, (days,) or (days, fields) input"""
+            series = np.asarray(series, dtype=np.float64)
+            if series.ndim < 2:
+                series = series.reshape(-1, 1)
+            elif series.shape[1] == n_fields:
+                series = series[:, fields]
+            try:
+                return np.broadcast_to(series, (n_days, len(fields)))
+            except ValueError:
+                raise ValueError("rainfall, temperature and humidity must cover the same days and fields")
+
+        rain = daily(rainfall)
+        kc = np.clip(registry.water_need_mm[crop_codes] / REFERENCE_SEASON_NEED_MM, *CROP_COEFFICIENT_RANGE)
+        # Align every input to (days, fields) before combining them
+        crop_et = reference_et(daily(temperature), daily(humidity)) * kc
+
+        trigger = depletion_threshold * soil_capacity_mm
+        depletion = np.full(len(fields), float(initial_depletion_mm))
+        event_days, event_fields, event_depths = [], [], []
+        for day in range(rain.shape[0]):
+            # Rain beyond field capacity drains away, so depletion stays in [0, capacity]
+            depletion = np.clip(depletion + crop_et[day] - rain[day], 0.0, soil_capacity_mm)
+            irrigate = np.flatnonzero(depletion >= trigger)
+            if len(irrigate):
+                event_days.append(np.full(len(irrigate), day))
+                event_fields.append(irrigate)
+                event_depths.append(depletion[irrigate])
+                depletion[irrigate] = 0.0
+
+        event_days = np.concatenate(event_days) if event_days else np.empty(0, dtype=np.int64)
+        event_fields = np.concatenate(event_fields) if event_fields else np.empty(0, dtype=np.int64)
+        depth = np.round(np.concatenate(event_depths), 2) if event_depths else np.empty(0)
+        # 1 mm over 1 ha is 10 m^3
+        volume = depth * areas[event_fields] * 10.0
+
+        if start_date is None:
+            start_date = datetime.now()
+        start = np.datetime64(pd.Timestamp(start_date).date(), 'D')
+        events = pd.DataFrame({
+            'field': fields[event_fields],
+            'crop': pd.Categorical.from_codes(crop_codes[event_fields], categories=registry.name_index),
+            'date': start + event_days,
+            'depth_mm': depth,
+            'volume_m3': volume
+        }).sort_values(['field', 'date'], kind='stable', ignore_index=True)
+
+        per_field = pd.DataFrame({
+            'field': fields,
+            'crop': pd.Categorical.from_codes(crop_codes, categories=registry.name_index),
+            'area': areas,
+            'events': np.bincount(event_fields, minlength=len(fields)),
+            'total_depth_mm': np.bincount(event_fields, weights=depth, minlength=len(fields)),
+            'total_volume_m3': np.bincount(event_fields, weights=volume, minlength=len(fields))
+        })
+        return {
+            'events': events,
+            'fields': per_field,
+            'total_volume_m3': float(volume.sum())
         }
+
+class EconomicAnalyzer:
+    def __init__(self, registry=None):
+        self.registry = registry or load_registry()
+        self.crop_economics = self.registry.crop_economics()
     
     def analyze_crop(self, crop_name, area_hectares):
         """Perform economic analysis for a given crop"""
@@ -140,50 +220,293 @@ class EconomicAnalyzer:
             'roi_percentage': round(roi, 2)
         }
 
+    def economics_table(self):
+        """Per-hectare cost, yield, price, revenue, profit and ROI for every crop, indexed by crop"""
+        registry = self.registry
+        ids = np.flatnonzero(registry.has_economics)
+        table = pd.DataFrame({
+            'cost_per_hectare': registry.cost_per_hectare[ids],
+            'avg_yield': registry.avg_yield[ids],
+            'price_per_kg': registry.price_per_kg[ids],
+            'revenue_per_hectare': registry.revenue_per_hectare[ids],
+            'profit_per_hectare': registry.profit_per_hectare[ids]
+        }, index=pd.Index(registry.names[ids], name='crop'))
+        table['roi_percentage'] = (table['profit_per_hectare'] / table['cost_per_hectare'] * 100).round(2)
+        return table
+
 class CropRotationPlanner:
-    def __init__(self):
-        self.seasonal_crops = {
-            'summer': ['rice', 'cotton', 'maize', 'sugarcane', 'watermelon', 'muskmelon', 'papaya', 'banana', 'mungbean', 'cucumber', 'brinjal', 'tomato', 'chilli', 'pepper', 'onion', 'turmeric', 'ginger'],
-            'winter': ['wheat', 'potato', 'mustard', 'peas', 'chickpea', 'lentil', 'apple', 'grapes', 'pomegranate', 'cauliflower', 'cabbage', 'garlic', 'onion', 'tomato', 'peas'],
-            'monsoon': ['rice', 'maize', 'pulses', 'soybean', 'jute', 'blackgram', 'mothbeans', 'pigeonpeas', 'kidneybeans', 'coconut', 'coffee', 'banana', 'papaya', 'turmeric', 'ginger', 'cucumber']
-        }
-        
-        self.rotation_benefits = {
-            'legumes': ['peas', 'pulses', 'soybean', 'chickpea', 'lentil', 'mungbean', 'blackgram', 'mothbeans', 'pigeonpeas', 'kidneybeans'],  # Nitrogen fixing
-            'cereals': ['rice', 'wheat', 'maize'],     # Soil structure
-            'cash_crops': ['cotton', 'sugarcane', 'jute', 'banana', 'watermelon', 'muskmelon', 'papaya', 'pomegranate', 'grapes', 'apple', 'orange', 'mango', 'coconut', 'coffee', 'potato', 'tomato', 'onion', 'garlic', 'turmeric', 'ginger', 'chilli', 'pepper', 'brinjal', 'cauliflower', 'cabbage', 'cucumber']      # Economic value
+    def __init__(self, economic_analyzer=None, registry=None):
+        if registry is None:
+            registry = economic_analyzer.registry if economic_analyzer is not None else load_registry()
+        self.registry = registry
+        self.seasonal_crops = registry.seasonal_crops()
+        # legumes: nitrogen fixing, cereals: soil structure, cash_crops: economic value
+        self.rotation_benefits = registry.rotation_benefits()
+
+        self._build_indexes()
+        self.profit_per_hectare = np.zeros(len(self.crops))
+        self.plannable = np.ones(len(self.crops), dtype=bool)
+        if economic_analyzer is not None:
+            self.set_economics(economic_analyzer)
+
+    def _build_indexes(self):
+        """Precompute crop/season lookups and the crop -> next crop transition matrix"""
+        registry = self.registry
+        # Planner crop indexes are registry IDs
+        self.crops = list(registry.names)
+        self.crop_index = registry.ids_by_name
+        categories = [registry.category_name(i) for i in range(len(registry))]
+        self.crop_category = {crop: category for crop, category in zip(self.crops, categories) if category}
+        self.season_order = {season: tuple(registry.names[registry.season_crop_ids(season)])
+                             for season in registry.seasons}
+        self.season_candidates = {season: frozenset(crops) for season, crops in self.season_order.items()}
+        self._suggestions = {
+            (category, season): tuple(crop for crop in crops
+                                      if self.crop_category.get(crop) in ROTATION_RULES[category])
+            for season, crops in self.season_order.items()
+            for category in ROTATION_RULES
         }
-    
+
+        # transition[i, j]: crop j may follow crop i. The extra last row is for
+        # crops the registry doesn't know; like uncategorized crops they are
+        # followed as cash crops, and uncategorized crops are never suggested
+        self.transition = np.array([
+            [next_category in ROTATION_RULES[category] for next_category in categories]
+            for category in categories + [None]
+        ], dtype=bool)
+        self.season_mask = {season: registry.season_mask[registry.season_index(season)]
+                            for season in registry.seasons}
+        self.nitrogen_balance = np.array([NITROGEN_BALANCE_KG_HA.get(category, 0.0) for category in categories])
+
+    def set_economics(self, economic_analyzer):
+        """Score rotation plans with this analyzer's profit per hectare; crops it lacks are left out of plans"""
+        profit = economic_analyzer.economics_table()['profit_per_hectare'].reindex(self.crops)
+        self.plannable = profit.notna().to_numpy()
+        self.profit_per_hectare = profit.fillna(0.0).to_numpy(dtype=np.float64)
+
     def suggest_rotation(self, current_crop, season):
         """Suggest crop rotation based on current crop and season"""
         season = season.lower()
         if season not in self.seasonal_crops:
             return None
-            
-        # Find crop category
-        current_category = None
-        for category, crops in self.rotation_benefits.items():
-            if current_crop.lower() in crops:
-                current_category = category
-                break
-        
-        # Suggest rotation based on soil benefits
-        suggested_crops = []
-        if current_category == 'legumes':
-            # After legumes, suggest cereals or cash crops
-            suggested_crops = [crop for crop in self.seasonal_crops[season] 
-                            if crop in self.rotation_benefits['cereals'] + self.rotation_benefits['cash_crops']]
-        elif current_category == 'cereals':
-            # After cereals, suggest legumes
-            suggested_crops = [crop for crop in self.seasonal_crops[season] 
-                            if crop in self.rotation_benefits['legumes']]
-        else:
-            # After cash crops, suggest legumes or cereals
-            suggested_crops = [crop for crop in self.seasonal_crops[season] 
-                            if crop in self.rotation_benefits['legumes'] + self.rotation_benefits['cereals']]
-        
+
+        # Legumes are followed by cereals or cash crops, cereals by legumes,
+        # and anything else by legumes or cereals
+        current_category = self.crop_category.get(current_crop.lower())
         return {
             'current_season': season,
-            'suggested_crops': suggested_crops,
+            'suggested_crops': list(self._suggestions[(current_category, season)]),
             'rotation_benefits': "Improves soil health and nutrient balance"
         }
+
+    def season_sequence(self, start_season, n_seasons):
+        """n_seasons consecutive seasons from start_season, following SEASON_CYCLE"""
+        if start_season.lower() not in SEASON_CYCLE:
+            raise ValueError(f"Unknown season: {start_season}")
+        if n_seasons < 1:
+            raise ValueError("n_seasons must be at least 1")
+        start = SEASON_CYCLE.index(start_season.lower())
+        return [SEASON_CYCLE[(start + i) % len(SEASON_CYCLE)] for i in range(n_seasons)]
+
+    def _plan_tables(self, seasons, nitrogen_price):
+        """
+        Backward dynamic program over the rotation graph. best[t][i] is the
+        best score of seasons t.. when crop i was grown before season t
+        (i == len(crops): a crop the registry doesn't know), choice[t][i]
+        the crop to grow in season t for that score.
+        """
+        score = self.profit_per_hectare + nitrogen_price * self.nitrogen_balance
+        future = np.zeros(len(self.crops))
+        best, choice = [None] * len(seasons), [None] * len(seasons)
+        for t in range(len(seasons) - 1, -1, -1):
+            value = np.where(self.transition & (self.season_mask[seasons[t]] & self.plannable),
+                             (score + future)[None, :], -np.inf)
+            choice[t] = value.argmax(axis=1)
+            best[t] = value[np.arange(len(value)), choice[t]]
+            future = best[t][:-1]
+        return best, choice
+
+    def plan_rotations(self, current_crops, start_season, n_seasons=3, nitrogen_price=NITROGEN_PRICE_PER_KG):
+        """
+        Best n_seasons rotation for each of many current crops, in one
+        dynamic program: crops are scored by profit per hectare plus their
+        nitrogen balance valued at nitrogen_price (₹/kg N), and every step
+        must follow the rotation rules and the season's crop list.
+        Returns one plan dict per current crop ({'current_crop', 'seasons',
+        'crops', 'score', 'profit', 'nitrogen_balance'}), or None where no
+        sequence satisfies the rules.
+        """
+        seasons = self.season_sequence(start_season, n_seasons)
+        best, choice = self._plan_tables(seasons, nitrogen_price)
+        # Crops the registry doesn't know start from the transition matrix's last row
+        fallback = len(self.crops)
+        current_crops = [str(crop).lower() for crop in current_crops]
+        starts = np.array([self.crop_index.get(crop, fallback) for crop in current_crops], dtype=np.int64)
+        paths = np.empty((len(starts), len(seasons)), dtype=np.int64)
+        previous = starts
+        for t in range(len(seasons)):
+            previous = paths[:, t] = choice[t][previous]
+        scores = best[0][starts]
+        profit = self.profit_per_hectare[paths].sum(axis=1)
+        nitrogen = self.nitrogen_balance[paths].sum(axis=1)
+
+        return [
+            {
+                'current_crop': crop,
+                'seasons': seasons,
+                'crops': [self.crops[i] for i in paths[row]],
+                'score': float(scores[row]),
+                'profit': float(profit[row]),
+                'nitrogen_balance': float(nitrogen[row])
+            } if np.isfinite(scores[row]) else None
+            for row, crop in enumerate(current_crops)
+        ]
+
+    def plan_rotation(self, current_crop, start_season, n_seasons=3, nitrogen_price=NITROGEN_PRICE_PER_KG):
+        """Best n_seasons rotation after current_crop (see plan_rotations)"""
+        return self.plan_rotations([current_crop], start_season, n_seasons, nitrogen_price)[0]
+
+class PortfolioOptimizer:
+    """
+    Allocate farm hectares across crops to maximize expected profit under
+    land, budget and water caps, for one farm or thousands at once.
+    Per-hectare profit and cost (as in EconomicAnalyzer.analyze_crop),
+    water (registry water_need_mm, mm -> m^3/ha) and seasonal suitability
+    are taken from the crop registry as arrays over the crops that have
+    both economics and irrigation data.
+    """
+
+    def __init__(self, registry=None):
+        registry = registry or load_registry()
+        ids = np.flatnonzero(registry.has_economics & registry.has_water)
+        self.crop_ids = ids
+        self.crops = registry.names[ids].astype(str)
+        self.profit = registry.profit_per_hectare[ids]
+        self.cost = registry.cost_per_hectare[ids]
+        # 1 mm over 1 ha is 10 m^3
+        self.water = registry.water_need_mm[ids] * 10.0
+        self.seasons = list(registry.seasons)
+        # Row per season, plus a last all-True row for "any season"
+        self.suitable = np.vstack([registry.season_mask[:, ids], np.ones((1, len(ids)), dtype=bool)])
+
+    def _season_rows(self, seasons, n_farms):
+        if seasons is None or isinstance(seasons, str):
+            seasons = [seasons] * n_farms
+        rows = []
+        for season in seasons:
+            if season is None:
+                rows.append(len(self.seasons))
+            elif season.lower() in self.seasons:
+                rows.append(self.seasons.index(season.lower()))
+            else:
+                raise ValueError(f"Unknown season: {season}")
+        return np.array(rows, dtype=np.int64)
+
+    def optimize(self, area_hectares, budget=None, water_m3=None, season=None, max_share=1.0, method='greedy'):
+        """
+        Best allocation per farm. area_hectares, budget (₹) and water_m3 are
+        scalars or one value per farm (None = no cap); season is None (any),
+        a season name or one per farm; max_share caps each crop's share of a
+        farm's land. Unprofitable and out-of-season crops are never planted.
+        method='greedy' fills crops in order of profit per unit of each
+        farm's scarcest resource, vectorized across farms; method='lp'
+        solves each farm exactly with scipy's linprog (HiGHS), one farm at
+        a time.
+        Returns {'crops', 'hectares' (farms x crops), 'profit', 'cost',
+        'water_m3', 'unplanted_hectares'}.
+        """
+        area = np.atleast_1d(np.asarray(area_hectares, dtype=np.float64))
+        sizes = [len(area)] + [np.size(v) for v in (budget, water_m3) if v is not None]
+        if season is not None and not isinstance(season, str):
+            sizes.append(len(season))
+        n_farms = max(sizes)
+        area = np.broadcast_to(area, (n_farms,))
+        budget = np.broadcast_to(np.inf if budget is None else np.asarray(budget, dtype=np.float64), (n_farms,))
+        water_cap = np.broadcast_to(np.inf if water_m3 is None else np.asarray(water_m3, dtype=np.float64),
+                                    (n_farms,))
+        plantable = self.suitable[self._season_rows(season, n_farms)] & (self.profit > 0)
+        crop_cap = area * max_share
+
+        if method == 'greedy':
+            hectares = self._greedy(area, budget, water_cap, plantable, crop_cap)
+        elif method == 'lp':
+            hectares = self._linear_program(area, budget, water_cap, plantable, crop_cap)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+
+        return {
+            'crops': self.crops,
+            'hectares': hectares,
+            'profit': hectares @ self.profit,
+            'cost': hectares @ self.cost,
+            'water_m3': hectares @ self.water,
+            'unplanted_hectares': np.maximum(area - hectares.sum(axis=1), 0.0)
+        }
+
+    def _greedy(self, area, budget, water_cap, plantable, crop_cap):
+        n_farms = len(area)
+        # Share of the tightest resource one hectare of each crop uses up, per farm
+        with np.errstate(divide='ignore'):
+            load = np.maximum.reduce([
+                np.broadcast_to((1.0 / area)[:, None], plantable.shape),
+                self.cost / budget[:, None],
+                self.water / water_cap[:, None]
+            ])
+            score = np.where(plantable, self.profit / load, -np.inf)
+        order = np.argsort(-score, axis=1, kind='stable')
+
+        hectares = np.zeros(plantable.shape)
+        farms = np.arange(n_farms)
+        land_left, budget_left, water_left = area.copy(), budget.copy(), water_cap.copy()
+        for rank in range(plantable.shape[1]):
+            crop = order[:, rank]
+            usable = plantable[farms, crop]
+            if not usable.any():
+                break
+            amount = np.minimum.reduce([
+                crop_cap, land_left, budget_left / self.cost[crop], water_left / self.water[crop]
+            ])
+            amount = np.where(usable, np.maximum(amount, 0.0), 0.0)
+            hectares[farms, crop] = amount
+            land_left -= amount
+            budget_left -= amount * self.cost[crop]
+            water_left -= amount * self.water[crop]
+        return hectares
+
+    def _linear_program(self, area, budget, water_cap, plantable, crop_cap):
+        from scipy.optimize import linprog
+
+        hectares = np.zeros(plantable.shape)
+        for farm in range(len(area)):
+            columns = np.flatnonzero(plantable[farm])
+            if not len(columns):
+                continue
+            rows = [(np.ones(len(columns)), area[farm])]
+            if np.isfinite(budget[farm]):
+                rows.append((self.cost[columns], budget[farm]))
+            if np.isfinite(water_cap[farm]):
+                rows.append((self.water[columns], water_cap[farm]))
+            result = linprog(
+                -self.profit[columns],
+                A_ub=np.array([row for row, _ in rows]),
+                b_ub=np.array([bound for _, bound in rows]),
+                bounds=(0.0, crop_cap[farm]),
+                method='highs'
+            )
+            if not result.success:
+                raise RuntimeError(f"Portfolio optimization failed for farm {farm}: {result.message}")
+            hectares[farm, columns] = result.x
+        return hectares
+
+    def allocation_table(self, result, farm=0):
+        """Planted crops of one farm from an optimize() result, largest area first"""
+        hectares = result['hectares'][farm]
+        planted = np.flatnonzero(hectares > 1e-9)
+        table = pd.DataFrame({
+            'crop': self.crops[planted],
+            'hectares': hectares[planted],
+            'cost': hectares[planted] * self.cost[planted],
+            'profit': hectares[planted] * self.profit[planted],
+            'water_m3': hectares[planted] * self.water[planted]
+        })
+        return table.sort_values('hectares', ascending=False, ignore_index=True)
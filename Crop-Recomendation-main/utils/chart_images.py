@@ -0,0 +1,161 @@
+import functools
+import math
+from io import BytesIO
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from utils import chart_style
+
+# PNG renders of the app's charts for PDF reports. The app's charts are
+# Plotly figures, but rasterizing those needs plotly.io.to_image and the
+# kaleido browser engine, which is not a dependency and takes seconds per
+# image, so they are redrawn with PIL from the same colours, titles and
+# ranges (utils/chart_style.py) as utils/visualization.py uses.
+
+BAR_COLOR = ImageColor.getrgb(chart_style.BAR_COLOR)
+THRESHOLD_COLOR = ImageColor.getrgb(chart_style.GAUGE_THRESHOLD_COLOR)
+TEXT_COLOR = ImageColor.getrgb(chart_style.TEXT_COLOR)
+GRID_COLOR = ImageColor.getrgb(chart_style.GRID_COLOR)
+
+GAUGE_SIZE = (360, 220)
+BAR_CHART_SIZE = (900, 420)
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size):
+    return ImageFont.load_default(size=size)
+
+
+def _to_png(image):
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', optimize=False)
+    return buffer.getvalue()
+
+
+def _centered_text(draw, xy, text, size, fill=TEXT_COLOR):
+    font = _font(size)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    draw.text((xy[0] - (right - left) / 2, xy[1] - (bottom - top) / 2 - top), text, font=font, fill=fill)
+
+
+def _gauge_geometry(size):
+    width, height = size
+    radius = min(width / 2 - 20, height - 70)
+    center = (width / 2, height - 30)
+    box = [center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius]
+    return center, radius, box
+
+
+def _value_angle(value, min_val, max_val):
+    """PIL angle (degrees clockwise from 3 o'clock) of value on the 180..360 gauge arc"""
+    span = max_val - min_val
+    share = 0.0 if span == 0 else min(max((value - min_val) / span, 0.0), 1.0)
+    return 180.0 + 180.0 * share
+
+
+@functools.lru_cache(maxsize=64)
+def _gauge_template(title, min_val, max_val, size):
+    """Everything on a gauge except the value: drawn once per title and range"""
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    center, radius, box = _gauge_geometry(size)
+    thickness = int(radius * 0.35)
+    for low, high, color in chart_style.gauge_steps(min_val, max_val):
+        start = _value_angle(low, min_val, max_val)
+        end = _value_angle(high, min_val, max_val)
+        draw.arc(box, start, end, fill=ImageColor.getrgb(color), width=thickness)
+    _centered_text(draw, (size[0] / 2, 18), title, 20)
+    _centered_text(draw, (center[0] - radius + thickness / 2, center[1] + 14), f"{min_val:g}", 13)
+    _centered_text(draw, (center[0] + radius - thickness / 2, center[1] + 14), f"{max_val:g}", 13)
+    return image
+
+
+@functools.lru_cache(maxsize=4096)
+def _gauge_png(title, min_val, max_val, value, size):
+    image = _gauge_template(title, min_val, max_val, size).copy()
+    draw = ImageDraw.Draw(image)
+    center, radius, box = _gauge_geometry(size)
+    thickness = int(radius * 0.35)
+    angle = _value_angle(value, min_val, max_val)
+    # Value bar, narrower than the step band like Plotly's gauge bar
+    inset = thickness * 0.3
+    draw.arc([box[0] + inset, box[1] + inset, box[2] - inset, box[3] - inset],
+             180, angle, fill=BAR_COLOR, width=int(thickness * 0.4))
+    # Threshold line across the band at the value
+    rad = math.radians(angle)
+    length = thickness * chart_style.GAUGE_THRESHOLD_THICKNESS
+    inner, outer = radius - (thickness + length) / 2, radius - (thickness - length) / 2
+    draw.line([
+        (center[0] + inner * math.cos(rad), center[1] + inner * math.sin(rad)),
+        (center[0] + outer * math.cos(rad), center[1] + outer * math.sin(rad))
+    ], fill=THRESHOLD_COLOR, width=chart_style.GAUGE_THRESHOLD_WIDTH)
+    _centered_text(draw, (center[0], center[1] - 12), f"{value:.2f}", 26)
+    return _to_png(image)
+
+
+def render_gauge_png(value, title, min_val, max_val, size=GAUGE_SIZE):
+    """
+    PNG of a create_gauge_chart-style gauge.
+    The template is cached per (title, range) and finished images per
+    value at the two decimals the gauge displays, so repeated reports
+    reuse both.
+    """
+    return _gauge_png(str(title), float(min_val), float(max_val), round(float(value), 2), tuple(size))
+
+
+@functools.lru_cache(maxsize=256)
+def _bar_chart_png(labels, values, title, axis_title, size):
+    width, height = size
+    image = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(image)
+    _centered_text(draw, (width / 2, 22), title, 20)
+
+    label_font = _font(14)
+    label_width = max(draw.textlength(label, font=label_font) for label in labels) + 16
+    left, right, top, bottom = label_width, width - 30, 50, height - 50
+    max_value = chart_style.bar_axis_range(values)[1]
+
+    for i in range(5):
+        x = left + (right - left) * i / 4
+        draw.line([(x, top), (x, bottom)], fill=GRID_COLOR, width=1)
+        _centered_text(draw, (x, bottom + 14), f"{max_value * i / 4:.2f}", 12)
+    _centered_text(draw, ((left + right) / 2, height - 14), axis_title, 14)
+
+    row_height = (bottom - top) / len(labels)
+    # Highest value at the top, matching the Plotly chart's ascending sort
+    for i, (label, value) in enumerate(zip(labels, values)):
+        y0 = bottom - (i + 1) * row_height + row_height * 0.15
+        y1 = bottom - i * row_height - row_height * 0.15
+        draw.rectangle([left, y0, left + (right - left) * max(value, 0.0) / max_value, y1], fill=BAR_COLOR)
+        text_width = draw.textlength(label, font=label_font)
+        draw.text((left - 8 - text_width, (y0 + y1) / 2 - 8), label, font=label_font, fill=TEXT_COLOR)
+    return _to_png(image)
+
+
+def render_feature_importance_png(importance_scores, feature_names, size=BAR_CHART_SIZE):
+    """PNG of a create_feature_importance_plot-style bar chart, cached per input"""
+    pairs = sorted(zip(feature_names, (float(v) for v in importance_scores)), key=lambda pair: pair[1])
+    labels = tuple(str(name) for name, _ in pairs)
+    values = tuple(round(value, 6) for _, value in pairs)
+    return _bar_chart_png(labels, values, chart_style.FEATURE_IMPORTANCE_TITLE,
+                          chart_style.FEATURE_IMPORTANCE_AXIS_TITLE, tuple(size))
+
+
+def feature_importance_from_figure(fig):
+    """(scores, names) plotted by a create_feature_importance_plot figure"""
+    trace = fig.data[0]
+    return [float(v) for v in trace.x], [str(name) for name in trace.y]
+
+
+def clear_caches():
+    for cached in (_gauge_png, _gauge_template, _bar_chart_png):
+        cached.cache_clear()
+
+
+def cache_info():
+    """Hit/miss statistics of the rendered-image caches"""
+    return {
+        'gauge': _gauge_png.cache_info()._asdict(),
+        'gauge_template': _gauge_template.cache_info()._asdict(),
+        'bar_chart': _bar_chart_png.cache_info()._asdict()
+    }
@@ -0,0 +1,35 @@
+# Colours, titles and axis ranges shared by the interactive Plotly charts
+# (utils/visualization.py) and their PNG renders for PDF reports
+# (utils/chart_images.py), so both draw the same chart from one spec
+
+BAR_COLOR = '#4CAF50'
+SECONDARY_BAR_COLOR = '#2196F3'
+TEXT_COLOR = '#2A3F5F'
+GRID_COLOR = '#E6E6E6'
+
+# Gauges: the range is split into equal thirds, one step colour each
+GAUGE_STEP_COLORS = ['lightgray', 'gray', 'darkgray']
+GAUGE_THRESHOLD_COLOR = 'red'
+GAUGE_THRESHOLD_WIDTH = 4
+# Threshold length as a share of the step band
+GAUGE_THRESHOLD_THICKNESS = 0.75
+
+FEATURE_IMPORTANCE_TITLE = 'Feature Importance in Crop Prediction'
+FEATURE_IMPORTANCE_AXIS_TITLE = 'Importance Score'
+# Headroom past the largest bar on the value axis
+BAR_AXIS_PADDING = 1.05
+
+
+def gauge_steps(min_val, max_val):
+    """[(low, high, color), ...] step bands of a gauge over [min_val, max_val]"""
+    span = max_val - min_val
+    n = len(GAUGE_STEP_COLORS)
+    return [
+        (min_val + span * i / n, min_val + span * (i + 1) / n, color)
+        for i, color in enumerate(GAUGE_STEP_COLORS)
+    ]
+
+
+def bar_axis_range(values):
+    """[0, high] value-axis range for a bar chart of non-negative values"""
+    return [0.0, (max(max(values, default=0.0), 0.0) or 1.0) * BAR_AXIS_PADDING]
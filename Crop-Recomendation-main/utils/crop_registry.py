@@ -0,0 +1,121 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_PATH = 'attached_assets/crop_registry.csv'
+# Registry columns: season_<name> columns give a crop's position in that
+# season's list (blank when it is not grown then). avg_yield is kg per
+# hectare and price_per_kg rupees per kg (coconut: nuts and rupees per nut),
+# so avg_yield * price_per_kg is the revenue per hectare.
+SEASON_PREFIX = 'season_'
+CATEGORIES = ['legumes', 'cereals', 'cash_crops']
+NUMERIC_COLUMNS = ['water_need_mm', 'irrigation_frequency_days', 'cost_per_hectare', 'avg_yield', 'price_per_kg']
+
+
+class CropRegistry:
+    """
+    Every crop fact the app uses, as arrays indexed by integer crop ID.
+    IDs follow the registry file's row order, which lists the classifier's
+    crops first in get_crop_labels() order, so ID i is class i for those.
+    Missing facts are NaN (numeric), -1 (category) or not in season;
+    has_water / has_economics mark the crops each component can use.
+    """
+
+    def __init__(self, table):
+        table = table.reset_index(drop=True)
+        names = table['crop'].astype(str).str.strip().str.lower()
+        if names.duplicated().any():
+            raise ValueError(f"Duplicate crops in registry: {', '.join(names[names.duplicated()])}")
+        self.names = names.to_numpy(dtype=object)
+        self.sorted_names = tuple(sorted(self.names))
+        self.name_index = pd.Index(self.names)
+        self.ids_by_name = {name: i for i, name in enumerate(self.names)}
+
+        categories = table['category'].fillna('').astype(str).str.strip().str.lower()
+        unknown = sorted(set(categories) - set(CATEGORIES) - {''})
+        if unknown:
+            raise ValueError(f"Unknown crop categories in registry: {', '.join(unknown)}")
+        self.category = np.array([CATEGORIES.index(c) if c else -1 for c in categories], dtype=np.int8)
+
+        for column in NUMERIC_COLUMNS:
+            setattr(self, column, pd.to_numeric(table[column]).to_numpy(dtype=np.float64))
+        self.has_water = ~np.isnan(self.water_need_mm) & ~np.isnan(self.irrigation_frequency_days)
+        self.has_economics = ~(np.isnan(self.cost_per_hectare) | np.isnan(self.avg_yield) |
+                               np.isnan(self.price_per_kg))
+        self.revenue_per_hectare = self.avg_yield * self.price_per_kg
+        self.profit_per_hectare = self.revenue_per_hectare - self.cost_per_hectare
+
+        season_columns = [column for column in table.columns if column.startswith(SEASON_PREFIX)]
+        self.seasons = [column[len(SEASON_PREFIX):] for column in season_columns]
+        # season_rank[s, i]: position of crop i in season s's list, NaN if not grown
+        self.season_rank = np.array([pd.to_numeric(table[column]).to_numpy(dtype=np.float64)
+                                     for column in season_columns]).reshape(len(season_columns), len(table))
+        self.season_mask = ~np.isnan(self.season_rank)
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        return cls(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        """ID of one crop; KeyError if it is not registered"""
+        return self.ids_by_name[str(name).lower()]
+
+    def ids(self, names):
+        """IDs for an iterable of crop names, -1 for unregistered ones"""
+        return self.name_index.get_indexer(pd.Series(list(names), dtype=str).str.lower())
+
+    def category_name(self, crop_id):
+        category = self.category[crop_id]
+        return CATEGORIES[category] if category >= 0 else None
+
+    def season_index(self, season):
+        """Row of season in season_rank / season_mask; ValueError if unknown"""
+        season = str(season).lower()
+        if season not in self.seasons:
+            raise ValueError(f"Unknown season: {season}")
+        return self.seasons.index(season)
+
+    def season_crop_ids(self, season):
+        """IDs of the crops grown in season, in the season list's order"""
+        rank = self.season_rank[self.season_index(season)]
+        grown = np.flatnonzero(~np.isnan(rank))
+        return grown[np.argsort(rank[grown], kind='stable')]
+
+    def category_crop_ids(self, category):
+        """IDs of the crops in category, in registry order"""
+        return np.flatnonzero(self.category == CATEGORIES.index(category))
+
+    def water_requirements(self):
+        """{crop: {'water_need', 'frequency'}} for crops with irrigation data"""
+        return {
+            self.names[i]: {'water_need': int(self.water_need_mm[i]),
+                            'frequency': int(self.irrigation_frequency_days[i])}
+            for i in np.flatnonzero(self.has_water)
+        }
+
+    def crop_economics(self):
+        """{crop: {'cost_per_hectare', 'avg_yield', 'price_per_kg'}} for crops with economics"""
+        return {
+            self.names[i]: {'cost_per_hectare': float(self.cost_per_hectare[i]),
+                            'avg_yield': float(self.avg_yield[i]),
+                            'price_per_kg': float(self.price_per_kg[i])}
+            for i in np.flatnonzero(self.has_economics)
+        }
+
+    def seasonal_crops(self):
+        """{season: [crop, ...]} in each season list's order"""
+        return {season: list(self.names[self.season_crop_ids(season)]) for season in self.seasons}
+
+    def rotation_benefits(self):
+        """{category: [crop, ...]} in registry order"""
+        return {category: list(self.names[self.category_crop_ids(category)]) for category in CATEGORIES}
+
+
+@functools.lru_cache(maxsize=None)
+def load_registry(path=REGISTRY_PATH):
+    """The registry at path, loaded once per process"""
+    return CropRegistry.load(path)
@@ -0,0 +1,348 @@
+import argparse
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:
+    # Unix only; without it there are no memory metrics
+    resource = None
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEFAULT_EXPORT_INTERVAL = 15.0
+
+# Metrics recorded by the app: name -> (type, help)
+METRICS = {
+    'crop_dataset_load_seconds': ('histogram', "Time to open the columnar dataset, converting the CSV if needed"),
+    'crop_training_seconds': ('histogram', "Wall-clock time of a full training pipeline run"),
+    'crop_model_fit_seconds': ('histogram', "Final fit and test scoring time per model (cache misses only)"),
+    'crop_model_cv_fold_seconds': ('histogram', "Cross-validation fold time per model (cache misses only)"),
+    'crop_predict_seconds': ('histogram', "Latency of CropRecommender.predict / predict_batch calls"),
+    'crop_predict_rows_total': ('counter', "Rows scored by the recommender"),
+    'crop_prediction_cache_lookups_total': ('counter', "Prediction cache lookups by result (hit/miss)"),
+    'crop_prediction_cache_hit_ratio': ('gauge', "Lifetime hit ratio of the prediction cache"),
+    'crop_chart_build_seconds': ('histogram', "Time to build a Plotly figure, by chart"),
+    'crop_pdf_build_seconds': ('histogram', "Time to build a PDF report"),
+    'crop_http_requests_total': ('counter', "Inference service requests by path and status"),
+    'crop_errors_total': ('counter', "Errors surfaced to users, by stage"),
+    'process_resident_memory_bytes': ('gauge', "Current resident set size"),
+    'process_peak_resident_memory_bytes': ('gauge', "Peak resident set size"),
+}
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters, gauges and histograms keyed by
+    (name, labels). Recording is a no-op while the registry is disabled,
+    so instrumented code costs one attribute check when metrics are off.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.enabled = False
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1.0, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[self._key(name, labels)] = float(value)
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        """{(name, labels): value or (bucket_counts, sum, count)} copy of every metric"""
+        with self._lock:
+            return {
+                key: (list(v.counts), v.sum, v.count) if isinstance(v, _Histogram) else v
+                for key, v in self._values.items()
+            }
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        for name, value in (('process_resident_memory_bytes', current_rss_bytes()),
+                            ('process_peak_resident_memory_bytes', peak_rss_bytes())):
+            if value is not None:
+                self.set(name, value)
+        by_name = {}
+        for (name, labels), value in sorted(self.snapshot().items()):
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, samples in by_name.items():
+            metric_type, help_text = METRICS.get(
+                name, ('histogram' if isinstance(samples[0][1], tuple) else 'untyped', None)
+            )
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                if not isinstance(value, tuple):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None where it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None without the resource module"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+REGISTRY = MetricsRegistry()
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def is_enabled():
+    return REGISTRY.enabled
+
+
+def inc(name, amount=1.0, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+def set_gauge(name, value, **labels):
+    REGISTRY.set(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+class _Timer:
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """Context manager observing the block's duration into histogram name"""
+    if not REGISTRY.enabled:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def timed(name, **labels):
+    """Decorator observing each call's duration into histogram name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+
+def render():
+    return REGISTRY.render()
+
+
+def write_textfile(path):
+    """Atomically write the current metrics, e.g. for node_exporter's textfile collector"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+def start_http_server(port, host='0.0.0.0'):
+    """Serve GET /metrics from a daemon thread and return the server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_file_exporter(path, interval=DEFAULT_EXPORT_INTERVAL):
+    """Rewrite path every interval seconds from a daemon thread; returns a stop Event"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                write_textfile(path)
+            except OSError as e:
+                print(f"Could not write metrics file: {str(e)}")
+
+    threading.Thread(target=run, name="metrics-file", daemon=True).start()
+    return stop
+
+
+def configure_from_env(environ=os.environ):
+    """
+    Enable metrics from the environment:
+    CROP_METRICS_PORT      serve /metrics on this port
+    CROP_METRICS_FILE      rewrite this file every CROP_METRICS_INTERVAL seconds
+    CROP_METRICS=1         record only (read with render())
+    Returns True if metrics were enabled.
+    """
+    port = environ.get('CROP_METRICS_PORT')
+    path = environ.get('CROP_METRICS_FILE')
+    if not (port or path or environ.get('CROP_METRICS')):
+        return False
+    enable()
+    if port:
+        start_http_server(int(port))
+    if path:
+        start_file_exporter(path, float(environ.get('CROP_METRICS_INTERVAL', DEFAULT_EXPORT_INTERVAL)))
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure the per-call cost of instrumentation with metrics disabled and enabled"
+    )
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    @timed('crop_overhead_probe_seconds')
+    def probe():
+        return None
+
+    def bare():
+        return None
+
+    for label, func in (('bare call', bare), ('timed, disabled', probe)):
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            func()
+        print(f"{label:<18} {(time.perf_counter() - start) / args.calls * 1e9:8.1f} ns/call")
+    enable()
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        probe()
+    print(f"{'timed, enabled':<18} {(time.perf_counter() - start) / args.calls * 1e9:8.1f} ns/call")
+    disable()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,198 @@
-import pandas as pd
+import threading
+import zipfile
+from collections import OrderedDict
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Flowable
+)
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from io import BytesIO
-import plotly.io as pio
-import numpy as np
+from utils import metrics
+from utils.chart_images import (
+    render_gauge_png, render_feature_importance_png, feature_importance_from_figure,
+    GAUGE_SIZE, BAR_CHART_SIZE
+)
 
+REPORT_TITLE = "Crop Recommendation Report"
+FOOTER_TEXT = "Crop Recommendation System"
+# Share of the frame width for the importance chart, sized so a report fits one page
+IMPORTANCE_CHART_SCALE = 0.5
+# Decoded chart images kept per builder
+IMAGE_CACHE_SIZE = 512
+
+class _ChartImage(Flowable):
+    """Draws an already decoded ImageReader, which platypus.Image cannot take"""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height)
+
+class ReportBuilder:
+    """
+    Builds recommendation reports with all fixed parts made once:
+    the style sheet, the title style, the parameter TableStyle, the page
+    footer and decoded chart images. Flowables are laid out in place, so
+    every story gets new ones. Not thread-safe; use one builder per
+    thread, e.g. via default_builder().
+    ReportLab ASCII85-encodes embedded images in pure Python by default;
+    report workers can set RL_useA85=0 in the environment (ReportLab's
+    own setting) to store them binary, about 1.4x the reports/second.
+    """
+
+    def __init__(self, pagesize=letter):
+        self.pagesize = pagesize
+        self.styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=self.styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30
+        )
+        self.param_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.green),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        # Frame width SimpleDocTemplate uses with its default one-inch margins
+        self.frame_width = SimpleDocTemplate(BytesIO(), pagesize=pagesize).width
+        self._images = OrderedDict()
+
+    def _draw_footer(self, canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 9)
+        canvas.setFillColor(colors.grey)
+        canvas.drawString(doc.leftMargin, doc.bottomMargin / 2, FOOTER_TEXT)
+        canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, doc.bottomMargin / 2,
+                               f"Page {canvas.getPageNumber()}")
+        canvas.restoreState()
+
+    def _chart(self, png, size, width):
+        """Flowable for PNG bytes scaled to width points; decoded images are reused"""
+        reader = self._images.get(png)
+        if reader is None:
+            reader = self._images[png] = ImageReader(BytesIO(png))
+            if len(self._images) > IMAGE_CACHE_SIZE:
+                self._images.popitem(last=False)
+        else:
+            self._images.move_to_end(png)
+        return _ChartImage(reader, width, width * size[1] / size[0])
+
+    def story(self, prediction_data, crop_probabilities, feature_importance_fig=None):
+        """Flowables for one report (see create_prediction_pdf for the inputs)"""
+        styles = self.styles
+        story = [Paragraph(REPORT_TITLE, self.title_style), Spacer(1, 20)]
+
+        # Main Prediction
+        story.append(Paragraph(f"Recommended Crop: {prediction_data['prediction'].title()}", styles["Heading2"]))
+        story.append(Spacer(1, 10))
+
+        # Input Parameters Table
+        param_data = [["Parameter", "Value"]]
+        for param, value in prediction_data['parameters'].items():
+            param_data.append([param, f"{value:.2f}"])
+        table = Table(param_data, colWidths=[200, 100])
+        table.setStyle(self.param_table_style)
+        story.append(table)
+        story.append(Spacer(1, 20))
+
+        # Parameter gauges, side by side
+        gauges = prediction_data.get('gauges') or []
+        if gauges:
+            gauge_width = self.frame_width / len(gauges)
+            gauge_row = [
+                self._chart(
+                    render_gauge_png(g['value'], g['title'], g['min'], g['max']),
+                    GAUGE_SIZE, gauge_width - 10
+                )
+                for g in gauges
+            ]
+            story.append(Table([gauge_row], colWidths=[gauge_width] * len(gauges)))
+            story.append(Spacer(1, 20))
+
+        # Alternative Crops
+        story.append(Paragraph("Alternative Crop Recommendations:", styles["Heading3"]))
+        for crop, prob in crop_probabilities:
+            story.append(Paragraph(f"• {crop.title()}: {prob:.1f}% confidence", styles["Normal"]))
+        story.append(Spacer(1, 20))
+
+        # Feature importance chart
+        if feature_importance_fig is not None:
+            importance_scores, feature_names = feature_importance_from_figure(feature_importance_fig)
+        else:
+            importance = prediction_data.get('feature_importance') or {}
+            feature_names, importance_scores = list(importance), list(importance.values())
+        if feature_names:
+            story.append(Paragraph("Parameter Importance Analysis:", styles["Heading3"]))
+            chart = self._chart(
+                render_feature_importance_png(importance_scores, feature_names),
+                BAR_CHART_SIZE, self.frame_width * IMPORTANCE_CHART_SCALE
+            )
+            chart.hAlign = 'CENTER'
+            story.append(chart)
+        return story
+
+    def _document(self, output):
+        return SimpleDocTemplate(output, pagesize=self.pagesize)
+
+    def build(self, prediction_data, crop_probabilities, feature_importance_fig=None):
+        """One report as PDF bytes"""
+        buffer = BytesIO()
+        self._document(buffer).build(
+            self.story(prediction_data, crop_probabilities, feature_importance_fig),
+            onFirstPage=self._draw_footer, onLaterPages=self._draw_footer
+        )
+        pdf_output = buffer.getvalue()
+        buffer.close()
+        return pdf_output
+
+    def write_zip(self, reports, output, name_format="report-{:06d}.pdf"):
+        """
+        Write each (prediction_data, crop_probabilities) pair as its own PDF
+        into a ZIP archive (path or binary file), one report in memory at a
+        time. Returns the number of reports written.
+        """
+        count = 0
+        # PDF streams are already deflated, so store them uncompressed
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for prediction_data, crop_probabilities in reports:
+                archive.writestr(name_format.format(count), self.build(prediction_data, crop_probabilities))
+                count += 1
+        return count
+
+_local = threading.local()
+
+def default_builder():
+    """This thread's shared ReportBuilder"""
+    builder = getattr(_local, 'builder', None)
+    if builder is None:
+        builder = _local.builder = ReportBuilder()
+    return builder
+
+@metrics.timed('crop_pdf_build_seconds')
 def create_prediction_pdf(prediction_data, feature_importance_fig, crop_probabilities):
-    """Generate a PDF report for crop predictions"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30
-    )
-    story.append(Paragraph("Crop Recommendation Report", title_style))
-    story.append(Spacer(1, 20))
-
-    # Main Prediction
-    story.append(Paragraph(f"Recommended Crop: {prediction_data['prediction'].title()}", styles["Heading2"]))
-    story.append(Spacer(1, 10))
-
-    # Input Parameters Table
-    param_data = [["Parameter", "Value"]]
-    for param, value in prediction_data['parameters'].items():
-        param_data.append([param, f"{value:.2f}"])
-
-    table = Table(param_data, colWidths=[200, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.green),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(table)
-    story.append(Spacer(1, 20))
-
-    # Alternative Crops
-    story.append(Paragraph("Alternative Crop Recommendations:", styles["Heading3"]))
-    for crop, prob in crop_probabilities:
-        story.append(Paragraph(f"• {crop.title()}: {prob:.1f}% confidence", styles["Normal"]))
-    story.append(Spacer(1, 20))
-
-    # Save and return PDF
-    doc.build(story)
-    pdf_output = buffer.getvalue()
-    buffer.close()
-    return pdf_output
+    """
+    Generate a PDF report for crop predictions
+    Charts are embedded as cached PNG renders: the feature importance from
+    feature_importance_fig (or prediction_data['feature_importance'], a
+    {feature: score} dict, when no figure is passed) and one gauge per
+    prediction_data['gauges'] entry ({'title', 'value', 'min', 'max'}).
+    """
+    return default_builder().build(prediction_data, crop_probabilities, feature_importance_fig)
@@ -0,0 +1,202 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.pdf_generator import create_prediction_pdf
+
+DEFAULT_WORKERS = 2
+DEFAULT_CHUNK_ROWS = 1000
+
+# Report labels for the model's feature columns, as shown in the app
+PARAMETER_NAMES = {
+    'N': 'Nitrogen',
+    'P': 'Phosphorus',
+    'K': 'Potassium',
+    'temperature': 'Temperature',
+    'humidity': 'Humidity',
+    'ph': 'pH',
+    'rainfall': 'Rainfall'
+}
+# Gauges shown for each recommendation: (feature column, title)
+GAUGE_FEATURES = [('N', 'Nitrogen Level'), ('ph', 'pH Level'), ('rainfall', 'Rainfall')]
+
+
+def make_gauges(features, stats):
+    """Gauge specs for a {feature column: value} dict, with ranges from dataset stats"""
+    return [
+        {'title': title, 'value': float(features[column]),
+         'min': stats[column]['min'], 'max': stats[column]['max']}
+        for column, title in GAUGE_FEATURES
+    ]
+
+
+def render_report(job):
+    """Build one PDF from a job dict; module level so process pools can run it"""
+    return create_prediction_pdf(job['prediction_data'], None, job['crop_probabilities'])
+
+
+class ReportService:
+    """
+    Render PDF reports on a bounded background pool.
+    Jobs are plain dicts ({'prediction_data', 'crop_probabilities'}), so
+    they can be sent to worker processes; submit() returns a Future of the
+    PDF bytes. Threads suit interactive use (one report at a time, shared
+    image caches); processes suit bulk runs, where ReportLab's pure-Python
+    layout would otherwise serialize on the GIL.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, processes=False):
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        kwargs = {} if processes else {'thread_name_prefix': 'report'}
+        self.max_workers = max_workers
+        self._executor = pool(max_workers=max_workers, **kwargs)
+
+    def submit_job(self, job):
+        return self._executor.submit(render_report, job)
+
+    def submit(self, prediction_data, crop_probabilities):
+        return self.submit_job({
+            'prediction_data': prediction_data,
+            'crop_probabilities': list(crop_probabilities)
+        })
+
+    def map_jobs(self, jobs):
+        """Yield PDF bytes for an iterable of jobs in order, with at most 2 jobs per worker in flight"""
+        pending = deque()
+        for job in jobs:
+            pending.append(self.submit_job(job))
+            if len(pending) >= 2 * self.max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def jobs_from_scored(chunk, stats, feature_importance=None):
+    """Report jobs for a chunk of model.batch_scorer output rows"""
+    rank_columns = []
+    rank = 1
+    while f'top{rank}_crop' in chunk.columns:
+        rank_columns.append((f'top{rank}_crop', f'top{rank}_probability'))
+        rank += 1
+
+    for row in chunk.to_dict('records'):
+        yield {
+            'prediction_data': {
+                'prediction': str(row['predicted_crop']),
+                'parameters': {name: float(row[column]) for column, name in PARAMETER_NAMES.items()},
+                'gauges': make_gauges(row, stats),
+                'feature_importance': feature_importance
+            },
+            'crop_probabilities': [
+                (str(row[crop_column]), float(row[prob_column]) * 100)
+                for crop_column, prob_column in rank_columns
+            ]
+        }
+
+
+def generate_bulk(scored_path, output, workers=DEFAULT_WORKERS, limit=None,
+                  feature_importance=None, stats=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                  log=sys.stderr):
+    """
+    Build one report per row of a batch-scoring output file, streaming the
+    input in chunks. output decides the layout:
+    - a .zip path: one PDF per row in a ZIP archive
+    - anything else: a directory of report-000000.pdf, ...
+    A single combined .pdf is refused: it would hold every report in
+    memory until written.
+    Returns a dict with the report count, elapsed seconds and reports/second.
+    """
+    import zipfile
+
+    from model.batch_scorer import iter_input_chunks
+    from model.dataset import load_dataset_stats
+
+    if output.lower().endswith('.pdf'):
+        raise ValueError("Bulk reports cannot be combined into one PDF; write a .zip archive or a directory")
+    stats = stats or load_dataset_stats()
+
+    def jobs():
+        produced = 0
+        for chunk in iter_input_chunks(scored_path, chunk_rows):
+            if limit is not None:
+                chunk = chunk.iloc[:max(limit - produced, 0)]
+            yield from jobs_from_scored(chunk, stats, feature_importance)
+            produced += len(chunk)
+            if limit is not None and produced >= limit:
+                return
+
+    start = time.perf_counter()
+    count = 0
+    archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) \
+        if output.lower().endswith('.zip') else None
+    if archive is None:
+        os.makedirs(output, exist_ok=True)
+    service = ReportService(workers, processes=True) if workers > 1 else None
+    try:
+        pdfs = service.map_jobs(jobs()) if service else (render_report(job) for job in jobs())
+        for pdf in pdfs:
+            name = f"report-{count:06d}.pdf"
+            if archive is not None:
+                archive.writestr(name, pdf)
+            else:
+                with open(os.path.join(output, name), 'wb') as f:
+                    f.write(pdf)
+            count += 1
+            if count % 500 == 0:
+                print(f"Wrote {count:,} reports", file=log)
+    finally:
+        if service:
+            service.close()
+        if archive is not None:
+            archive.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'reports': count,
+        'seconds': elapsed,
+        'reports_per_second': count / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate one PDF report per row of a model.batch_scorer output file"
+    )
+    parser.add_argument('scored', help="Scored CSV or Parquet file from python -m model.batch_scorer")
+    parser.add_argument('output', help="Directory for one PDF per row, or a .zip file")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Rendering processes for directory/ZIP output (0 = one per CPU core, 1 = in-process)")
+    parser.add_argument('--limit', type=int, help="Only the first N rows")
+    parser.add_argument('--no-importance', action='store_true',
+                        help="Skip the feature-importance chart (avoids loading the model)")
+    args = parser.parse_args(argv)
+    if args.output.lower().endswith('.pdf'):
+        parser.error("one combined PDF is not supported for bulk runs; use a .zip file or a directory")
+
+    feature_importance = None
+    if not args.no_importance:
+        from model.crop_recommendation_model import CropRecommender, FEATURE_COLUMNS
+
+        scores = CropRecommender().get_feature_importance()
+        feature_importance = {
+            PARAMETER_NAMES[column]: float(score) for column, score in zip(FEATURE_COLUMNS, scores)
+        }
+
+    result = generate_bulk(
+        args.scored, args.output,
+        workers=args.workers or os.cpu_count() or 1,
+        limit=args.limit,
+        feature_importance=feature_importance
+    )
+    print(f"Done: {result['reports']:,} reports in {result['seconds']:.2f}s "
+          f"({result['reports_per_second']:,.1f} reports/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SCENARIOS = 100_000
+DEFAULT_YIELD_CV = 0.20
+DEFAULT_PRICE_CV = 0.15
+# Good harvests tend to come with lower prices
+DEFAULT_CORRELATION = -0.3
+DEFAULT_SEED = 42
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_VAR_CONFIDENCE = 0.95
+# Scenarios per chunk; each chunk draws from its own spawned seed, so results
+# depend on the seed and chunk size but not on the number of workers
+CHUNK_SCENARIOS = 50_000
+# Log-revenue histogram per crop, spanning +/- HISTOGRAM_SIGMAS standard deviations
+HISTOGRAM_BINS = 16384
+HISTOGRAM_SIGMAS = 8.0
+DEFAULT_CACHE_SIZE = 128
+
+
+def _lognormal_params(mean, cv):
+    """(mu, sigma) of a lognormal with the given mean and coefficient of variation"""
+    sigma = np.sqrt(np.log1p(np.square(cv)))
+    return np.log(mean) - sigma ** 2 / 2, sigma
+
+
+def _simulate_chunk(task):
+    """
+    Simulate one chunk of scenarios for every crop and reduce it to
+    (log-revenue histogram counts, profit sums, loss counts). Module level
+    so process pools can run it; returns small arrays instead of samples.
+    """
+    (seed, n, mu_yield, sigma_yield, mu_price, sigma_price, correlation,
+     cost, log_low, bin_width) = task
+    rng = np.random.default_rng(seed)
+    n_crops = len(cost)
+    z_yield = rng.standard_normal((n_crops, n))
+    z_price = correlation[:, None] * z_yield + \
+        np.sqrt(1.0 - correlation ** 2)[:, None] * rng.standard_normal((n_crops, n))
+    log_yield = mu_yield[:, None] + sigma_yield[:, None] * z_yield
+    log_price = mu_price[:, None] + sigma_price[:, None] * z_price
+    log_revenue = log_yield + log_price
+    profit = np.exp(log_revenue) - cost[:, None]
+
+    bins = ((log_revenue - log_low[:, None]) / bin_width[:, None]).astype(np.int64)
+    np.clip(bins, 0, HISTOGRAM_BINS - 1, out=bins)
+    bins += (np.arange(n_crops) * HISTOGRAM_BINS)[:, None]
+    counts = np.bincount(bins.ravel(), minlength=n_crops * HISTOGRAM_BINS).reshape(n_crops, HISTOGRAM_BINS)
+    return counts, profit.sum(axis=1), (profit < 0).sum(axis=1)
+
+
+def _per_crop(value, crops, name):
+    """Array over crops from a scalar or a {crop: value} dict (missing crops get the default)"""
+    if isinstance(value, dict):
+        default = {'yield_cv': DEFAULT_YIELD_CV, 'price_cv': DEFAULT_PRICE_CV,
+                   'correlation': DEFAULT_CORRELATION}[name]
+        return np.array([float(value.get(crop, default)) for crop in crops])
+    return np.full(len(crops), float(value))
+
+
+class RiskEngine:
+    """
+    Monte Carlo profit risk for the crops in an EconomicAnalyzer.
+    Per hectare, yield and price are lognormal around avg_yield and
+    price_per_kg with the given coefficients of variation and a
+    correlation between their logs; profit is yield * price - cost as in
+    analyze_crop. Chunks are reduced to log-revenue histograms, so memory
+    does not grow with the scenario count and large runs can be spread
+    over a process pool. Results are cached by a hash of every input that
+    affects them; the area only scales them, so it is not part of the key.
+    """
+
+    def __init__(self, economic_analyzer, cache_size=DEFAULT_CACHE_SIZE):
+        self.economics = economic_analyzer.economics_table()
+        self.crops = list(self.economics.index)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parameter_hash(self, crops, yield_cv, price_cv, correlation, scenarios, seed, percentiles,
+                       var_confidence):
+        economics = self.economics.loc[crops, ['cost_per_hectare', 'avg_yield', 'price_per_kg']]
+        payload = {
+            'economics': economics.to_numpy().tolist(),
+            'crops': list(crops),
+            'yield_cv': _per_crop(yield_cv, crops, 'yield_cv').tolist(),
+            'price_cv': _per_crop(price_cv, crops, 'price_cv').tolist(),
+            'correlation': _per_crop(correlation, crops, 'correlation').tolist(),
+            'scenarios': int(scenarios),
+            'seed': int(seed),
+            'percentiles': [float(p) for p in percentiles],
+            'var_confidence': float(var_confidence),
+            'chunk': CHUNK_SCENARIOS,
+            'bins': HISTOGRAM_BINS
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def simulate(self, crops=None, area_hectares=1.0, yield_cv=DEFAULT_YIELD_CV, price_cv=DEFAULT_PRICE_CV,
+                 correlation=DEFAULT_CORRELATION, scenarios=DEFAULT_SCENARIOS, seed=DEFAULT_SEED,
+                 percentiles=DEFAULT_PERCENTILES, var_confidence=DEFAULT_VAR_CONFIDENCE, workers=1):
+        """
+        Profit risk per crop (default: all) for a field of area_hectares.
+        yield_cv, price_cv and correlation are scalars or {crop: value}
+        dicts. workers > 1 runs chunks on that many processes.
+        Returns a DataFrame indexed by crop with expected_profit (the
+        deterministic analyze_crop figure), mean_profit, one pN column per
+        percentile, prob_loss and value_at_risk (the loss not exceeded
+        with var_confidence probability, 0 if even that case is a profit).
+        """
+        crops = self.crops if crops is None else [str(crop).lower() for crop in crops]
+        unknown = [crop for crop in crops if crop not in self.economics.index]
+        if unknown:
+            raise ValueError(f"Unknown crops: {', '.join(unknown)}")
+        correlations = _per_crop(correlation, crops, 'correlation')
+        if np.any(np.abs(correlations) > 1):
+            raise ValueError("correlation must be between -1 and 1")
+        if scenarios <= 0:
+            raise ValueError("scenarios must be positive")
+
+        key = self.parameter_hash(crops, yield_cv, price_cv, correlation, scenarios, seed,
+                                  percentiles, var_confidence)
+        with self._lock:
+            per_hectare = self._cache.get(key)
+            if per_hectare is not None:
+                self._cache.move_to_end(key)
+        if per_hectare is None:
+            per_hectare = self._simulate_per_hectare(
+                crops, _per_crop(yield_cv, crops, 'yield_cv'), _per_crop(price_cv, crops, 'price_cv'),
+                correlations, int(scenarios), int(seed), percentiles, var_confidence, workers
+            )
+            with self._lock:
+                self._cache[key] = per_hectare
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        result = per_hectare.copy()
+        money = [column for column in result.columns if column != 'prob_loss']
+        result[money] *= area_hectares
+        return result
+
+    def _simulate_per_hectare(self, crops, yield_cv, price_cv, correlation, scenarios, seed,
+                              percentiles, var_confidence, workers):
+        economics = self.economics.loc[crops]
+        cost = economics['cost_per_hectare'].to_numpy(dtype=np.float64)
+        mu_yield, sigma_yield = _lognormal_params(economics['avg_yield'].to_numpy(dtype=np.float64), yield_cv)
+        mu_price, sigma_price = _lognormal_params(economics['price_per_kg'].to_numpy(dtype=np.float64), price_cv)
+        # log revenue is normal: its mean and spread fix the histogram range
+        mu_revenue = mu_yield + mu_price
+        sigma_revenue = np.sqrt(sigma_yield ** 2 + sigma_price ** 2 + 2 * correlation * sigma_yield * sigma_price)
+        sigma_revenue = np.maximum(sigma_revenue, 1e-9)
+        log_low = mu_revenue - HISTOGRAM_SIGMAS * sigma_revenue
+        bin_width = 2 * HISTOGRAM_SIGMAS * sigma_revenue / HISTOGRAM_BINS
+
+        sizes = [CHUNK_SCENARIOS] * (scenarios // CHUNK_SCENARIOS)
+        if scenarios % CHUNK_SCENARIOS:
+            sizes.append(scenarios % CHUNK_SCENARIOS)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = [
+            (chunk_seed, size, mu_yield, sigma_yield, mu_price, sigma_price, correlation,
+             cost, log_low, bin_width)
+            for chunk_seed, size in zip(seeds, sizes)
+        ]
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                chunks = list(pool.map(_simulate_chunk, tasks))
+        else:
+            chunks = [_simulate_chunk(task) for task in tasks]
+
+        counts = sum(chunk[0] for chunk in chunks)
+        profit_sum = sum(chunk[1] for chunk in chunks)
+        losses = sum(chunk[2] for chunk in chunks)
+
+        # Percentiles: interpolate within the log-revenue bin, then map to profit
+        cumulative = np.cumsum(counts, axis=1)
+        levels = sorted(set(float(p) for p in percentiles) | {100 * (1 - var_confidence)})
+        values = {}
+        for level in levels:
+            target = level / 100 * scenarios
+            bin_index = np.minimum((cumulative < target).sum(axis=1), HISTOGRAM_BINS - 1)
+            rows = np.arange(len(crops))
+            below = np.where(bin_index > 0, cumulative[rows, np.maximum(bin_index - 1, 0)], 0)
+            in_bin = np.maximum(counts[rows, bin_index], 1)
+            fraction = np.clip((target - below) / in_bin, 0.0, 1.0)
+            log_revenue = log_low + (bin_index + fraction) * bin_width
+            values[level] = np.exp(log_revenue) - cost
+
+        result = pd.DataFrame({
+            'expected_profit': (economics['avg_yield'] * economics['price_per_kg'] - cost).to_numpy(),
+            'mean_profit': profit_sum / scenarios
+        }, index=pd.Index(crops, name='crop'))
+        for p in percentiles:
+            result[f'p{p:g}'] = values[float(p)]
+        result['prob_loss'] = losses / scenarios
+        result['value_at_risk'] = np.maximum(-values[100 * (1 - var_confidence)], 0.0)
+        return result
+
+    def cache_info(self):
+        with self._lock:
+            return {'entries': len(self._cache), 'max_size': self.cache_size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo profit risk per crop")
+    parser.add_argument('--crops', nargs='+', help="Crops to simulate (default: all)")
+    parser.add_argument('--area', type=float, default=1.0, help="Field area in hectares")
+    parser.add_argument('--scenarios', type=int, default=DEFAULT_SCENARIOS)
+    parser.add_argument('--yield-cv', type=float, default=DEFAULT_YIELD_CV)
+    parser.add_argument('--price-cv', type=float, default=DEFAULT_PRICE_CV)
+    parser.add_argument('--correlation', type=float, default=DEFAULT_CORRELATION)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--workers', type=int, default=1, help="Processes (0 = one per CPU core)")
+    parser.add_argument('--output', help="Also write the table to this CSV file")
+    args = parser.parse_args(argv)
+
+    from utils.advanced_features import EconomicAnalyzer
+
+    engine = RiskEngine(EconomicAnalyzer())
+    start = time.perf_counter()
+    result = engine.simulate(
+        args.crops, args.area, args.yield_cv, args.price_cv, args.correlation,
+        args.scenarios, args.seed, workers=args.workers or os.cpu_count() or 1
+    )
+    elapsed = time.perf_counter() - start
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200):
+        print(result.round(2))
+    print(f"{args.scenarios:,} scenarios x {len(result)} crops in {elapsed:.2f}s")
+    if args.output:
+        result.to_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
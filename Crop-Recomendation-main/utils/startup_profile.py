@@ -0,0 +1,72 @@
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import time
+
+# Seconds spent on the first import of each module loaded through timed_import
+IMPORT_TIMES = {}
+
+APP_MODULES = [
+    'streamlit',
+    'numpy',
+    'pandas',
+    'plotly.graph_objects',
+    'plotly.express',
+    'reportlab.platypus',
+    'sklearn.ensemble',
+    'xgboost',
+    'utils.advanced_features',
+    'utils.visualization',
+    'utils.pdf_generator',
+    'utils.report_service',
+    'model.crop_recommendation_model'
+]
+
+
+def timed_import(name):
+    """Import a module by name, recording how long its first import took"""
+    if name in sys.modules:
+        return sys.modules[name]
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = time.perf_counter() - start
+    return module
+
+
+def import_report():
+    """Return [(module, seconds)] for modules imported via timed_import, slowest first"""
+    return sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
+
+
+def measure_cold_import(name):
+    """Seconds to import name in a fresh interpreter, from python -X importtime"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {name}'],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return None
+    # Last line is the requested module: "import time: self | cumulative | name"
+    last_line = completed.stderr.strip().splitlines()[-1]
+    return int(last_line.split('|')[1]) / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold import time per module of the app")
+    parser.add_argument('modules', nargs='*', default=APP_MODULES, help="Modules to measure")
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = {name: measure_cold_import(name) for name in args.modules}
+    for name, seconds in sorted(report.items(), key=lambda item: -(item[1] or 0)):
+        shown = f"{seconds * 1000:8.1f} ms" if seconds is not None else "  failed"
+        print(f"{shown}  {name}")
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,133 @@
+import functools
+import threading
+from collections import OrderedDict
+
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+from utils import metrics
+from utils.chart_style import (
+    BAR_COLOR, SECONDARY_BAR_COLOR, GAUGE_THRESHOLD_COLOR, GAUGE_THRESHOLD_WIDTH,
+    GAUGE_THRESHOLD_THICKNESS, FEATURE_IMPORTANCE_TITLE, FEATURE_IMPORTANCE_AXIS_TITLE,
+    gauge_steps, bar_axis_range
+)
 
-def create_gauge_chart(value, title, min_val, max_val):
-    """Create a gauge chart for displaying parameter values"""
+# Static figures (model comparison, feature importance) kept per cache key
+STATIC_FIGURE_CACHE_SIZE = 32
+
+_static_figures = OrderedDict()  # (chart, key) -> figure
+_static_lock = threading.Lock()
+
+
+def _cached_figure(chart, key, build):
+    """
+    Figure for (chart, key), built once. Cached figures are shared between
+    callers (and Streamlit sessions), so they must not be modified.
+    """
+    cache_key = (chart, key)
+    with _static_lock:
+        fig = _static_figures.get(cache_key)
+        if fig is not None:
+            _static_figures.move_to_end(cache_key)
+            return fig
+    fig = build()
+    with _static_lock:
+        fig = _static_figures.setdefault(cache_key, fig)
+        while len(_static_figures) > STATIC_FIGURE_CACHE_SIZE:
+            _static_figures.popitem(last=False)
+    return fig
+
+
+def clear_figure_cache():
+    with _static_lock:
+        _static_figures.clear()
+    _gauge_template.cache_clear()
+
+
+@functools.lru_cache(maxsize=64)
+def _gauge_template(title, min_val, max_val):
+    """
+    Figure dict of a gauge, built once per title and range. The layout's
+    default template is left out (Figure() applies it again), which makes
+    rebuilding a figure from the dict several times cheaper.
+    """
     fig = go.Figure(go.Indicator(
         mode = "gauge+number",
-        value = value,
+        value = min_val,
         title = {'text': title},
         gauge = {
             'axis': {'range': [min_val, max_val]},
-            'bar': {'color': "#4CAF50"},
+            'bar': {'color': BAR_COLOR},
             'steps': [
-                {'range': [min_val, min_val + (max_val-min_val)/3], 'color': "lightgray"},
-                {'range': [min_val + (max_val-min_val)/3, min_val + 2*(max_val-min_val)/3], 'color': "gray"},
-                {'range': [min_val + 2*(max_val-min_val)/3, max_val], 'color': "darkgray"}
+                {'range': [low, high], 'color': color} for low, high, color in gauge_steps(min_val, max_val)
             ],
             'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': value
+                'line': {'color': GAUGE_THRESHOLD_COLOR, 'width': GAUGE_THRESHOLD_WIDTH},
+                'thickness': GAUGE_THRESHOLD_THICKNESS,
+                'value': min_val
             }
         }
     ))
     fig.update_layout(height=200, margin=dict(l=10, r=10, t=50, b=10))
-    return fig
+    spec = fig.to_dict()
+    spec['layout'].pop('template', None)
+    return spec
+
+@metrics.timed('crop_chart_build_seconds', chart='gauge')
+def create_gauge_chart(value, title, min_val, max_val):
+    """Create a gauge chart for displaying parameter values"""
+    template = _gauge_template(str(title), float(min_val), float(max_val))
+    indicator = template['data'][0]
+    gauge = indicator['gauge']
+    value = float(value)
+    spec = {
+        'data': [dict(indicator, value=value,
+                      gauge=dict(gauge, threshold=dict(gauge['threshold'], value=value)))],
+        'layout': template['layout']
+    }
+    return go.Figure(spec)
 
-def create_feature_importance_plot(importance_scores, feature_names):
-    """Create a bar plot for feature importance"""
+def _build_feature_importance_plot(importance_scores, feature_names):
     df = pd.DataFrame({
         'Feature': feature_names,
         'Importance': importance_scores
     })
     df = df.sort_values('Importance', ascending=True)
 
-    fig = px.bar(df, 
-                 x='Importance', 
+    fig = px.bar(df,
+                 x='Importance',
                  y='Feature',
                  orientation='h',
-                 title='Feature Importance in Crop Prediction')
+                 title=FEATURE_IMPORTANCE_TITLE)
 
     fig.update_layout(
-        xaxis_title="Importance Score",
+        xaxis_title=FEATURE_IMPORTANCE_AXIS_TITLE,
+        xaxis_range=bar_axis_range(importance_scores),
         yaxis_title="Parameters",
         plot_bgcolor='white',
         height=400,
         margin=dict(l=10, r=10, t=50, b=10)
     )
 
-    fig.update_traces(marker_color='#4CAF50')
+    fig.update_traces(marker_color=BAR_COLOR)
     return fig
 
-def create_model_comparison_plot(model_scores):
-    """Create a bar plot comparing model performances"""
+@metrics.timed('crop_chart_build_seconds', chart='feature_importance')
+def create_feature_importance_plot(importance_scores, feature_names, cache_key=None):
+    """
+    Create a bar plot for feature importance
+    The figure is cached per cache_key (e.g. the model's artifact_key) or,
+    without one, per input values; don't modify the returned figure.
+    """
+    importance_scores = [float(v) for v in importance_scores]
+    feature_names = [str(name) for name in feature_names]
+    key = cache_key if cache_key is not None else (tuple(importance_scores), tuple(feature_names))
+    return _cached_figure(
+        'feature_importance', key,
+        lambda: _build_feature_importance_plot(importance_scores, feature_names)
+    )
+
+def _build_model_comparison_plot(model_scores):
     models = []
     accuracies = []
     cv_scores = []
@@ -63,8 +138,8 @@ def create_model_comparison_plot(model_scores):
         cv_scores.append(scores['cv_mean'])
 
     fig = go.Figure(data=[
-        go.Bar(name='Test Accuracy', x=models, y=accuracies, marker_color='#4CAF50'),
-        go.Bar(name='Cross-validation Score', x=models, y=cv_scores, marker_color='#2196F3')
+        go.Bar(name='Test Accuracy', x=models, y=accuracies, marker_color=BAR_COLOR),
+        go.Bar(name='Cross-validation Score', x=models, y=cv_scores, marker_color=SECONDARY_BAR_COLOR)
     ])
 
     fig.update_layout(
@@ -78,4 +153,15 @@ def create_model_comparison_plot(model_scores):
         margin=dict(l=10, r=10, t=50, b=10)
     )
 
-    return fig
\ No newline at end of file
+    return fig
+
+@metrics.timed('crop_chart_build_seconds', chart='model_comparison')
+def create_model_comparison_plot(model_scores, cache_key=None):
+    """
+    Create a bar plot comparing model performances
+    Cached like create_feature_importance_plot.
+    """
+    key = cache_key if cache_key is not None else tuple(
+        (name, float(scores['accuracy']), float(scores['cv_mean'])) for name, scores in model_scores.items()
+    )
+    return _cached_figure('model_comparison', key, lambda: _build_model_comparison_plot(model_scores))